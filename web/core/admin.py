@@ -1,3 +1,48 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils import timezone
 
-# Register your models here.
+from .models import ChangeLog, Job
+from .pagination import EstimatedCountAdminMixin
+
+
+@admin.register(ChangeLog)
+class ChangeLogAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ("changed_at", "model", "object_id", "field", "old_value", "new_value", "changed_by")
+    list_filter = ("model", "field", "month")
+    search_fields = ("=object_id",)
+    list_select_related = ("changed_by",)
+    date_hierarchy = "changed_at"
+
+    # журнал лише для читання
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "priority", "attempts", "max_attempts", "run_at", "locked_by", "created_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "dedupe_key")
+    readonly_fields = (
+        "name", "payload", "status", "attempts", "dedupe_key",
+        "locked_at", "locked_by", "last_error", "created_at",
+    )
+    actions = ["retry_jobs"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Повторити вибрані задачі")
+    def retry_jobs(self, request, queryset):
+        count = queryset.filter(status=Job.Status.FAILED).update(
+            status=Job.Status.QUEUED,
+            attempts=0,
+            run_at=timezone.now(),
+        )
+        self.message_user(request, f"Повернуто в чергу: {count}", messages.SUCCESS)
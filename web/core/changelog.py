@@ -0,0 +1,161 @@
+"""
+Журнал змін полів моделей.
+
+track(Model, fields) запам’ятовує значення полів при завантаженні об’єкта
+(post_init) і після save() пише різницю в ChangeLog. Записи пишуться
+одним bulk_create у transaction.on_commit: після відкату не пишуться
+зовсім, а після коміту — одразу, хоч у запиті, хоч у воркері задач чи
+циклі команди. Масові зміни (log_many, log_update) — один INSERT на пачку.
+"""
+import contextvars
+from datetime import date, datetime
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from django.utils import timezone
+
+_current_request = contextvars.ContextVar("changelog_request", default=None)
+
+_tracked = {}
+
+
+BATCH_SIZE = 500
+
+
+def _write(entries):
+    from .models import ChangeLog
+    ChangeLog.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+
+
+def _write_on_commit(entries):
+    if entries:
+        transaction.on_commit(partial(_write, entries))
+
+
+class CurrentRequestMiddleware:
+    """Запам’ятовує запит, щоб у журнал потрапив автор зміни."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+
+def _current_user_id():
+    request = _current_request.get()
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    return None
+
+
+def _to_text(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _snapshot(instance):
+    deferred = instance.get_deferred_fields()
+    return {
+        field.attname: field.value_from_object(instance)
+        for field in _tracked[type(instance)]
+        if field.attname not in deferred
+    }
+
+
+def _on_init(sender, instance, **kwargs):
+    instance._changelog_snapshot = _snapshot(instance) if instance.pk else {}
+
+
+def _entries(instance, created):
+    before = getattr(instance, "_changelog_snapshot", {})
+    after = _snapshot(instance)
+    now = timezone.now()
+    user_id = _current_user_id()
+    label = instance._meta.label_lower
+
+    from .models import ChangeLog
+    entries = [
+        ChangeLog(
+            model=label,
+            object_id=instance.pk,
+            field=attname,
+            old_value=None if created else _to_text(before.get(attname)),
+            new_value=_to_text(value),
+            changed_at=now,
+            changed_by_id=user_id,
+            month=now.date().replace(day=1),
+        )
+        for attname, value in after.items()
+        if created or (attname in before and before[attname] != value)
+    ]
+    instance._changelog_snapshot = after
+    return entries
+
+
+def log_changes(instance, created=False):
+    """
+    Порівнює поточні значення з тими, що були при завантаженні,
+    і записує різницю після коміту. Викликається з post_save.
+    """
+    _write_on_commit(_entries(instance, created))
+
+
+def log_many(instances, created=False):
+    """log_changes для пачки об’єктів (bulk_create / bulk_update) — один INSERT."""
+    _write_on_commit([entry for instance in instances for entry in _entries(instance, created)])
+
+
+def log_update(model, attname, old_values, new_value):
+    """
+    Журнал для QuerySet.update() одного поля (сигналів немає):
+    old_values — {pk: значення до оновлення}; new_value — нове значення або
+    функція від старого (для update(field=F(field) + ...)). Незмінені рядки
+    пропускаються.
+    """
+    if attname not in {field.attname for field in _tracked.get(model, ())}:
+        return
+    now = timezone.now()
+    user_id = _current_user_id()
+    label = model._meta.label_lower
+
+    new_of = new_value if callable(new_value) else lambda old: new_value
+
+    from .models import ChangeLog
+    entries = [
+        ChangeLog(
+            model=label,
+            object_id=pk,
+            field=attname,
+            old_value=_to_text(old),
+            new_value=_to_text(new_of(old)),
+            changed_at=now,
+            changed_by_id=user_id,
+            month=now.date().replace(day=1),
+        )
+        for pk, old in old_values.items()
+        if old != new_of(old)
+    ]
+    _write_on_commit(entries)
+
+
+def _on_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        log_changes(instance, created=created)
+
+
+def track(model, fields):
+    """Підключає журнал змін для вказаних полів моделі."""
+    _tracked[model] = [model._meta.get_field(name) for name in fields]
+    uid = f"changelog_{model._meta.label_lower}"
+    post_init.connect(_on_init, sender=model, dispatch_uid=uid, weak=False)
+    post_save.connect(_on_save, sender=model, dispatch_uid=uid, weak=False)
@@ -0,0 +1,87 @@
+"""
+Маршрутизація читань на репліки PostgreSQL.
+
+Репліки задаються в settings (POSTGRES_REPLICA_HOSTS → аліаси replica1, replica2…).
+Запити йдуть на репліку лише всередині в’юх, позначених @use_replica
+(звіти, стрічки подій); решта — на основну БД.
+
+Прочитати свої записи: після POST/PUT/PATCH/DELETE ReplicaPinningMiddleware
+ставить cookie, і ще DATABASE_REPLICA_PIN_SECONDS секунд (поки репліка
+наздоганяє) усі запити цього користувача читають з основної БД.
+"""
+import contextvars
+import random
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+
+PIN_COOKIE = "db_pin"
+
+_use_replica = contextvars.ContextVar("use_replica", default=False)
+
+
+def _replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = _replicas()
+        if replicas and _use_replica.get():
+            return random.choice(replicas)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # репліки містять ті самі дані, що й основна БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+def _wants_replica(request):
+    return bool(_replicas()) and PIN_COOKIE not in request.COOKIES
+
+
+def use_replica(view):
+    """Читання у в’юсі (sync або async) — з репліки, якщо вона є."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            token = _use_replica.set(_wants_replica(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = _use_replica.set(_wants_replica(request))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+    return wrapper
+
+
+class ReplicaPinningMiddleware:
+    """Після запиту, що змінює дані, «прив’язує» користувача до основної БД."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if _replicas() and request.method not in ("GET", "HEAD", "OPTIONS", "TRACE"):
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,105 @@
+"""
+Асинхронний HTTP для інтеграцій (перевізники, маркетплейси).
+
+Один пул з’єднань на синхронізацію (keep-alive замість нового TLS на
+кожен запит), обмеження частоти запитів до API і повтори при 429 / 5xx
+та мережевих збоях — з паузою з Retry-After або експоненційною.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+
+class RateLimiter:
+    """Не більше rate запитів за per секунд (token bucket, спільний для корутин)."""
+
+    def __init__(self, rate, per=1.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def async_client(base_url="", *, max_connections=20, timeout=10.0, headers=None):
+    """httpx.AsyncClient з пулом на max_connections з’єднань; закривати через async with."""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=timeout,
+        # retries — лише повторне з’єднання; відповіді з помилками — у request_json
+        transport=httpx.AsyncHTTPTransport(limits=limits, retries=2),
+    )
+
+
+def _retry_delay(response, attempt, backoff):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+    return backoff * 2 ** attempt * (1 + random.random() / 2)
+
+
+async def request(client, method, url, *, limiter=None, retries=3, backoff=0.5, **kwargs):
+    """
+    Запит з обмеженням частоти і повторами; повертає httpx.Response
+    (2xx або 304). Після вичерпання спроб — httpx.HTTPStatusError / httpx.TransportError.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            await limiter.acquire()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(_retry_delay(None, attempt, backoff))
+            continue
+        if (response.status_code == 429 or response.status_code >= 500) and attempt < retries:
+            await asyncio.sleep(_retry_delay(response, attempt, backoff))
+            continue
+        if response.status_code != 304:  # Not Modified — відповідь на умовний запит, не помилка
+            response.raise_for_status()
+        return response
+
+
+async def request_json(client, method, url, **kwargs):
+    """request() з розібраним JSON-тілом відповіді."""
+    response = await request(client, method, url, **kwargs)
+    return response.json()
+
+
+async def gather_limited(coros, concurrency):
+    """
+    asyncio.gather не більше ніж concurrency корутин одночасно;
+    винятки повертаються в результатах, як при return_exceptions=True.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros), return_exceptions=True)
@@ -0,0 +1,155 @@
+"""
+Легка черга фонових задач у PostgreSQL.
+
+Обробники реєструються декоратором @job("app.name") у модулях <app>/jobs.py
+(підтягуються autodiscover()). Ставити в чергу — enqueue() або
+enqueue_on_commit() (після коміту); задача, така сама як та, що вже чекає,
+не дублюється.
+Воркер (manage.py run_jobs) бере задачі через SELECT ... FOR UPDATE SKIP LOCKED.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def job(name):
+    """Реєструє функцію як обробник фонової задачі з іменем name."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def autodiscover():
+    autodiscover_modules("jobs")
+
+
+def _dedupe_key(name, payload):
+    return f"{name}:" + ",".join(f"{k}={payload[k]}" for k in sorted(payload))
+
+
+def _is_eager():
+    # без воркера (локальна розробка) задачі виконуються одразу
+    return getattr(settings, "JOB_QUEUE_EAGER", False)
+
+
+def _build(name, payload, *, priority=0, delay=None, max_attempts=3, dedupe=True):
+    return Job(
+        name=name,
+        payload=payload,
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + (delay or timedelta(0)),
+        dedupe_key=_dedupe_key(name, payload) if dedupe else "",
+    )
+
+
+def enqueue_many(jobs):
+    """
+    Ставить задачі в чергу одним INSERT. jobs — пари (name, payload).
+    Задача, така сама (ім’я + параметри) як та, що вже чекає, не додається
+    (частковий унікальний індекс по dedupe_key).
+    """
+    jobs = list(jobs)
+    if _is_eager():
+        autodiscover()
+        for name, payload in jobs:
+            _registry[name](**payload)
+        return
+    Job.objects.bulk_create(
+        [_build(name, payload) for name, payload in jobs],
+        ignore_conflicts=True,
+    )
+
+
+def enqueue(name, *, priority=0, delay=None, max_attempts=3, dedupe=True, **payload):
+    """Ставить одну задачу в чергу (див. enqueue_many)."""
+    if _is_eager():
+        enqueue_many([(name, payload)])
+        return
+    Job.objects.bulk_create(
+        [_build(name, payload, priority=priority, delay=delay, max_attempts=max_attempts, dedupe=dedupe)],
+        ignore_conflicts=True,
+    )
+
+
+def enqueue_on_commit(name, **payload):
+    """
+    Відкладає постановку в чергу до коміту транзакції (при відкаті задача
+    відкидається разом із колбеком). Однакові задачі однієї транзакції
+    (напр. з кожної позиції замовлення) — одна: повтор відсікає унікальний
+    індекс по dedupe_key.
+    """
+    enqueue_many_on_commit([(name, payload)])
+
+
+def enqueue_many_on_commit(jobs):
+    """Як enqueue_on_commit, але для пар (name, payload) — одним INSERT після коміту."""
+    jobs = list(jobs)
+    if jobs:
+        transaction.on_commit(partial(enqueue_many, jobs))
+
+
+def claim(worker_id):
+    """Бере наступну готову задачу або повертає None."""
+    with transaction.atomic():
+        job_obj = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, run_at__lte=timezone.now())
+            .order_by("-priority", "run_at", "id")
+            .first()
+        )
+        if job_obj is None:
+            return None
+        job_obj.status = Job.Status.RUNNING
+        job_obj.locked_at = timezone.now()
+        job_obj.locked_by = worker_id
+        job_obj.attempts += 1
+        # поки задача виконується, такий самий ключ знову можна ставити в чергу
+        job_obj.dedupe_key = ""
+        job_obj.save(update_fields=["status", "locked_at", "locked_by", "attempts", "dedupe_key"])
+        return job_obj
+
+
+def run(job_obj):
+    """Виконує задачу: успіх — видалення, помилка — повтор з паузою або FAILED."""
+    handler = _registry.get(job_obj.name)
+    try:
+        if handler is None:
+            raise LookupError(f"Невідома задача {job_obj.name}")
+        handler(**job_obj.payload)
+    except Exception:
+        logger.exception("Job %s failed", job_obj)
+        job_obj.last_error = traceback.format_exc()
+        job_obj.locked_at = None
+        job_obj.locked_by = ""
+        if job_obj.attempts < job_obj.max_attempts:
+            job_obj.status = Job.Status.QUEUED
+            job_obj.run_at = timezone.now() + timedelta(seconds=10 * 2 ** job_obj.attempts)
+        else:
+            job_obj.status = Job.Status.FAILED
+        job_obj.save(update_fields=["status", "run_at", "last_error", "locked_at", "locked_by"])
+        return False
+
+    Job.objects.filter(pk=job_obj.pk).delete()
+    return True
+
+
+def requeue_stale(timeout):
+    """Повертає в чергу задачі воркерів, що впали посеред виконання."""
+    return Job.objects.filter(
+        status=Job.Status.RUNNING,
+        locked_at__lt=timezone.now() - timeout,
+    ).update(status=Job.Status.QUEUED, locked_at=None, locked_by="")
@@ -0,0 +1,58 @@
+"""
+Кеш даних у пам’яті процесу з інвалідацією за версією.
+
+Дані (напр. довідник товарів) тримаються в самому процесі — звернення
+не коштують ні запиту до БД, ні серіалізації. Версія лежить у спільному
+кеші Django: invalidate() змінює її, і кожен процес перечитує дані
+при наступному зверненні. З LocMem-кешем версія не спільна між процесами,
+тому дані додатково перечитуються не рідше ніж раз на max_age секунд.
+"""
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+
+class VersionedCache:
+    def __init__(self, name, loader, max_age=300):
+        self.name = name
+        self.loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0.0
+        self._data = None
+
+    @property
+    def _version_key(self):
+        return f"localcache:{self.name}:version"
+
+    def _current_version(self):
+        version = cache.get(self._version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            # інший процес міг встигнути першим — беремо його значення
+            if not cache.add(self._version_key, version, None):
+                version = cache.get(self._version_key, version)
+        return version
+
+    def version(self):
+        """Поточна версія даних — напр. як частина ключа похідних кешів."""
+        return self._current_version()
+
+    def get(self):
+        version = self._current_version()
+        fresh = time.monotonic() - self._loaded_at < self.max_age
+        if self._data is not None and self._version == version and fresh:
+            return self._data
+        with self._lock:
+            if self._data is None or self._version != version or not fresh:
+                self._data = self.loader()
+                self._version = version
+                self._loaded_at = time.monotonic()
+            return self._data
+
+    def invalidate(self):
+        cache.set(self._version_key, uuid.uuid4().hex, None)
+        self._data = None
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from crm.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move orders completed or canceled more than --months ago (with items and slots) into archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=24)
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+
+    def handle(self, *args, **options):
+        moved = archive_orders(
+            months=options["months"],
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"✔ Заархівовано замовлень: {moved}"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from crm.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored Order.total from order items (one UPDATE)"
+
+    def handle(self, *args, **options):
+        items_total = (
+            OrderItem.objects.filter(order=OuterRef("pk"))
+            .order_by()
+            .values("order")
+            .annotate(total=Sum(F("unit_price") * F("quantity")))
+            .values("total")
+        )
+        money = DecimalField(max_digits=14, decimal_places=2)
+        updated = Order.objects.update(
+            total=Coalesce(Subquery(items_total, output_field=money), Value(0), output_field=money)
+        )
+        self.stdout.write(self.style.SUCCESS(f"✔ Оновлено суми {updated} замовлень"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from core.models import ChangeLog
+from crm.models import Order
+
+
+class Command(BaseCommand):
+    help = "Fill empty Order status timestamps from the change log (one UPDATE per status)"
+
+    def handle(self, *args, **options):
+        for status, field in Order.STATUS_TIMESTAMP_FIELDS.items():
+            last_entered = (
+                ChangeLog.objects.filter(
+                    model="crm.order",
+                    field="status",
+                    new_value=status,
+                    object_id=OuterRef("pk"),
+                )
+                .order_by("-changed_at")
+                .values("changed_at")[:1]
+            )
+            entered_ids = ChangeLog.objects.filter(
+                model="crm.order", field="status", new_value=status,
+            ).values("object_id")
+            updated = (
+                Order.objects.filter(**{f"{field}__isnull": True}, pk__in=entered_ids)
+                .update(**{field: Subquery(last_entered)})
+            )
+            self.stdout.write(self.style.SUCCESS(f"✔ {field}: оновлено {updated}"))
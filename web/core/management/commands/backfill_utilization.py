@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from manufacture import utilization
+from manufacture.models import ArchivedProductionSlot, ProductionSlot
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild daily resource utilization (ResourceUtilization) in date batches. "
+        "Without --start: from the first slot; run daily with --days 2 to add new days"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First date (YYYY-MM-DD)")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last date (YYYY-MM-DD), default today")
+        parser.add_argument("--days", type=int, help="Only the last N days up to --end")
+        parser.add_argument("--batch-days", type=int, default=31)
+
+    def handle(self, *args, **options):
+        end = options["end"] or timezone.localdate()
+        if options["days"]:
+            start = end - timedelta(days=options["days"] - 1)
+        elif options["start"]:
+            start = options["start"]
+        else:
+            firsts = [
+                model.objects.order_by("start_datetime")
+                .filter(start_datetime__isnull=False)
+                .values_list("start_datetime", flat=True)
+                .first()
+                for model in (ProductionSlot, ArchivedProductionSlot)
+            ]
+            firsts = [timezone.localtime(dt).date() for dt in firsts if dt]
+            if not firsts:
+                self.stdout.write(self.style.WARNING("Слотів немає — нічого перераховувати."))
+                return
+            start = min(firsts)
+        if start > end:
+            raise CommandError("--start пізніше за --end")
+
+        total = 0
+        batch_start = start
+        while batch_start <= end:
+            batch_end = min(batch_start + timedelta(days=options["batch_days"] - 1), end)
+            total += utilization.rebuild(batch_start, batch_end)
+            self.stdout.write(f"  {batch_start:%d.%m.%Y} – {batch_end:%d.%m.%Y}")
+            batch_start = batch_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"✔ Записано {total} денних підсумків"))
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from crm.models import Order
+
+STATIC_STAMP = ".bootstrap-stamp"
+
+
+class Command(BaseCommand):
+    help = (
+        "Container start-up in one process: makemigrations, migrate, backfill_order_totals, createsu, "
+        "collectstatic and seed_demo_data, skipping steps that have nothing to do"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--no-seed", action="store_true", help="Do not seed demo data")
+        parser.add_argument("--force", action="store_true", help="Run every step even if it looks up to date")
+
+    def handle(self, *args, **options):
+        self.force = options["force"]
+        started = time.perf_counter()
+
+        with self.step("makemigrations"):
+            call_command("makemigrations", "crm", "manufacture", "core", verbosity=0)
+        with self.step("migrate") as skip:
+            if self.force or self.has_unapplied_migrations():
+                call_command("migrate", verbosity=1)
+            else:
+                skip()
+        with self.step("backfill_order_totals") as skip:
+            # Order.total з’явився пізніше за замовлення — до першого перерахунку там 0
+            if self.force or self.has_unset_order_totals():
+                call_command("backfill_order_totals")
+            else:
+                skip()
+        with self.step("createsu"):
+            call_command("createsu")
+        with self.step("collectstatic") as skip:
+            stamp = self.static_fingerprint()
+            stamp_path = settings.STATIC_ROOT / STATIC_STAMP
+            if not self.force and stamp_path.exists() and stamp_path.read_text() == stamp:
+                skip()
+            else:
+                call_command("collectstatic", interactive=False, verbosity=0)
+                stamp_path.parent.mkdir(parents=True, exist_ok=True)
+                stamp_path.write_text(stamp)
+        if not options["no_seed"]:
+            with self.step("seed_demo_data") as skip:
+                # демо-дані вже є — повторне наповнення нічого не додає
+                if not self.force and get_user_model().objects.filter(username="demo_manager").exists():
+                    skip()
+                else:
+                    call_command("seed_demo_data")
+
+        self.stdout.write(self.style.SUCCESS(f"▶ Bootstrap завершено за {time.perf_counter() - started:.2f} с"))
+
+    @contextmanager
+    def step(self, name):
+        skipped = []
+        started = time.perf_counter()
+        yield lambda: skipped.append(True)
+        elapsed = time.perf_counter() - started
+        state = "пропущено" if skipped else "виконано"
+        self.stdout.write(f"  {name}: {state} ({elapsed:.2f} с)")
+
+    def has_unapplied_migrations(self):
+        executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+        targets = executor.loader.graph.leaf_nodes()
+        return bool(executor.migration_plan(targets))
+
+    def has_unset_order_totals(self):
+        return Order.objects.filter(total=0, items__unit_price__gt=0, items__quantity__gt=0).exists()
+
+    def static_fingerprint(self):
+        """Хеш списку статичних файлів (шлях, розмір, час зміни) з усіх finders."""
+        entries = []
+        for finder in get_finders():
+            for path, storage in finder.list([]):
+                stat = os.stat(storage.path(path))
+                entries.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.md5("\n".join(sorted(entries)).encode()).hexdigest()
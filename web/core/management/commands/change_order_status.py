@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.bulk import change_status
+from crm.models import Order
+
+
+class Command(BaseCommand):
+    help = "Set the status of many orders with a single UPDATE (selected by --order and/or --status)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("to", choices=Order.Status.values, help="New status")
+        parser.add_argument("--order", type=int, action="append", dest="orders", help="Order id (repeatable)")
+        parser.add_argument("--status", action="append", dest="statuses", choices=Order.Status.values,
+                            help="Only orders currently in this status (repeatable)")
+
+    def handle(self, *args, **options):
+        if not options["orders"] and not options["statuses"]:
+            raise CommandError("Вкажіть --order або --status, щоб не змінити всі замовлення.")
+        orders = Order.objects.all()
+        if options["orders"]:
+            orders = orders.filter(pk__in=options["orders"])
+        if options["statuses"]:
+            orders = orders.filter(status__in=options["statuses"])
+
+        updated = change_status(orders, options["to"])
+        self.stdout.write(self.style.SUCCESS(f"✔ Статус «{Order.Status(options['to']).label}»: {updated} замовлень"))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.dedup import refresh_candidates
+
+
+class Command(BaseCommand):
+    help = "Find likely duplicate clients (blocking keys + pair scoring) for review in the admin"
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        found = refresh_candidates()
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ Можливих дублікатів: {found} пар за {time.monotonic() - started:.1f} с"
+        ))
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from manufacture.recurrence import MATERIALIZE_DAYS, materialize
+
+
+class Command(BaseCommand):
+    help = "Save occurrences of recurring slots (with an order) up to --days ahead as ProductionSlots in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=MATERIALIZE_DAYS, help="Horizon from now")
+
+    def handle(self, *args, **options):
+        created = materialize(timezone.now() + timedelta(days=options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"✔ Створено слотів: {created}"))
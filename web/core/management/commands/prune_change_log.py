@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = "Delete change log months older than --keep-months (whole months, by index)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-months", type=int, default=24)
+
+    def handle(self, *args, **options):
+        today = date.today()
+        year, month = divmod(today.year * 12 + today.month - 1 - options["keep_months"], 12)
+        cutoff = date(year, month + 1, 1)
+
+        deleted, _ = ChangeLog.objects.filter(month__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"✔ Видалено {deleted} записів журналу до {cutoff:%m.%Y}"))
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import make_aware
+
+from manufacture.bulk import BulkSlotError, reassign_slots
+from manufacture.models import Machine, ProductionSlot
+
+
+def _aware(value):
+    return make_aware(value) if value is not None and value.tzinfo is None else value
+
+
+class Command(BaseCommand):
+    help = "Move slots from one machine to another with a single UPDATE (conflicts are checked first)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from-machine", type=int, required=True)
+        parser.add_argument("--to-machine", type=int, required=True)
+        parser.add_argument("--start", type=datetime.fromisoformat, help="Slots starting from (YYYY-MM-DDTHH:MM)")
+        parser.add_argument("--end", type=datetime.fromisoformat, help="Slots starting before (YYYY-MM-DDTHH:MM)")
+
+    def handle(self, *args, **options):
+        machine = Machine.objects.filter(pk=options["to_machine"]).first()
+        if machine is None:
+            raise CommandError(f"Верстат #{options['to_machine']} не знайдено.")
+        slots = ProductionSlot.objects.filter(machine_id=options["from_machine"])
+        if options["start"]:
+            slots = slots.filter(start_datetime__gte=_aware(options["start"]))
+        if options["end"]:
+            slots = slots.filter(start_datetime__lt=_aware(options["end"]))
+
+        try:
+            updated = reassign_slots(slots, machine)
+        except BulkSlotError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"✔ Перенесено на {machine}: {updated} слотів"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from crm.models import Client
+
+
+class Command(BaseCommand):
+    help = "Recalculate cached client lifetime metrics (LTV, orders count, last order date)"
+
+    def handle(self, *args, **options):
+        updated = Client.refresh_lifetime_metrics()
+        self.stdout.write(self.style.SUCCESS(f"✔ Оновлено показники для {updated} клієнтів"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from crm import segments
+from crm.models import Segment
+
+
+class Command(BaseCommand):
+    help = "Fully recompute saved client segments (run daily: 'ordered in last N days' depends on the date)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--segment", type=int, action="append", help="Segment id (repeatable; default: all)")
+
+    def handle(self, *args, **options):
+        queryset = Segment.objects.prefetch_related("tags")
+        if options["segment"]:
+            queryset = queryset.filter(pk__in=options["segment"])
+        for segment in queryset:
+            count = segments.refresh_segment(segment)
+            self.stdout.write(self.style.SUCCESS(f"✔ {segment.name}: {count}"))
@@ -0,0 +1,60 @@
+import os
+import signal
+import socket
+import threading
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue (SELECT ... FOR UPDATE SKIP LOCKED)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2, help="Number of worker threads")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--stale-after", type=int, default=600, help="Requeue running jobs locked longer than this (s)")
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        jobs.autodiscover()
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+        requeued = jobs.requeue_stale(timedelta(seconds=options["stale_after"]))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Повернуто в чергу завислих задач: {requeued}"))
+
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(f"{prefix}:{i}", stop, options["poll_interval"], options["once"]),
+                daemon=True,
+            )
+            for i in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(self.style.SUCCESS(f"▶ Воркер запущено, потоків: {len(threads)}"))
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+
+    def work(self, worker_id, stop, poll_interval, once):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                job_obj = jobs.claim(worker_id)
+                if job_obj is None:
+                    if once:
+                        break
+                    stop.wait(poll_interval)
+                    continue
+                jobs.run(job_obj)
+        finally:
+            close_old_connections()
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import localtime, make_aware
+
+from crm.models import Order
+from manufacture.scheduler import OPEN_STATUSES, schedule_orders
+
+
+class Command(BaseCommand):
+    help = "Schedule open orders without slots along product routes and create ProductionSlots in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=datetime.fromisoformat, help="Earliest start (YYYY-MM-DDTHH:MM), default now")
+        parser.add_argument("--order", type=int, action="append", dest="orders", help="Only these order ids (repeatable)")
+        parser.add_argument("--dry-run", action="store_true", help="Build the schedule but do not save slots")
+
+    def handle(self, *args, **options):
+        start = options["start"]
+        if start is not None and start.tzinfo is None:
+            start = make_aware(start)
+        orders = None
+        if options["orders"]:
+            orders = Order.objects.filter(pk__in=options["orders"], status__in=OPEN_STATUSES)
+
+        result = schedule_orders(orders, start=start, commit=not options["dry_run"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ Слотів: {len(result.slots)}, замовлень: {len({slot.order_id for slot in result.slots})}"
+            + (" (без збереження)" if options["dry_run"] else "")
+        ))
+        for order, item, operation in result.unscheduled:
+            self.stdout.write(self.style.WARNING(
+                f"  Немає ресурсу для «{operation}»: замовлення #{order.pk}, {item.product}"
+            ))
+        for order, item in result.unrouted:
+            self.stdout.write(self.style.WARNING(
+                f"  Немає маршруту (норм): замовлення #{order.pk}, {item.product}"
+            ))
+        for order, finished in result.late:
+            self.stdout.write(self.style.WARNING(
+                f"  Не встигає: замовлення #{order.pk} — дедлайн {order.deadline:%d.%m.%Y}, "
+                f"завершення {localtime(finished):%d.%m.%Y %H:%M}"
+            ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from crm.reminders import send_task_reminders
+
+
+class Command(BaseCommand):
+    help = "Send daily digests of due and overdue tasks (use --loop to run as a worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Run forever, one tick per --interval")
+        parser.add_argument("--interval", type=int, default=300, help="Seconds between ticks")
+        parser.add_argument("--users-per-batch", type=int, default=200)
+
+    def handle(self, *args, **options):
+        while True:
+            tasks, messages = send_task_reminders(timezone.localdate(), users_per_batch=options["users_per_batch"])
+            if tasks:
+                self.stdout.write(self.style.SUCCESS(f"✔ Нагадування: задач {tasks}, листів {messages}"))
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import make_aware
+
+from manufacture.bulk import BulkSlotError, shift_slots
+from manufacture.models import ProductionSlot
+
+
+def _aware(value):
+    return make_aware(value) if value.tzinfo is None else value
+
+
+class Command(BaseCommand):
+    help = "Shift slots of a machine / work unit starting in [--start, --end) by --days/--hours with a single UPDATE"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--machine", type=int)
+        parser.add_argument("--work-unit", type=int)
+        parser.add_argument("--start", type=datetime.fromisoformat, required=True, help="YYYY-MM-DDTHH:MM")
+        parser.add_argument("--end", type=datetime.fromisoformat, required=True, help="YYYY-MM-DDTHH:MM")
+        parser.add_argument("--days", type=float, default=0, help="May be negative")
+        parser.add_argument("--hours", type=float, default=0, help="May be negative")
+
+    def handle(self, *args, **options):
+        if options["machine"] is None and options["work_unit"] is None:
+            raise CommandError("Вкажіть --machine або --work-unit.")
+        delta = timedelta(days=options["days"], hours=options["hours"])
+        if not delta:
+            raise CommandError("Вкажіть ненульовий зсув --days / --hours.")
+
+        slots = ProductionSlot.objects.filter(
+            start_datetime__gte=_aware(options["start"]), start_datetime__lt=_aware(options["end"])
+        )
+        if options["machine"] is not None:
+            slots = slots.filter(machine_id=options["machine"])
+        if options["work_unit"] is not None:
+            slots = slots.filter(work_unit_id=options["work_unit"])
+
+        try:
+            updated = shift_slots(slots, delta)
+        except BulkSlotError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"✔ Зсунуто на {delta}: {updated} слотів"))
@@ -0,0 +1,89 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# те, що робить кожен процес при старті: django.setup() (моделі, admin
+# autodiscover у AdminConfig.ready) і завантаження URLconf.
+# Модулі застосунків Django імпортує через importlib.import_module, якого
+# не бачить -X importtime, тому їх час міряємо обгорткою.
+STARTUP_CODE = """
+import importlib, json, sys, time
+import django.apps.config, django.urls.conf, django.urls.resolvers, django.utils.module_loading
+
+timings = {}
+
+def timed_import(name, package=None, _import=importlib.import_module):
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    try:
+        return _import(name, package)
+    finally:
+        timings.setdefault(name, time.perf_counter() - started)
+
+for module in (django.apps.config, django.urls.conf, django.urls.resolvers, django.utils.module_loading):
+    module.import_module = timed_import
+
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+sys.stderr.write("STARTUP_TIMINGS " + json.dumps(timings) + "\\n")
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure Django start-up: import time per app/package (python -X importtime) "
+        "and wall time of a fresh django.setup() over several runs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreter runs for the benchmark")
+        parser.add_argument("--top", type=int, default=15, help="How many packages/modules to list")
+
+    def run_startup(self, *flags):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE)}
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, *flags, "-c", STARTUP_CODE],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return time.perf_counter() - started, result.stderr
+
+    def handle(self, *args, **options):
+        _, report = self.run_startup("-X", "importtime")
+
+        # рядки виду "import time:  self [us] | cumulative | imported package"
+        by_package = defaultdict(int)
+        app_modules = {}
+        for line in report.splitlines():
+            if line.startswith("STARTUP_TIMINGS "):
+                app_modules = json.loads(line.split(" ", 1)[1])
+            elif line.startswith("import time:") and "[us]" not in line:
+                self_us, _, name = line[len("import time:"):].split("|")
+                by_package[name.strip().split(".")[0]] += int(self_us)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Модулі застосунків (import_module, сукупний час, мс):"))
+        for name, seconds in sorted(app_modules.items(), key=lambda kv: -kv[1])[: options["top"]]:
+            self.stdout.write(f"  {name:<40} {seconds * 1000:8.1f}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Інші імпорти за пакетами (власний час, мс):"))
+        for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[: options["top"]]:
+            self.stdout.write(f"  {package:<40} {us / 1000:8.1f}")
+
+        times = [self.run_startup()[0] for _ in range(options["repeat"])]
+        self.stdout.write(self.style.SUCCESS(
+            f"▶ Старт процесу Django: медіана {statistics.median(times) * 1000:.0f} мс, "
+            f"мін {min(times) * 1000:.0f} мс ({len(times)} запусків)"
+        ))
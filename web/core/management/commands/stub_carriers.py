@@ -0,0 +1,66 @@
+"""
+Локальна заглушка API перевізників для перевірки crm.tracking без реальних ключів.
+
+    python manage.py stub_carriers --port 8081
+    NOVA_POSHTA_API_URL=http://localhost:8081/novaposhta/
+    UKRPOSHTA_TRACKING_URL=http://localhost:8081/ukrposhta/
+
+Статус ТТН детермінований (залежить від номера); --delivered — частка
+доставлених, --rate — скільки запитів на секунду приймається до відповіді 429.
+"""
+import zlib
+
+from django.core.management.base import BaseCommand
+
+from core.stub_http import StubHandler, StubServer
+
+NOVA_POSHTA_STATUSES = [("4", "У місті отримувача"), ("7", "Прибув у відділення"), ("9", "Отримано")]
+UKRPOSHTA_STATUSES = [("20700", "Відправлення в дорозі"), ("21500", "Надійшло у відділення"), ("41000", "Вручено")]
+
+
+class Handler(StubHandler):
+    def _status(self, number, statuses):
+        bucket = zlib.crc32(number.encode()) % 100
+        if bucket < self.server.delivered * 100:
+            return statuses[-1]
+        return statuses[bucket % (len(statuses) - 1)]
+
+    def do_POST(self):
+        payload = self.read_json()
+        if not self.throttle():
+            return
+
+        if self.path.startswith("/novaposhta"):
+            data = []
+            for document in payload["methodProperties"]["Documents"]:
+                code, text = self._status(document["DocumentNumber"], NOVA_POSHTA_STATUSES)
+                data.append({"Number": document["DocumentNumber"], "StatusCode": code, "Status": text})
+            return self.reply(200, {"success": True, "data": data, "errors": []})
+        if self.path.startswith("/ukrposhta"):
+            data = []
+            for barcode in payload:
+                event, name = self._status(barcode, UKRPOSHTA_STATUSES)
+                data.append({"barcode": barcode, "event": event, "eventName": name})
+            return self.reply(200, data)
+        return self.reply(404, {"error": "Not found"})
+
+
+class Command(BaseCommand):
+    help = "Run a local stub of Nova Poshta / Ukrposhta tracking APIs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8081)
+        parser.add_argument("--rate", type=int, default=20, help="Requests per second before 429")
+        parser.add_argument("--latency", type=float, default=0.2, help="Seconds per response")
+        parser.add_argument("--delivered", type=float, default=0.3, help="Share of delivered parcels")
+        parser.add_argument("--verbose", action="store_true")
+
+    def handle(self, *args, **options):
+        server = StubServer(
+            (options["host"], options["port"]), Handler,
+            options["rate"], options["latency"], options["verbose"],
+        )
+        server.delivered = options["delivered"]
+        self.stdout.write(f"Заглушка перевізників: http://{options['host']}:{options['port']}/novaposhta/, /ukrposhta/")
+        server.run()
@@ -0,0 +1,154 @@
+"""
+Локальна заглушка API маркетплейсів для перевірки crm.marketplaces без реальних ключів.
+
+    python manage.py stub_marketplaces --port 8082
+    PROM_API_URL=http://localhost:8082/prom/   (так само rozetka, olx, site)
+
+Оголошення створюються при першому зверненні з детермінованою ціною
+і зберігаються в пам’яті. Prom, Rozetka та OLX віддають ETag / Last-Modified
+і відповідають 304 на умовний запит; «сайт» валідаторів не має (завжди 200).
+--drift — імовірність, що оголошення «змінять вручну» між запитами.
+"""
+import random
+import re
+import threading
+import zlib
+from email.utils import formatdate
+
+from django.core.management.base import BaseCommand
+
+from core.stub_http import StubHandler, StubServer
+
+ROUTES = {
+    "prom": re.compile(r"^/prom/products/(\w+)$"),
+    "rozetka": re.compile(r"^/rozetka/items/(\w+)$"),
+    "olx": re.compile(r"^/olx/adverts/(\w+)$"),
+    "site": re.compile(r"^/site/products/([\w-]+)$"),
+}
+
+
+def _render(marketplace, listing_id, listing):
+    price, available = listing["price"], listing["available"]
+    if marketplace == "prom":
+        return {"product": {"id": int(listing_id), "price": price, "presence": "available" if available else "not_available"}}
+    if marketplace == "rozetka":
+        return {"success": True, "content": {"id": int(listing_id), "price": price,
+                                             "sell_status": "available" if available else "unavailable"}}
+    if marketplace == "olx":
+        return {"data": {"id": listing_id, "price": {"value": price, "currency": "UAH"},
+                         "status": "active" if available else "inactive"}}
+    return {"slug": listing_id, "price": price, "available": available}
+
+
+def _apply(marketplace, listing, body):
+    if marketplace == "prom":
+        listing["price"] = body["price"]
+        listing["available"] = body["presence"] == "available"
+    elif marketplace == "rozetka":
+        listing["price"] = body["price"]
+        listing["available"] = body["sell_status"] == "available"
+    elif marketplace == "olx":
+        listing["price"] = body["price"]["value"]
+        listing["available"] = body["status"] == "active"
+    else:
+        listing["price"] = body["price"]
+        listing["available"] = body["available"]
+
+
+class Handler(StubHandler):
+    def _listing(self, marketplace, listing_id):
+        server = self.server
+        with server.lock:
+            key = (marketplace, listing_id)
+            listing = server.listings.get(key)
+            if listing is None:
+                price = 100 + zlib.crc32(f"{marketplace}:{listing_id}".encode()) % 900
+                listing = server.listings[key] = {"price": price, "available": True, "version": 1}
+            elif random.random() < server.drift:
+                listing["price"] += 1
+                listing["version"] += 1
+            return listing
+
+    def _validators(self, marketplace, listing):
+        if marketplace == "site":
+            return []
+        return [
+            ("ETag", f'"{listing["version"]}"'),
+            ("Last-Modified", formatdate(1_700_000_000 + listing["version"], usegmt=True)),
+        ]
+
+    def _route(self):
+        for marketplace, pattern in ROUTES.items():
+            match = pattern.match(self.path)
+            if match:
+                return marketplace, match.group(1)
+        return None, None
+
+    def do_GET(self):
+        if not self.throttle():
+            return
+        marketplace, listing_id = self._route()
+        if marketplace is None:
+            return self.reply(404, {"error": "Not found"})
+        listing = self._listing(marketplace, listing_id)
+        validators = self._validators(marketplace, listing)
+        if validators and self.headers.get("If-None-Match") == validators[0][1]:
+            self.server.stats["304"] += 1
+            return self.reply(304, None, validators)
+        self.server.stats["200"] += 1
+        return self.reply(200, _render(marketplace, listing_id, listing), validators)
+
+    def do_POST(self):
+        body = self.read_json()
+        if not self.throttle():
+            return
+        if self.path != "/prom/products/edit":
+            return self.reply(404, {"error": "Not found"})
+        for item in body:
+            listing = self._listing("prom", str(item["id"]))
+            with self.server.lock:
+                _apply("prom", listing, item)
+                listing["version"] += 1
+        self.server.stats["push"] += 1
+        return self.reply(200, {"processed_ids": [item["id"] for item in body], "errors": {}})
+
+    def do_PUT(self):
+        body = self.read_json()
+        if not self.throttle():
+            return
+        marketplace, listing_id = self._route()
+        if marketplace is None or marketplace == "prom":
+            return self.reply(404, {"error": "Not found"})
+        listing = self._listing(marketplace, listing_id)
+        with self.server.lock:
+            _apply(marketplace, listing, body)
+            listing["version"] += 1
+        self.server.stats["push"] += 1
+        return self.reply(200, _render(marketplace, listing_id, listing), self._validators(marketplace, listing))
+
+
+class Command(BaseCommand):
+    help = "Run a local stub of Prom / Rozetka / OLX / site listing APIs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8082)
+        parser.add_argument("--rate", type=int, default=50, help="Requests per second before 429")
+        parser.add_argument("--latency", type=float, default=0.1, help="Seconds per response")
+        parser.add_argument("--drift", type=float, default=0.0, help="Chance a listing changes between requests")
+        parser.add_argument("--verbose", action="store_true")
+
+    def handle(self, *args, **options):
+        server = StubServer(
+            (options["host"], options["port"]), Handler,
+            options["rate"], options["latency"], options["verbose"],
+        )
+        server.lock = threading.Lock()
+        server.listings = {}
+        server.drift = options["drift"]
+        server.stats = {"200": 0, "304": 0, "push": 0}
+        self.stdout.write(
+            f"Заглушка маркетплейсів: http://{options['host']}:{options['port']}/prom/, /rozetka/, /olx/, /site/"
+        )
+        server.run()
+        self.stdout.write(f"Відповідей 200: {server.stats['200']}, 304: {server.stats['304']}, змін: {server.stats['push']}")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.marketplaces import sync_marketplaces
+from crm.models import MarketplaceListing
+
+
+class Command(BaseCommand):
+    help = "Sync product prices and availability with marketplace listings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--marketplace", action="append", choices=MarketplaceListing.Marketplace.values,
+            help="Only this marketplace (repeatable; default: all configured)",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Fetch and compare only, push nothing")
+        parser.add_argument("--concurrency", type=int, default=None)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = sync_marketplaces(
+            names=options["marketplace"], push=not options["dry_run"], concurrency=options["concurrency"],
+        )
+        if not result:
+            self.stdout.write("Немає налаштованих маркетплейсів (MARKETPLACE_API) або посилань у товарах")
+            return
+        summary = ", ".join(f"{key}: {value}" for key, value in sorted(result.items()))
+        self.stdout.write(self.style.SUCCESS(f"✔ Маркетплейси: {summary} за {time.monotonic() - started:.1f} с"))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.tracking import sync_tracking
+
+
+class Command(BaseCommand):
+    help = "Sync parcel statuses of shipped orders with carriers (use --loop to run as a worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Run forever, one sync per --interval")
+        parser.add_argument("--interval", type=int, default=600, help="Seconds between syncs")
+        parser.add_argument(
+            "--recheck", type=int, default=None,
+            help="Skip parcels checked within this many seconds (default: TRACKING_RECHECK_SECONDS)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            result = sync_tracking(recheck_seconds=options["recheck"])
+            self.stdout.write(self.style.SUCCESS(
+                f"✔ Трекінг: перевірено {result.checked}, пропущено {result.skipped}, "
+                f"змінено {result.changed}, доставлено {result.delivered}, помилок {result.failed} "
+                f"за {time.monotonic() - started:.1f} с"
+            ))
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -1,3 +1,129 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import Avg, F, OuterRef, Subquery
+from django.utils import timezone
 
-# Create your models here.
+
+class ChangeLogQuerySet(models.QuerySet):
+    def for_object(self, obj):
+        return self.filter(model=obj._meta.label_lower, object_id=obj.pk)
+
+    def field_history(self, obj, field):
+        return self.for_object(obj).filter(field=field).order_by("changed_at", "id")
+
+    def status_history(self, order):
+        """Історія статусів замовлення (індекс model/object_id/field/changed_at)."""
+        return self.field_history(order, "status")
+
+    def average_transition_time(self, model_label, field, from_value, to_value):
+        """
+        Середній час від першого переходу field у from_value до переходу в to_value,
+        напр. ("crm.order", "status", "new", "shipped"). Повертає timedelta або None.
+        """
+        entered = (
+            self.filter(
+                model=model_label,
+                field=field,
+                new_value=from_value,
+                object_id=OuterRef("object_id"),
+            )
+            .order_by("changed_at")
+            .values("changed_at")[:1]
+        )
+        return (
+            self.filter(model=model_label, field=field, new_value=to_value)
+            .annotate(entered_at=Subquery(entered))
+            .exclude(entered_at=None)
+            .aggregate(avg=Avg(F("changed_at") - F("entered_at")))["avg"]
+        )
+
+
+class ChangeLog(models.Model):
+    """
+    Журнал змін полів (тільки додавання). Пишеться після коміту пачками
+    (core.changelog), а не окремим INSERT на кожне поле.
+    """
+    model = models.CharField("Модель", max_length=100)
+    object_id = models.BigIntegerField("ID об’єкта")
+    field = models.CharField("Поле", max_length=100)
+    old_value = models.TextField("Було", null=True, blank=True)
+    new_value = models.TextField("Стало", null=True, blank=True)
+    changed_at = models.DateTimeField("Коли")
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="+",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Хто",
+    )
+    # перше число місяця: ретеншн видаляє цілі місяці по індексу (prune_change_log)
+    month = models.DateField("Місяць")
+
+    objects = ChangeLogQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Запис журналу змін"
+        verbose_name_plural = "Журнал змін"
+        ordering = ["-changed_at", "-id"]
+        indexes = [
+            models.Index(fields=["model", "object_id", "field", "changed_at"]),
+            models.Index(fields=["model", "field", "new_value", "changed_at"]),
+            models.Index(fields=["month"]),
+        ]
+
+    def __str__(self):
+        return f"{self.model}#{self.object_id}.{self.field}: {self.old_value} → {self.new_value}"
+
+
+class Job(models.Model):
+    """
+    Фонова задача для воркера run_jobs (черга в PostgreSQL, без брокера).
+    Виконані задачі видаляються, невдалі лишаються для розбору.
+    """
+    class Status(models.TextChoices):
+        QUEUED = "queued", "В черзі"
+        RUNNING = "running", "Виконується"
+        FAILED = "failed", "Помилка"
+
+    name = models.CharField("Задача", max_length=200)
+    payload = models.JSONField("Параметри", default=dict, blank=True)
+    status = models.CharField(
+        "Статус",
+        max_length=16,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    priority = models.SmallIntegerField("Пріоритет", default=0, help_text="Більше — раніше")
+    attempts = models.PositiveSmallIntegerField("Спроб", default=0)
+    max_attempts = models.PositiveSmallIntegerField("Макс. спроб", default=3)
+    run_at = models.DateTimeField("Виконати після", default=timezone.now)
+    # однакові задачі в черзі не дублюються (напр. "crm.refresh_order_summary:order_id=5")
+    dedupe_key = models.CharField("Ключ дедуплікації", max_length=255, blank=True)
+
+    locked_at = models.DateTimeField("Взято в роботу", null=True, blank=True)
+    locked_by = models.CharField("Воркер", max_length=100, blank=True)
+    last_error = models.TextField("Остання помилка", blank=True)
+    created_at = models.DateTimeField("Створено", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Фонова задача"
+        verbose_name_plural = "Фонові задачі"
+        ordering = ["-priority", "run_at", "id"]
+        indexes = [
+            models.Index(
+                fields=["-priority", "run_at", "id"],
+                condition=models.Q(status="queued"),
+                name="core_job_queued_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status="queued") & ~models.Q(dedupe_key=""),
+                name="core_job_unique_queued_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
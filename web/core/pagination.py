@@ -0,0 +1,68 @@
+"""
+Приблизні COUNT(*) для великих списків адмінки.
+
+На великих таблицях точний COUNT(*) з фільтрами читає весь індекс або таблицю.
+EstimatedCountPaginator бере оцінку планувальника PostgreSQL
+(pg_class.reltuples без фільтрів, EXPLAIN з фільтрами) і рахує точно,
+лише якщо оцінка менша за поріг — там COUNT(*) дешевий.
+"""
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """Оцінка кількості рядків від планувальника PostgreSQL або None."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    query = queryset.order_by().query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # -1 — таблицю ще не аналізували
+            if row and row[0] >= 0:
+                return int(row[0])
+            return None
+
+        sql, params = query.sql_with_params()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    # менше — рахуємо точно
+    exact_count_threshold = 10000
+    # True — count це оцінка; список адмінки показує її як «≈ N»
+    # (admin/<app>/pagination.html)
+    is_estimate = False
+
+    @cached_property
+    def count(self):
+        estimate = None
+        if hasattr(self.object_list, "query"):
+            estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_count_threshold:
+            self.is_estimate = False
+            return super().count
+        self.is_estimate = True
+        return estimate
+
+
+class EstimatedCountAdminMixin:
+    """
+    Для ModelAdmin: кількість результатів — оцінкою (EstimatedCountPaginator),
+    без другого COUNT(*) на «показати всі N» при фільтрах.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,67 @@
+"""
+Основа локальних заглушок зовнішніх API (stub_carriers, stub_marketplaces):
+багатопотоковий HTTP-сервер з keep-alive, затримкою відповіді та лімітом
+запитів на секунду (понад ліміт — 429 з Retry-After).
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, як у справжніх API
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+    def read_json(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+
+    def reply(self, code, payload=None, headers=()):
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(code)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def throttle(self):
+        """False (і вже відправлена 429), якщо ліміт запитів вичерпано; інакше — затримка відповіді."""
+        if not self.server.allow():
+            self.reply(429, {"error": "Too Many Requests"}, [("Retry-After", "1")])
+            return False
+        time.sleep(self.server.latency)
+        return True
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, rate, latency, verbose=False):
+        super().__init__(address, handler)
+        self.rate = rate
+        self.latency = latency
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._window = (0, 0)  # (секунда, запитів у ній)
+
+    def allow(self):
+        with self._lock:
+            second = int(time.monotonic())
+            current, count = self._window
+            count = count + 1 if current == second else 1
+            self._window = (second, count)
+            return count <= self.rate
+
+    def run(self):
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server_close()
@@ -1,10 +1,55 @@
-from multiprocessing.connection import Client
-
-from django.contrib import admin
-from django.urls import reverse
-from django.utils.html import format_html
-from .models import Contact, Tag, Order, Task, Product, OrderItem, Client
-from manufacture.models import ProductionSlot
+import csv
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, F, Prefetch, Sum, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from core.models import ChangeLog
+from core.db import use_replica
+from core.pagination import EstimatedCountAdminMixin
+from . import bulk, catalog, dedup, segments
+from .models import (
+    Contact, Tag, Order, Task, Product, OrderItem, Client, ArchivedOrder, ArchivedOrderItem, MarketplaceListing,
+    DuplicateCandidate, Segment, SegmentMember,
+)
+from manufacture import norms
+from manufacture.models import ProductionSlot, ArchivedProductionSlot, RouteOperation
+
+
+class CachedLabelAutocompleteSelect(AutocompleteSelect):
+    """
+    AutocompleteSelect, який бере підписи вибраних значень зі спільного словника
+    ``labels`` замість окремого запиту на кожен рядок інлайну.
+    Словник спільний для всіх копій віджета (ChoiceWidget копіюється поверхнево).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.labels = {}
+
+    def optgroups(self, name, value, attr=None):
+        selected_choices = [
+            str(v) for v in value if str(v) not in self.choices.field.empty_values
+        ]
+        if any(v not in self.labels for v in selected_choices):
+            return super().optgroups(name, value, attr)
+
+        default = (None, [], 0)
+        if not self.is_required and not self.allow_multiple_selected:
+            default[1].append(self.create_option(name, "", "", False, 0))
+        for v in selected_choices:
+            default[1].append(
+                self.create_option(name, v, self.labels[v], set(selected_choices), len(default[1]))
+            )
+        return [default]
 
 
 @admin.register(Tag)
@@ -35,28 +80,205 @@ class ContactInline(admin.TabularInline):
     show_change_link = True
 
 
+class SegmentListFilter(admin.SimpleListFilter):
+    """Клієнти збереженого сегмента — по готовому складу, без з’єднань з тегами."""
+    title = "Сегмент"
+    parameter_name = "segment"
+
+    def lookups(self, request, model_admin):
+        return Segment.objects.values_list("pk", "name")
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(
+                pk__in=SegmentMember.objects.filter(segment_id=self.value()).values("client_id")
+            )
+        return queryset
+
+
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
-    list_display = ("name", "client_type", "tax_code", "phones", "email", "source", "created_at")
-    list_filter = ("client_type", "source", "tags")
+class ClientAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "name", "client_type", "tax_code", "phones", "email", "source",
+        "lifetime_value", "last_order_at", "overview_link", "created_at",
+    )
+    list_filter = ("client_type", "source", SegmentListFilter, "tags")
     search_fields = ("name", "tax_code", "phones", "email")
     filter_horizontal = ("tags",)
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = (
+        "created_at", "updated_at", "lifetime_value", "orders_count", "last_order_at", "overview_link",
+    )
 
     inlines = [ContactInline]
+    actions = ["merge_clients"]
 
     fieldsets = (
         ("Основна інформація", {
             "fields": ("name", "client_type", "tax_code", "phones", "email", "source", "tags")
         }),
         ("Примітки", {"fields": ("notes",)}),
+        ("Показники", {"fields": ("lifetime_value", "orders_count", "last_order_at", "overview_link")}),
         ("Службова інформація", {"fields": ("created_at", "updated_at")}),
     )
 
+    # скільки останніх замовлень показувати на сторінці огляду
+    overview_orders_limit = 100
+
+    @admin.action(description="Об’єднати вибраних клієнтів (у найстарішого)")
+    def merge_clients(self, request, queryset):
+        clients = list(queryset.order_by("created_at", "id"))
+        if len(clients) < 2:
+            self.message_user(request, "Виберіть щонайменше двох клієнтів", messages.WARNING)
+            return
+        merged = dedup.merge_clients(clients[0], clients[1:])
+        self.message_user(request, f"Об’єднано клієнтів: {merged} → «{clients[0]}»", messages.SUCCESS)
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                "<path:object_id>/overview/",
+                self.admin_site.admin_view(use_replica(self.overview_view)),
+                name="crm_client_overview",
+            ),
+        ]
+        return custom_urls + urls
+
+    @admin.display(description="Огляд")
+    def overview_link(self, obj):
+        if obj.pk is None:
+            return "—"
+        url = reverse("admin:crm_client_overview", args=[obj.pk])
+        return format_html('<a href="{}">Огляд клієнта</a>', url)
+
+    def overview_view(self, request, object_id):
+        """
+        Вся історія клієнта на одній сторінці: контакти, замовлення з сумами,
+        відкриті задачі та заплановані слоти. Кожен блок — один запит,
+        LTV і дата останнього замовлення беруться з кешованих полів Client.
+        """
+        client = get_object_or_404(Client.objects.prefetch_related("tags"), pk=object_id)
+        if not self.has_view_permission(request, client):
+            raise PermissionDenied
+
+        contacts = (
+            client.contacts.annotate(orders_total=Count("orders"))
+            .prefetch_related("tags")
+            .order_by("full_name")
+        )
+        orders = (
+            Order.objects.filter(contact__client=client)
+            .select_related("contact")
+            .annotate(items_sum=Sum(F("items__unit_price") * F("items__quantity")))
+            .order_by("-created_at")[: self.overview_orders_limit]
+        )
+        tasks = (
+            Task.objects.filter(contact__client=client, status=False)
+            .select_related("contact", "assigned_to")
+            .order_by("date", "id")
+        )
+        slots = (
+            ProductionSlot.objects.filter(order__contact__client=client, end_datetime__gte=timezone.now())
+            .select_related("order", "machine", "work_unit")
+            .order_by("start_datetime", "id")
+        )
+
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            client=client,
+            title=f"Огляд клієнта: {client}",
+            contacts=contacts,
+            orders=orders,
+            orders_limit=self.overview_orders_limit,
+            tasks=tasks,
+            slots=slots,
+        )
+        return TemplateResponse(request, "admin/client_overview.html", context)
+
+
+class _Echo:
+    """Псевдобуфер для csv.writer: рядок одразу віддається у StreamingHttpResponse."""
+
+    def write(self, value):
+        return value
+
+
+@admin.register(Segment)
+class SegmentAdmin(admin.ModelAdmin):
+    list_display = ("name", "member_count", "refreshed_at", "clients_link")
+    readonly_fields = ("member_count", "refreshed_at", "clients_link")
+    filter_horizontal = ("tags",)
+    actions = ["refresh", "export_csv"]
+    fieldsets = (
+        (None, {"fields": ("name",)}),
+        ("Умови (усі одночасно)", {
+            "fields": (
+                "tags", ("source", "client_type"), "ordered_within_days",
+                ("min_lifetime_value", "min_orders_count"),
+            ),
+        }),
+        ("Склад", {"fields": ("member_count", "refreshed_at", "clients_link")}),
+    )
+
+    @admin.display(description="Клієнти")
+    def clients_link(self, obj):
+        if obj.pk is None:
+            return "—"
+        url = reverse("admin:crm_client_changelist") + f"?segment={obj.pk}"
+        return format_html('<a href="{}">Відкрити список ({})</a>', url, obj.member_count)
+
+    @admin.action(description="Перерахувати склад")
+    def refresh(self, request, queryset):
+        for segment in queryset.prefetch_related("tags"):
+            segments.refresh_segment(segment)
+        self.message_user(request, "Склад сегментів оновлено", messages.SUCCESS)
+
+    @admin.action(description="Експорт клієнтів у CSV")
+    def export_csv(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Для експорту виберіть один сегмент", messages.WARNING)
+            return None
+        segment = queryset.get()
+        writer = csv.writer(_Echo())
+        response = StreamingHttpResponse(
+            (writer.writerow(row) for row in segments.export_rows(segment)),
+            content_type="text/csv; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="segment-{segment.pk}.csv"'
+        return response
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    """Пари з crm.dedup (команда find_duplicate_clients): об’єднати або відхилити."""
+    list_display = ("client_a", "client_b", "score", "reasons", "status", "created_at")
+    list_filter = ("status",)
+    list_select_related = ("client_a", "client_b")
+    search_fields = ("client_a__name", "client_b__name")
+    actions = ["merge", "dismiss"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Об’єднати (дублікат → клієнт)")
+    def merge(self, request, queryset):
+        merged = dedup.merge_candidates(queryset.filter(status=DuplicateCandidate.Status.NEW))
+        self.message_user(request, f"Об’єднано клієнтів: {merged}", messages.SUCCESS)
+
+    @admin.action(description="Не дублікати")
+    def dismiss(self, request, queryset):
+        updated = queryset.update(status=DuplicateCandidate.Status.DISMISSED)
+        self.message_user(request, f"Відхилено пар: {updated}", messages.SUCCESS)
+
 
 @admin.register(Contact)
-class ContactAdmin(admin.ModelAdmin):
+class ContactAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ("full_name", "client", "position", "phone", "email", "source", "created_at")
+    list_select_related = ("client",)
     list_filter = ("source", "tags", "created_at")
     search_fields = ("full_name", "position", "phone", "email", "client__name", "client__tax_code")
     autocomplete_fields = ("client",)
@@ -76,13 +298,55 @@ class ProductionSlotInline(admin.TabularInline):
     extra = 0
     fields = ["machine", "work_unit", "start_datetime", "end_datetime", "comment"]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("machine", "work_unit")
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name in ("machine", "work_unit"):
+            # один список варіантів на запит, а не SELECT на кожен рядок інлайну
+            cache = request.__dict__.setdefault("_slot_inline_choices", {})
+            if db_field.name not in cache:
+                cache[db_field.name] = [
+                    (getattr(value, "value", value), label) for value, label in formfield.choices
+                ]
+            formfield.choices = cache[db_field.name]
+        return formfield
+
+
+class RouteOperationInline(admin.TabularInline):
+    model = RouteOperation
+    extra = 0
+    fields = ["sequence", "name", "machine_type", "work_unit_type", "setup_minutes", "minutes_per_unit"]
+
+
+class MarketplaceListingInline(admin.TabularInline):
+    """Стан синхронізації з маркетплейсами (crm.marketplaces) — лише перегляд."""
+    model = MarketplaceListing
+    extra = 0
+    fields = ["marketplace", "external_id", "remote_price", "remote_available", "synced_at", "pushed_at", "last_error"]
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ["name", "sku", "base_price", "is_active"]
     list_filter = ["is_active"]
+    inlines = [RouteOperationInline, MarketplaceListingInline]
     search_fields = ["name", "sku", "description", "technical_description"]
 
+    def get_search_results(self, request, queryset, search_term):
+        # автодоповнення в позиціях замовлення — за довідником у пам’яті
+        # (префікс назви / артикул), без пошуку по текстових описах
+        match = request.resolver_match
+        if match is not None and match.url_name == "autocomplete":
+            ids = catalog.search_products(search_term, limit=100)
+            return queryset.filter(pk__in=ids), False
+        return super().get_search_results(request, queryset, search_term)
+
     fieldsets = (
         ("Основна інформація", {
             "fields": ("name", "sku", "is_active")
@@ -108,9 +372,36 @@ class OrderItemInline(admin.TabularInline):
     autocomplete_fields = ["product"]
     fields = ["product", "quantity", "unit_price", "comment"]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product")
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "product":
+            kwargs["widget"] = CachedLabelAutocompleteSelect(
+                db_field, self.admin_site, using=kwargs.get("using")
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        if obj is not None and "product" in formset.form.base_fields:
+            # підписи товарів з позицій, уже підтягнутих у OrderAdmin.get_object
+            widget = formset.form.base_fields["product"].widget
+            widget = getattr(widget, "widget", widget)
+            widget.labels.update(
+                (str(item.product_id), str(item.product)) for item in obj.items.all()
+            )
+        return formset
+
+
+class OrderActionForm(ActionForm):
+    status = forms.ChoiceField(
+        label="Новий статус", choices=[("", "—")] + Order.Status.choices, required=False
+    )
+
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = [
         "title_display",
         "contact",
@@ -120,15 +411,24 @@ class OrderAdmin(admin.ModelAdmin):
         "payment_amount",
         "payment_type",
         "delivery_method",
+        "estimated_hours",
     ]
     list_filter = ["status", "payment_type", "delivery_method"]
+    # підпис контакту бере клієнта — без запиту на кожен рядок
+    list_select_related = ("contact__client",)
     search_fields = ["title", "contact__full_name", "contact__phone", "contact__email", "tracking_number"]
     date_hierarchy = "created_at"
     ordering = ["-created_at"]
+    autocomplete_fields = ["contact"]
 
     inlines = [OrderItemInline, ProductionSlotInline]
+    actions = ["schedule_production", "change_status"]
+    action_form = OrderActionForm
 
-    readonly_fields = ["created_at", "items_total", "title", "copy_delivery_request"]
+    readonly_fields = [
+        "created_at", "items_total", "title", "copy_delivery_request", "status_history", "production_estimate",
+        "tracking_status", "tracking_updated_at",
+    ]
 
     fieldsets = (
         ("Основна інформація", {
@@ -140,6 +440,9 @@ class OrderAdmin(admin.ModelAdmin):
                 "comment",
             )
         }),
+        ("Виробництво", {
+            "fields": ("production_estimate",),
+        }),
         ("Доставка", {
             "fields": (
                 "delivery_method",      # спосіб доставки
@@ -147,6 +450,7 @@ class OrderAdmin(admin.ModelAdmin):
                 "recipient",            # ім’я отримувача
                 "recipient_phone",      # ✅ нове поле
                 "tracking_number",
+                ("tracking_status", "tracking_updated_at"),
                 "copy_delivery_request" # ✅ копіювання в 1 клік
             ),
         }),
@@ -158,13 +462,102 @@ class OrderAdmin(admin.ModelAdmin):
                 "items_total",
             )
         }),
+        ("Історія", {
+            "classes": ("collapse",),
+            "fields": ("status_history",),
+        }),
     )
 
-    def save_related(self, request, form, formsets, change):
-        super().save_related(request, form, formsets, change)
-        # Після того як інлайни (OrderItem) збережені — перераховуємо title
-        obj = form.instance
-        obj.refresh_title(save=True)
+    @admin.action(description="Запланувати виробництво (за маршрутами)")
+    def schedule_production(self, request, queryset):
+        from manufacture.scheduler import OPEN_STATUSES, schedule_orders
+
+        # замовлення, які вже мають слоти, не переплановуємо
+        result = schedule_orders(queryset.filter(status__in=OPEN_STATUSES, slots__isnull=True))
+        scheduled = len({slot.order_id for slot in result.slots})
+        self.message_user(request, f"Заплановано замовлень: {scheduled}, слотів: {len(result.slots)}", messages.SUCCESS)
+        for order, finished in result.late:
+            self.message_user(
+                request,
+                f"{order}: не встигає до дедлайну (завершення {timezone.localtime(finished):%d.%m.%Y %H:%M})",
+                messages.WARNING,
+            )
+        if result.unscheduled:
+            missing = sorted({str(operation) for _, _, operation in result.unscheduled})
+            self.message_user(request, f"Немає ресурсів для операцій: {', '.join(missing)}", messages.WARNING)
+        if result.unrouted:
+            missing = sorted({item.product.name for _, item in result.unrouted})
+            self.message_user(request, f"Немає маршруту (норм) для продуктів: {', '.join(missing)}", messages.WARNING)
+
+    @admin.action(description="Змінити статус (вибраний поруч)", permissions=["change"])
+    def change_status(self, request, queryset):
+        status = request.POST.get("status")
+        if status not in Order.Status.values:
+            self.message_user(request, "Оберіть новий статус поруч із дією.", messages.ERROR)
+            return
+        updated = bulk.change_status(queryset, status)
+        self.message_user(
+            request, f"Статус «{Order.Status(status).label}» встановлено для замовлень: {updated}", messages.SUCCESS
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        match = request.resolver_match
+        if match is not None and match.url_name == "autocomplete":
+            # підпис (__str__) бере контакт і збережену суму — без запитів на рядок
+            queryset = queryset.select_related("contact")
+            if request.GET.get("app_label") == "manufacture" and request.GET.get("field_name") == "order":
+                # слоти й повторювані слоти плануються лише для відкритих замовлень
+                queryset = queryset.exclude(status__in=[Order.Status.COMPLETED, Order.Status.CANCELED])
+        return queryset, may_have_duplicates
+
+    def lookup_allowed(self, lookup, value, request):
+        # посилання «Усі замовлення клієнта» зі сторінки огляду клієнта
+        if lookup == "contact__client__id__exact":
+            return True
+        return super().lookup_allowed(lookup, value, request)
+
+    def get_object(self, request, object_id, from_field=None):
+        obj = super().get_object(request, object_id, from_field)
+        if obj is not None:
+            # позиції з товарами — для інлайну, суми та заголовка форми
+            prefetch_related_objects(
+                [obj],
+                "contact__client",
+                Prefetch("items", queryset=OrderItem.objects.select_related("product")),
+            )
+        return obj
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        # трудомісткість усієї сторінки — один запит по позиціях, норми з пам’яті
+        estimates = norms.estimate_orders([order.pk for order in changelist.result_list])
+        for order in changelist.result_list:
+            order.production_minutes = estimates.get(order.pk, {})
+        return changelist
+
+    @admin.display(description="Трудомісткість, год")
+    def estimated_hours(self, obj):
+        minutes = getattr(obj, "production_minutes", None)
+        return norms.total_hours(minutes) if minutes else "—"
+
+    @admin.display(description="Трудомісткість за нормами")
+    def production_estimate(self, obj):
+        if obj.pk is None:
+            return "—"
+        # позиції вже підтягнуті в get_object
+        minutes = norms.estimate((obj.pk, item.product_id, item.quantity) for item in obj.items.all()).get(obj.pk)
+        if not minutes:
+            return "Для товарів замовлення немає маршрутів"
+        rows = [
+            (norms.resource_label(key), round(value / 60, 1))
+            for key, value in sorted(minutes.items(), key=lambda entry: -entry[1])
+        ]
+        return format_html(
+            "<ul>{}</ul><strong>Разом: {} год</strong>",
+            format_html_join("", "<li>{} — {} год</li>", rows),
+            norms.total_hours(minutes),
+        )
 
     @admin.display(description="Назва замовлення")
     def title_display(self, obj):
@@ -174,6 +567,24 @@ class OrderAdmin(admin.ModelAdmin):
         return obj.calculate_items_total()
     items_total.short_description = "Сума по позиціях"
 
+    @admin.display(description="Історія статусів")
+    def status_history(self, obj):
+        if obj.pk is None:
+            return "—"
+        status_labels = dict(Order.Status.choices)
+        rows = [
+            (
+                entry.changed_at.strftime("%d.%m.%Y %H:%M"),
+                status_labels.get(entry.old_value, entry.old_value or "—"),
+                status_labels.get(entry.new_value, entry.new_value),
+                f" ({entry.changed_by})" if entry.changed_by else "",
+            )
+            for entry in ChangeLog.objects.status_history(obj).select_related("changed_by")
+        ]
+        if not rows:
+            return "—"
+        return format_html("<ul>{}</ul>", format_html_join("", "<li>{} — {} → {}{}</li>", rows))
+
     @admin.display(description="Запит даних для доставки (копіювання)")
     def copy_delivery_request(self, obj):
         text = (
@@ -200,7 +611,7 @@ class OrderAdmin(admin.ModelAdmin):
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = [
         "title_link",     # клик по задаче ведёт на картку клієнта
         "contact_link",
@@ -236,3 +647,51 @@ class TaskAdmin(admin.ModelAdmin):
         client = Contact.objects.get(id=obj.contact.id)
         url = reverse("admin:crm_contact_change", args=[obj.contact_id])
         return format_html('<a href="{}">{}</a>', url, client.full_name)
+
+
+class ReadOnlyInlineMixin:
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedOrderItemInline(ReadOnlyInlineMixin, admin.TabularInline):
+    model = ArchivedOrderItem
+    fields = ["product", "quantity", "unit_price", "comment"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product")
+
+
+class ArchivedProductionSlotInline(ReadOnlyInlineMixin, admin.TabularInline):
+    model = ArchivedProductionSlot
+    fields = ["machine", "work_unit", "start_datetime", "end_datetime", "comment"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("machine", "work_unit")
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    """Архів замовлень (crm.archive) — лише перегляд."""
+    list_display = ["id", "title", "contact", "status", "total", "created_at", "closed_at"]
+    list_filter = ["status"]
+    search_fields = ["=id", "title", "contact__full_name", "contact__phone"]
+    list_select_related = ["contact"]
+    date_hierarchy = "closed_at"
+    inlines = [ArchivedOrderItemInline, ArchivedProductionSlotInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
@@ -0,0 +1,137 @@
+"""
+Архівація завершених і відмінених замовлень.
+
+Замовлення, закриті понад N місяців тому, разом із позиціями та слотами
+переносяться в архівні таблиці (ArchivedOrder, ArchivedOrderItem,
+ArchivedProductionSlot) пачками: кожна пачка — окрема коротка транзакція,
+рядки блокуються через SKIP LOCKED, тож архівацію можна запускати
+паралельно з роботою адмінки.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, Prefetch, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from manufacture.models import ArchivedProductionSlot, ProductionSlot, RecurringSlot
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ARCHIVE_STATUSES = (Order.Status.COMPLETED, Order.Status.CANCELED)
+
+# ці поля лежать в ArchivedOrder окремими колонками
+_COLUMNS = {"id", "contact_id", "title", "status", "total", "payment_amount", "created_at"}
+
+
+def archive_cutoff(months):
+    return timezone.now() - timedelta(days=30 * months)
+
+
+def archivable_orders(before):
+    return (
+        Order.objects.filter(status__in=ARCHIVE_STATUSES)
+        .annotate(
+            closed_at=Case(
+                When(status=Order.Status.COMPLETED, then=Coalesce("completed_at", "updated_at")),
+                default=Coalesce("canceled_at", "updated_at"),
+            )
+        )
+        .filter(closed_at__lt=before)
+        # активний шаблон ще матеріалізує слоти замовлення — таке не архівуємо
+        .exclude(recurring_slots__is_active=True)
+    )
+
+
+def _row_data(obj):
+    return {
+        f.attname: f.value_to_string(obj)
+        for f in obj._meta.concrete_fields
+        if f.attname not in _COLUMNS
+    }
+
+
+def archive_batch(before, batch_size=200):
+    """Переносить до batch_size замовлень; повертає кількість перенесених."""
+    with transaction.atomic():
+        orders = list(
+            archivable_orders(before)
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("id")
+            .prefetch_related(
+                Prefetch("items", queryset=OrderItem.objects.order_by("id")),
+                Prefetch("slots", queryset=ProductionSlot.objects.order_by("id")),
+            )[:batch_size]
+        )
+        if not orders:
+            return 0
+
+        archived, items, slots = [], [], []
+        for order in orders:
+            archived.append(ArchivedOrder(
+                id=order.pk,
+                contact_id=order.contact_id,
+                title=order.title or "",
+                status=order.status,
+                total=order.calculate_items_total(),
+                payment_amount=order.payment_amount,
+                created_at=order.created_at,
+                closed_at=order.closed_at,
+                data=_row_data(order),
+            ))
+            items.extend(
+                ArchivedOrderItem(
+                    order_id=order.pk,
+                    product_id=item.product_id,
+                    quantity=item.quantity,
+                    unit_price=item.unit_price,
+                    comment=item.comment,
+                )
+                for item in order.items.all()
+            )
+            slots.extend(
+                ArchivedProductionSlot(
+                    id=slot.pk,
+                    order_id=order.pk,
+                    machine_id=slot.machine_id,
+                    work_unit_id=slot.work_unit_id,
+                    start_datetime=slot.start_datetime,
+                    end_datetime=slot.end_datetime,
+                    comment=slot.comment,
+                )
+                for slot in order.slots.all()
+            )
+
+        ArchivedOrder.objects.bulk_create(archived)
+        ArchivedOrderItem.objects.bulk_create(items)
+        ArchivedProductionSlot.objects.bulk_create(slots)
+
+        # прямий DELETE без завантаження об’єктів і сигналів на кожен рядок
+        # (QuerySet.delete() збирав би каскад і слав post_delete по кожному слоту):
+        # показники клієнтів враховують архів, тож перераховувати нічого;
+        # вимкнені шаблони повторення видаляються, як їх видалив би CASCADE
+        ids = [order.pk for order in orders]
+        placeholders = ", ".join(["%s"] * len(ids))
+        with connection.cursor() as cursor:
+            for model, column in (
+                (ProductionSlot, "order_id"),
+                (RecurringSlot, "order_id"),
+                (OrderItem, "order_id"),
+                (Order, "id"),
+            ):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", ids)
+    return len(orders)
+
+
+def archive_orders(months=24, batch_size=200, max_batches=None):
+    """Архівує пачками, доки є що переносити; повертає загальну кількість."""
+    before = archive_cutoff(months)
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(before, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+    return total
@@ -0,0 +1,46 @@
+"""
+Масова зміна статусу замовлень одним UPDATE.
+
+Разом зі статусом виставляється час переходу (як Order.save), журнал змін
+пишеться одним пакетом, а показники клієнтів перераховуються по одній
+задачі на клієнта, а не на кожне замовлення.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from core import changelog, jobs
+from manufacture import recurrence
+
+from .models import Order
+
+
+@transaction.atomic
+def change_status(queryset, status):
+    """Переводить замовлення набору в status. Повертає кількість змінених."""
+    if status not in Order.Status.values:
+        raise ValueError(f"Невідомий статус замовлення: {status}")
+
+    # замовлення вже в цьому статусі не чіпаємо — час переходу лишається старим
+    changed = Order.objects.filter(pk__in=queryset.values("pk")).exclude(status=status)
+    old = dict(changed.select_for_update().values_list("pk", "status"))
+    if not old:
+        return 0
+    changed = Order.objects.filter(pk__in=old)
+
+    now = timezone.now()
+    values = {"status": status, "updated_at": now}
+    if status in Order.STATUS_TIMESTAMP_FIELDS:
+        values[Order.STATUS_TIMESTAMP_FIELDS[status]] = now
+    client_ids = set(changed.values_list("contact__client_id", flat=True))
+    updated = changed.update(**values)
+
+    changelog.log_update(Order, "status", old, status)
+    if status in (Order.Status.COMPLETED, Order.Status.CANCELED):
+        recurrence.deactivate_for_orders(list(old))
+    # LTV і кількість замовлень не рахують відмінені — статус на них впливає
+    jobs.enqueue_many_on_commit(
+        ("crm.refresh_client_metrics", {"client_id": client_id})
+        for client_id in client_ids
+        if client_id is not None
+    )
+    return updated
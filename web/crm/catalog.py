@@ -0,0 +1,91 @@
+"""
+Довідник активних товарів у пам’яті процесу (id, назва, артикул, базова ціна).
+
+Пошук для автодоповнення в позиціях замовлення — за префіксом назви
+(бінарний пошук по відсортованому списку) та артикулу, без запитів
+до текстових полів description / technical_description.
+Скидається після збереження чи видалення товару (crm.signals).
+"""
+from bisect import bisect_left
+from decimal import Decimal
+from typing import NamedTuple
+
+from core.localcache import VersionedCache
+
+
+class CatalogProduct(NamedTuple):
+    id: int
+    name: str
+    sku: str
+    base_price: Decimal | None
+
+    def __str__(self):
+        return f"{self.name} ({self.sku})" if self.sku else self.name
+
+
+class Catalog:
+    def __init__(self, products):
+        self.by_id = {p.id: p for p in products}
+        self.by_sku = {p.sku.lower(): p for p in products if p.sku}
+        # (ключ, id) — відсортовані для пошуку за префіксом;
+        # назва індексується також з кожного слова: "лист 2мм" знайде й "2мм"
+        name_keys = []
+        for p in products:
+            words = p.name.lower().split()
+            for i in range(len(words)):
+                name_keys.append((" ".join(words[i:]), p.id))
+        self.name_keys = sorted(name_keys)
+        self.sku_keys = sorted((sku, p.id) for sku, p in self.by_sku.items())
+
+    @staticmethod
+    def _prefix(keys, prefix):
+        start = bisect_left(keys, (prefix,))
+        for key, product_id in keys[start:]:
+            if not key.startswith(prefix):
+                break
+            yield product_id
+
+    def search(self, term, limit=20):
+        """id товарів: точний збіг артикулу, далі префікс артикулу та назви."""
+        term = " ".join(term.lower().split())
+        if not term:
+            return [p.id for p in list(self.by_id.values())[:limit]]
+
+        found = {}
+        exact = self.by_sku.get(term)
+        if exact is not None:
+            found[exact.id] = None
+        for keys in (self.sku_keys, self.name_keys):
+            for product_id in self._prefix(keys, term):
+                found.setdefault(product_id, None)
+                if len(found) >= limit:
+                    return list(found)
+        return list(found)
+
+
+def _load():
+    from .models import Product
+
+    rows = (
+        Product.objects.filter(is_active=True)
+        .order_by("name")
+        .values_list("id", "name", "sku", "base_price")
+    )
+    return Catalog([CatalogProduct(id, name, sku or "", price) for id, name, sku, price in rows])
+
+
+product_catalog = VersionedCache("crm.product_catalog", _load)
+
+
+def get_product(product_id):
+    return product_catalog.get().by_id.get(product_id)
+
+
+def search_products(term, limit=20):
+    return product_catalog.get().search(term, limit)
+
+
+def base_price(product_id):
+    """Базова ціна активного товару з довідника або None."""
+    product = get_product(product_id)
+    return product.base_price if product is not None else None
@@ -0,0 +1,291 @@
+"""
+Пошук і об’єднання дублікатів клієнтів.
+
+Кожен клієнт отримує ключі блокування: нормалізовані телефони (свої й
+контактів), код ЄДРПОУ/РНОКПП, email і кілька найрідкісніших триграм
+назви. Порівнюються лише пари всередині одного блоку, тож кількість
+порівнянь росте з розміром блоків, а не як n². Триграм береться стільки,
+щоб будь-яка пара з подібністю назв (Jaccard) від NAME_THRESHOLD мала
+хоча б одну спільну (prefix filtering) — схожі назви не губляться.
+
+Пари з оцінкою від SCORE_THRESHOLD зберігаються в DuplicateCandidate;
+об’єднання переносить контакти, а з дублікатів контактів — замовлення
+й задачі, кожне одним UPDATE.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from django.db import transaction
+
+from core import changelog
+
+from .models import ArchivedOrder, Client, Contact, DuplicateCandidate, Order, Task
+
+# блоки, більші за це (напр. телефон-заглушка), не розбираються; для триграм назви
+# межа нижча — у схожих назв кілька спільних рідкісних триграм, тож пара знайдеться
+# через інший, менший блок
+MAX_BLOCK = 500
+MAX_NAME_BLOCK = 100
+NAME_THRESHOLD = 0.6
+SCORE_THRESHOLD = 0.6
+
+# ваги ознак; оцінка пари — 1 - Π(1 - вага)
+WEIGHTS = {"tax_code": 0.95, "phone": 0.8, "email": 0.7}
+NAME_WEIGHT = 0.7
+# різні коди ЄДРПОУ — найімовірніше різні особи
+TAX_CONFLICT_FACTOR = 0.2
+
+LEGAL_FORMS = {"тов", "фоп", "пп", "прат", "пат", "ат", "фо", "п", "ooo", "ооо", "llc", "ltd"}
+_NON_WORD = re.compile(r"[\W_]+")
+_NON_DIGIT = re.compile(r"\D+")
+
+
+def normalize_phone(raw):
+    """Останні 9 цифр (номер без коду країни й оператора-префікса 0); коротші — відкидаються."""
+    digits = _NON_DIGIT.sub("", raw or "")
+    return digits[-9:] if len(digits) >= 9 else None
+
+
+def split_phones(raw):
+    return [phone for phone in map(normalize_phone, re.split(r"[,;/]", raw or "")) if phone]
+
+
+def normalize_email(raw):
+    return (raw or "").strip().lower() or None
+
+
+def normalize_name(raw):
+    words = _NON_WORD.sub(" ", (raw or "").lower().replace("’", "").replace("'", "")).split()
+    return " ".join(word for word in words if word not in LEGAL_FORMS)
+
+
+def trigrams(name):
+    grams = set()
+    for word in name.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class ClientRecord:
+    __slots__ = ("id", "tax_code", "phones", "emails", "grams")
+
+    def __init__(self, id, tax_code, phones, emails, grams):
+        self.id = id
+        self.tax_code = tax_code
+        self.phones = phones
+        self.emails = emails
+        self.grams = grams
+
+
+def load_records():
+    """Нормалізовані дані всіх клієнтів: двома запитами, без моделей."""
+    phones = defaultdict(set)
+    emails = defaultdict(set)
+    for client_id, phone, email in Contact.objects.values_list("client_id", "phone", "email").iterator(chunk_size=5000):
+        phones[client_id].update(split_phones(phone))
+        if normalize_email(email):
+            emails[client_id].add(normalize_email(email))
+
+    records = []
+    rows = Client.objects.values_list("id", "name", "tax_code", "phones", "email")
+    for client_id, name, tax_code, client_phones, email in rows.iterator(chunk_size=5000):
+        client_emails = emails.get(client_id, set())
+        if normalize_email(email):
+            client_emails = client_emails | {normalize_email(email)}
+        records.append(ClientRecord(
+            client_id,
+            (tax_code or "").strip() or None,
+            phones.get(client_id, set()) | set(split_phones(client_phones)),
+            client_emails,
+            frozenset(trigrams(normalize_name(name))),
+        ))
+    return records
+
+
+def blocking_keys(record, gram_order):
+    keys = [("phone", phone) for phone in record.phones]
+    keys += [("email", email) for email in record.emails]
+    if record.tax_code:
+        keys.append(("tax_code", record.tax_code))
+    if record.grams:
+        # prefix filtering: пари з Jaccard >= NAME_THRESHOLD ділять хоча б одну з цих триграм
+        size = len(record.grams)
+        prefix = size - math.ceil(NAME_THRESHOLD * size) + 1
+        keys += [("name", gram) for gram in sorted(record.grams, key=gram_order)[:prefix]]
+    return keys
+
+
+def score_pair(a, b):
+    """(оцінка 0..1, ознаки збігу)."""
+    reasons = []
+    if a.tax_code and a.tax_code == b.tax_code:
+        reasons.append("tax_code")
+    if a.phones & b.phones:
+        reasons.append("phone")
+    if a.emails & b.emails:
+        reasons.append("email")
+    miss = 1.0
+    for reason in reasons:
+        miss *= 1 - WEIGHTS[reason]
+
+    if a.grams and b.grams:
+        similarity = len(a.grams & b.grams) / len(a.grams | b.grams)
+        if similarity >= NAME_THRESHOLD:
+            reasons.append("name")
+            miss *= 1 - NAME_WEIGHT * similarity
+
+    score = 1 - miss
+    if a.tax_code and b.tax_code and a.tax_code != b.tax_code:
+        score *= TAX_CONFLICT_FACTOR
+    return score, reasons
+
+
+def find_duplicates(records=None):
+    """Пари (id меншого, id більшого, оцінка, ознаки) з оцінкою від SCORE_THRESHOLD."""
+    records = load_records() if records is None else records
+    frequency = Counter(gram for record in records for gram in record.grams)
+
+    def gram_order(gram):
+        return frequency[gram], gram
+
+    blocks = defaultdict(list)
+    for record in records:
+        for key in blocking_keys(record, gram_order):
+            blocks[key].append(record)
+
+    seen = set()
+    found = []
+    for (kind, _), members in blocks.items():
+        if len(members) < 2 or len(members) > (MAX_NAME_BLOCK if kind == "name" else MAX_BLOCK):
+            continue
+        for a, b in combinations(members, 2):
+            pair = (a.id, b.id) if a.id < b.id else (b.id, a.id)
+            if pair in seen:
+                continue
+            seen.add(pair)
+            score, reasons = score_pair(a, b)
+            if score >= SCORE_THRESHOLD:
+                found.append((*pair, round(score, 3), reasons))
+    return found
+
+
+def refresh_candidates():
+    """
+    Перераховує нові кандидати в дублікати. Відхилені пари не повертаються.
+    Повертає кількість знайдених пар.
+    """
+    found = find_duplicates()
+    dismissed = set(
+        DuplicateCandidate.objects.filter(status=DuplicateCandidate.Status.DISMISSED)
+        .values_list("client_a_id", "client_b_id")
+    )
+    with transaction.atomic():
+        DuplicateCandidate.objects.filter(status=DuplicateCandidate.Status.NEW).delete()
+        DuplicateCandidate.objects.bulk_create(
+            [
+                DuplicateCandidate(client_a_id=a, client_b_id=b, score=score, reasons=",".join(reasons))
+                for a, b, score, reasons in found
+                if (a, b) not in dismissed
+            ],
+            batch_size=2000,
+        )
+    return len(found)
+
+
+def _contact_key(contact):
+    # лише телефон чи email: однакове ПІБ — ще не та сама людина
+    return normalize_phone(contact.phone) or normalize_email(contact.email) or ("id", contact.pk)
+
+
+def _repoint(model, field, old_ids, new_id):
+    """UPDATE field з old_ids на new_id одним запитом, з журналом змін."""
+    queryset = model.objects.filter(**{f"{field}__in": old_ids})
+    old_values = dict(queryset.values_list("pk", f"{field}_id"))
+    updated = queryset.update(**{f"{field}_id": new_id})
+    changelog.log_update(model, f"{field}_id", old_values, new_id)
+    return updated
+
+
+@transaction.atomic
+def merge_clients(target, duplicates):
+    """
+    Об’єднує duplicates у target: контакти переносяться, контакти з тим самим
+    телефоном/email зливаються (з однаковим лише ПІБ — ні) (замовлення і задачі — на контакт, що лишається),
+    порожні поля target доповнюються, дублікати видаляються.
+    """
+    duplicates = [client for client in duplicates if client.pk != target.pk]
+    duplicate_ids = [client.pk for client in duplicates]
+    if not duplicate_ids:
+        return 0
+
+    _repoint(Contact, "client", duplicate_ids, target.pk)
+
+    # дублікати контактів: лишається найстаріший з однаковим ключем
+    kept = {}
+    merged_contacts = defaultdict(list)
+    for contact in Contact.objects.filter(client=target).order_by("created_at", "id"):
+        key = _contact_key(contact)
+        if key in kept:
+            merged_contacts[kept[key]].append(contact.pk)
+        else:
+            kept[key] = contact.pk
+    for keep_id, contact_ids in merged_contacts.items():
+        _repoint(Order, "contact", contact_ids, keep_id)
+        _repoint(Task, "contact", contact_ids, keep_id)
+        _repoint(ArchivedOrder, "contact", contact_ids, keep_id)
+        Contact.tags.through.objects.bulk_create(
+            [
+                Contact.tags.through(contact_id=keep_id, tag_id=tag_id)
+                for tag_id in set(
+                    Contact.tags.through.objects.filter(contact_id__in=contact_ids).values_list("tag_id", flat=True)
+                )
+            ],
+            ignore_conflicts=True,
+        )
+    Contact.objects.filter(pk__in=[pk for ids in merged_contacts.values() for pk in ids]).delete()
+
+    # порожні поля — з дублікатів; телефони й примітки — об’єднуються
+    phones = [target.phones] if target.phones else []
+    known_phones = set(split_phones(target.phones))
+    for client in duplicates:
+        target.tax_code = target.tax_code or client.tax_code
+        target.email = target.email or client.email
+        for raw in re.split(r"[,;/]", client.phones or ""):
+            if normalize_phone(raw) and normalize_phone(raw) not in known_phones:
+                known_phones.add(normalize_phone(raw))
+                phones.append(raw.strip())
+        if client.notes:
+            target.notes = f"{target.notes}\n{client.notes}".strip()
+    # цілими номерами в межах поля; ті, що не влізли, — у примітки
+    max_length = Client._meta.get_field("phones").max_length
+    kept_phones = []
+    for index, phone in enumerate(phones):
+        if len(", ".join([*kept_phones, phone])) > max_length:
+            target.notes = f"{target.notes}\nІнші телефони: {', '.join(phones[index:])}".strip()
+            break
+        kept_phones.append(phone)
+    target.phones = ", ".join(kept_phones)
+    target.save()
+    target.tags.add(*Client.tags.through.objects.filter(client_id__in=duplicate_ids).values_list("tag_id", flat=True))
+
+    Client.objects.filter(pk__in=duplicate_ids).delete()
+    Client.refresh_lifetime_metrics([target.pk])
+    return len(duplicate_ids)
+
+
+def merge_candidates(candidates):
+    """Об’єднує пари кандидатів (client_b → client_a). Повертає кількість об’єднаних клієнтів."""
+    merged = 0
+    removed = set()
+    for client_a_id, client_b_id in candidates.order_by("-score").values_list("client_a_id", "client_b_id"):
+        # клієнт з попередньої пари вже об’єднаний — його пари зникли разом з ним
+        if client_a_id in removed or client_b_id in removed:
+            continue
+        # свіжі об’єкти: попереднє об’єднання могло змінити client_a
+        clients = Client.objects.in_bulk([client_a_id, client_b_id])
+        merged += merge_clients(clients[client_a_id], [clients[client_b_id]])
+        removed.add(client_b_id)
+    return merged
@@ -0,0 +1,30 @@
+from core.jobs import job
+
+from . import segments
+from .models import Client, Order, Segment
+
+
+@job("crm.refresh_order_summary")
+def refresh_order_summary(order_id):
+    order = Order.objects.filter(pk=order_id).first()
+    if order is not None:
+        order.refresh_summary()
+
+
+@job("crm.refresh_client_metrics")
+def refresh_client_metrics(client_id):
+    Client.refresh_lifetime_metrics([client_id])
+    # від LTV і дати останнього замовлення залежить склад сегментів
+    segments.refresh_clients([client_id])
+
+
+@job("crm.refresh_client_segments")
+def refresh_client_segments(client_id):
+    segments.refresh_clients([client_id])
+
+
+@job("crm.refresh_segment")
+def refresh_segment(segment_id):
+    segment = Segment.objects.prefetch_related("tags").filter(pk=segment_id).first()
+    if segment is not None:
+        segments.refresh_segment(segment)
@@ -0,0 +1,295 @@
+"""
+Синхронізація цін і наявності товарів з оголошеннями на маркетплейсах.
+
+Оголошення визначається посиланням у товарі (prom_url, rozetka_url, …).
+Усі оголошення опитуються конкурентно через один пул з’єднань, з лімітом
+частоти на маркетплейс. Запит умовний (If-None-Match / If-Modified-Since),
+тож незмінене оголошення відповідає 304 без тіла; відповідь 200
+порівнюється з бажаним станом товару за хешем ціни й наявності, і зміни
+відправляються лише тоді, коли хеші різняться. У БД пишуться тільки
+оголошення, стан яких змінився (MarketplaceListing).
+
+Адаптер на кожен маркетплейс знає, як дістати id оголошення з посилання,
+прочитати відповідь API і сформувати запит на зміну; новий маркетплейс —
+новий підклас Adapter у ADAPTERS і налаштування в MARKETPLACE_API.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+from collections import Counter
+from decimal import Decimal
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.http import RateLimiter, async_client, gather_limited, request
+
+from .models import MarketplaceListing, Product
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal("0.01")
+
+
+class Listing(NamedTuple):
+    price: Decimal | None
+    available: bool | None
+
+
+def content_hash(listing):
+    price = None if listing.price is None else Decimal(listing.price).quantize(CENTS)
+    return hashlib.sha1(f"{price}|{listing.available}".encode()).hexdigest()
+
+
+class Adapter:
+    marketplace = None
+    url_field = ""
+    id_pattern = None
+    path = ""
+
+    def __init__(self, config):
+        self.base_url = config["URL"].rstrip("/") + "/"
+        token = config.get("TOKEN")
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.limiter = RateLimiter(config.get("RATE", 5))
+
+    def listing_id(self, url):
+        match = self.id_pattern.search(url)
+        return match.group(1) if match else None
+
+    def listing_url(self, external_id):
+        return self.base_url + self.path.format(id=external_id)
+
+    def parse(self, data):
+        """JSON відповіді API → Listing."""
+        raise NotImplementedError
+
+    def update_request(self, external_id, listing):
+        """(метод, URL, JSON-тіло) запиту, що встановлює ціну й наявність."""
+        raise NotImplementedError
+
+
+class PromAdapter(Adapter):
+    marketplace = MarketplaceListing.Marketplace.PROM
+    url_field = "prom_url"
+    id_pattern = re.compile(r"/p(\d+)-")
+    path = "products/{id}"
+
+    def parse(self, data):
+        product = data["product"]
+        return Listing(_price(product.get("price")), product.get("presence") == "available")
+
+    def update_request(self, external_id, listing):
+        return "POST", self.base_url + "products/edit", [{
+            "id": int(external_id),
+            "price": _number(listing.price),
+            "presence": "available" if listing.available else "not_available",
+        }]
+
+
+class RozetkaAdapter(Adapter):
+    marketplace = MarketplaceListing.Marketplace.ROZETKA
+    url_field = "rozetka_url"
+    id_pattern = re.compile(r"/p(\d+)/?")
+    path = "items/{id}"
+
+    def parse(self, data):
+        item = data["content"]
+        return Listing(_price(item.get("price")), item.get("sell_status") == "available")
+
+    def update_request(self, external_id, listing):
+        return "PUT", self.listing_url(external_id), {
+            "price": _number(listing.price),
+            "sell_status": "available" if listing.available else "unavailable",
+        }
+
+
+class OlxAdapter(Adapter):
+    marketplace = MarketplaceListing.Marketplace.OLX
+    url_field = "olx_url"
+    id_pattern = re.compile(r"-ID(\w+)\.html")
+    path = "adverts/{id}"
+
+    def parse(self, data):
+        advert = data["data"]
+        return Listing(_price((advert.get("price") or {}).get("value")), advert.get("status") == "active")
+
+    def update_request(self, external_id, listing):
+        return "PUT", self.listing_url(external_id), {
+            "price": {"value": _number(listing.price), "currency": "UAH"},
+            "status": "active" if listing.available else "inactive",
+        }
+
+
+class SiteAdapter(Adapter):
+    marketplace = MarketplaceListing.Marketplace.SITE
+    url_field = "site_url"
+    path = "products/{id}"
+
+    def listing_id(self, url):
+        # останній сегмент шляху — slug товару на сайті
+        segments = [s for s in urlsplit(url).path.split("/") if s]
+        return segments[-1] if segments else None
+
+    def parse(self, data):
+        return Listing(_price(data.get("price")), bool(data.get("available")))
+
+    def update_request(self, external_id, listing):
+        return "PUT", self.listing_url(external_id), {
+            "price": _number(listing.price),
+            "available": listing.available,
+        }
+
+
+ADAPTERS = [PromAdapter, RozetkaAdapter, OlxAdapter, SiteAdapter]
+
+
+def _price(value):
+    return None if value in (None, "") else Decimal(str(value)).quantize(CENTS)
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+def enabled_adapters(names=None):
+    """Адаптери маркетплейсів з URL у settings.MARKETPLACE_API (опційно — лише names)."""
+    adapters = []
+    for adapter_class in ADAPTERS:
+        config = settings.MARKETPLACE_API.get(adapter_class.marketplace, {})
+        if config.get("URL") and (names is None or adapter_class.marketplace in names):
+            adapters.append(adapter_class(config))
+    return adapters
+
+
+SYNCED_FIELDS = [
+    "external_id", "etag", "last_modified", "content_hash",
+    "remote_price", "remote_available", "synced_at", "pushed_at", "last_error",
+]
+
+
+def _state_fields(state):
+    return tuple(getattr(state, name) for name in SYNCED_FIELDS)
+
+
+async def _sync_listing(client, adapter, state, product, push, now):
+    headers = dict(adapter.headers)
+    if state.etag:
+        headers["If-None-Match"] = state.etag
+    if state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+    response = await request(
+        client, "GET", adapter.listing_url(state.external_id), headers=headers, limiter=adapter.limiter,
+    )
+    outcome = "not_modified"
+    if response.status_code != 304:
+        remote = adapter.parse(response.json())
+        state.etag = response.headers.get("ETag", "")
+        state.last_modified = response.headers.get("Last-Modified", "")
+        # API без валідаторів віддає 200 щоразу — зміну видно лише з хешу
+        outcome = "unchanged"
+        if content_hash(remote) != state.content_hash:
+            state.remote_price, state.remote_available = remote
+            state.content_hash = content_hash(remote)
+            state.synced_at = now
+            outcome = "changed"
+    state.last_error = ""
+
+    # без базової ціни ціну на маркетплейсі не чіпаємо; неактивний товар — не в наявності
+    price = product.base_price if product.base_price is not None else state.remote_price
+    desired = Listing(price, product.is_active)
+    if content_hash(desired) == state.content_hash:
+        return outcome
+    if not push:
+        return "outdated"
+
+    method, url, body = adapter.update_request(state.external_id, desired)
+    response = await request(client, method, url, json=body, headers=adapter.headers, limiter=adapter.limiter)
+    state.remote_price, state.remote_available = desired
+    state.content_hash = content_hash(desired)
+    # новий валідатор, якщо API його повернув; інакше наступний запит буде повним
+    state.etag = response.headers.get("ETag", "")
+    state.last_modified = response.headers.get("Last-Modified", "")
+    state.synced_at = state.pushed_at = now
+    return "pushed"
+
+
+async def _sync_all(tasks, push, concurrency, now):
+    async with async_client(max_connections=concurrency, timeout=settings.MARKETPLACE_TIMEOUT) as client:
+        return await gather_limited(
+            (_sync_listing(client, adapter, state, product, push, now) for adapter, state, product in tasks),
+            concurrency,
+        )
+
+
+def sync_marketplaces(names=None, push=True, concurrency=None):
+    """
+    Синхронізує оголошення всіх товарів з посиланнями на маркетплейси.
+    Повертає Counter результатів: not_modified (304), unchanged (той самий
+    хеш), changed, pushed, outdated (розбіжність без push), failed, invalid_url
+    і written — скільки рядків стану записано в БД.
+    """
+    adapters = enabled_adapters(names)
+    result = Counter()
+    if not adapters:
+        return result
+    concurrency = concurrency or settings.MARKETPLACE_CONCURRENCY
+
+    url_fields = [adapter.url_field for adapter in adapters]
+    has_url = Q()
+    for field in url_fields:
+        has_url |= ~Q(**{field: ""})
+    products = Product.objects.filter(has_url).only("id", "base_price", "is_active", *url_fields)
+    states = {
+        (state.product_id, state.marketplace): state
+        for state in MarketplaceListing.objects.filter(marketplace__in=[a.marketplace for a in adapters])
+    }
+
+    tasks = []
+    before = {}
+    for product in products.iterator(chunk_size=2000):
+        for adapter in adapters:
+            url = getattr(product, adapter.url_field)
+            if not url:
+                continue
+            external_id = adapter.listing_id(url)
+            if external_id is None:
+                result["invalid_url"] += 1
+                continue
+            state = states.get((product.pk, adapter.marketplace))
+            if state is None:
+                state = MarketplaceListing(product=product, marketplace=adapter.marketplace, external_id=external_id)
+            else:
+                before[state.pk] = _state_fields(state)
+                if state.external_id != external_id:
+                    # посилання змінилось — старі валідатори й хеш не про це оголошення
+                    state.external_id = external_id
+                    state.etag = state.last_modified = state.content_hash = ""
+            tasks.append((adapter, state, product))
+
+    now = timezone.now()
+    outcomes = asyncio.run(_sync_all(tasks, push, concurrency, now))
+
+    created = []
+    updated = []
+    for (adapter, state, _), outcome in zip(tasks, outcomes):
+        if isinstance(outcome, Exception):
+            logger.warning("Маркетплейс %s, оголошення %s: %r", adapter.marketplace, state.external_id, outcome)
+            state.last_error = f"{type(outcome).__name__}: {outcome}"[:1000]
+            outcome = "failed"
+        result[outcome] += 1
+        if state.pk is None:
+            created.append(state)
+        elif _state_fields(state) != before[state.pk]:
+            updated.append(state)
+
+    with transaction.atomic():
+        MarketplaceListing.objects.bulk_create(created, batch_size=500)
+        MarketplaceListing.objects.bulk_update(updated, SYNCED_FIELDS, batch_size=500)
+    result["written"] = len(created) + len(updated)
+    return result
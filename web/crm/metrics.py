@@ -0,0 +1,123 @@
+"""
+Метрики потоку замовлень: lead time, WIP по статусах, пропускна здатність.
+
+Усе рахується або агрегатами в PostgreSQL (percentile_cont, TruncWeek),
+або одним проходом по відрізках статусів із різницевими масивами —
+без запитів на кожне замовлення чи на кожен день.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Aggregate, Count, DurationField, F, Q
+from django.db.models.functions import TruncWeek
+from django.utils.timezone import get_current_timezone, make_aware
+
+from .models import Order
+
+# статуси, які вважаються «в роботі» для WIP
+WIP_STATUSES = (Order.Status.NEW, Order.Status.IN_PROGRESS, Order.Status.SHIPPED)
+
+
+class PercentileCont(Aggregate):
+    function = "PERCENTILE_CONT"
+    name = "PercentileCont"
+    template = "%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def _period_bounds(start, end):
+    return (
+        make_aware(datetime.combine(start, time.min)),
+        make_aware(datetime.combine(end, time.max)),
+    )
+
+
+def lead_time_percentiles(start, end, percentiles=(0.5, 0.85, 0.95)):
+    """
+    Перцентилі lead time (created_at → completed_at) для замовлень,
+    завершених у період [start, end] (дати). Один агрегатний запит.
+    """
+    period_start, period_end = _period_bounds(start, end)
+    lead_time = F("completed_at") - F("created_at")
+    aggregates = {
+        f"p{round(p * 100)}": PercentileCont(lead_time, p, output_field=DurationField())
+        for p in percentiles
+    }
+    # completed_at не скидається при поверненні в роботу — тому і статус
+    return Order.objects.filter(
+        status=Order.Status.COMPLETED,
+        completed_at__range=(period_start, period_end),
+    ).aggregate(count=Count("id"), **aggregates)
+
+
+def throughput_by_week(start, end):
+    """Кількість завершених замовлень по тижнях: [(понеділок, кількість), ...]."""
+    period_start, period_end = _period_bounds(start, end)
+    rows = (
+        Order.objects.filter(status=Order.Status.COMPLETED, completed_at__range=(period_start, period_end))
+        .annotate(week=TruncWeek("completed_at"))
+        .values("week")
+        .annotate(count=Count("id"))
+        .order_by("week")
+    )
+    return [(row["week"].date(), row["count"]) for row in rows]
+
+
+def wip_by_day(start, end):
+    """
+    Скільки замовлень перебувало в кожному статусі WIP на кінець кожного дня.
+    Повертає [(дата, {статус: кількість}), ...].
+
+    Замовлення вибираються одним запитом (лише часові мітки), далі кожен
+    відрізок «статус від — до» додається в різницевий масив: O(замовлень + днів).
+    """
+    tz = get_current_timezone()
+    period_start, period_end = _period_bounds(start, end)
+    days_count = (end - start).days + 1
+
+    rows = (
+        Order.objects.filter(created_at__lte=period_end)
+        # завершені / відмінені до періоду; повернене в роботу має стару completed_at — лишається
+        .exclude(
+            Q(status=Order.Status.COMPLETED, completed_at__lt=period_start)
+            | Q(status=Order.Status.CANCELED, canceled_at__lt=period_start)
+        )
+        .values_list("created_at", "in_progress_at", "shipped_at", "completed_at", "canceled_at")
+        .order_by()
+    )
+
+    diff = {status: [0] * (days_count + 1) for status in WIP_STATUSES}
+
+    def day_index(moment):
+        # статус рахується на кінець дня: перехід протягом дня d впливає з дня d
+        return (moment.astimezone(tz).date() - start).days
+
+    for created_at, in_progress_at, shipped_at, completed_at, canceled_at in rows:
+        transitions = sorted(
+            (moment, status)
+            for moment, status in (
+                (created_at, Order.Status.NEW),
+                (in_progress_at, Order.Status.IN_PROGRESS),
+                (shipped_at, Order.Status.SHIPPED),
+                (completed_at, Order.Status.COMPLETED),
+                (canceled_at, Order.Status.CANCELED),
+            )
+            if moment is not None
+        )
+        for (entered, status), next_transition in zip(transitions, transitions[1:] + [None]):
+            if status not in diff:
+                continue
+            first = max(day_index(entered), 0)
+            last = days_count if next_transition is None else min(day_index(next_transition[0]), days_count)
+            if first < last:
+                diff[status][first] += 1
+                diff[status][last] -= 1
+
+    result = []
+    running = {status: 0 for status in WIP_STATUSES}
+    for i in range(days_count):
+        for status in WIP_STATUSES:
+            running[status] += diff[status][i]
+        result.append((start + timedelta(days=i), dict(running)))
+    return result
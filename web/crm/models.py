@@ -61,6 +61,17 @@ class Client(models.Model):
 
     notes = models.TextField("Примітки", blank=True)
 
+    # Кешовані показники по всіх замовленнях клієнта (див. refresh_lifetime_metrics)
+    lifetime_value = models.DecimalField(
+        "Сума замовлень (LTV)",
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
+    orders_count = models.PositiveIntegerField("Кількість замовлень", default=0, editable=False)
+    last_order_at = models.DateTimeField("Останнє замовлення", null=True, blank=True, editable=False)
+
     created_at = models.DateTimeField("Створено", auto_now_add=True)
     updated_at = models.DateTimeField("Оновлено", auto_now=True)
 
@@ -72,6 +83,67 @@ class Client(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def refresh_lifetime_metrics(cls, client_ids=None):
+        """
+        Перераховує LTV, кількість і дату останнього замовлення одним UPDATE
+        з підзапитами. Відмінені замовлення не входять ні в суму, ні в кількість,
+        ні в дату останнього замовлення.
+        client_ids=None — для всіх клієнтів.
+        """
+        from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+        from django.db.models.functions import Coalesce, Greatest
+
+        money = DecimalField(max_digits=14, decimal_places=2)
+
+        orders = (
+            Order.objects.filter(contact__client=OuterRef("pk"))
+            .exclude(status=Order.Status.CANCELED)
+            .order_by()
+            .values("contact__client")
+        )
+        ltv = orders.annotate(total=Sum(F("items__unit_price") * F("items__quantity"))).values("total")
+        count = orders.annotate(cnt=Count("id")).values("cnt")
+        last = (
+            Order.objects.filter(contact__client=OuterRef("pk"))
+            .exclude(status=Order.Status.CANCELED)
+            .order_by("-created_at")
+            .values("created_at")[:1]
+        )
+
+        # архівні замовлення (crm.archive) теж входять у показники
+        archived = (
+            ArchivedOrder.objects.filter(contact__client=OuterRef("pk"))
+            .exclude(status=Order.Status.CANCELED)
+            .order_by()
+            .values("contact__client")
+        )
+        archived_ltv = archived.annotate(total=Sum("total")).values("total")
+        archived_count = archived.annotate(cnt=Count("id")).values("cnt")
+        archived_last = (
+            ArchivedOrder.objects.filter(contact__client=OuterRef("pk"))
+            .exclude(status=Order.Status.CANCELED)
+            .order_by("-created_at")
+            .values("created_at")[:1]
+        )
+
+        qs = cls.objects.all()
+        if client_ids is not None:
+            qs = qs.filter(pk__in=client_ids)
+        # update() не чіпає updated_at — це службові поля, а не правка клієнта
+        return qs.update(
+            lifetime_value=(
+                Coalesce(Subquery(ltv, output_field=money), Value(0), output_field=money)
+                + Coalesce(Subquery(archived_ltv, output_field=money), Value(0), output_field=money)
+            ),
+            orders_count=Coalesce(Subquery(count), Value(0)) + Coalesce(Subquery(archived_count), Value(0)),
+            # GREATEST із NULL поводиться по-різному в різних БД — тому Coalesce з обох боків
+            last_order_at=Greatest(
+                Coalesce(Subquery(last), Subquery(archived_last)),
+                Coalesce(Subquery(archived_last), Subquery(last)),
+            ),
+        )
+
     def clean(self):
         super().clean()
         if self.client_type in (self.ClientType.FOP, self.ClientType.TOV) and not self.tax_code.strip():
@@ -86,6 +158,77 @@ class Client(models.Model):
                 raise ValidationError({"tax_code": "Для ФОП очікується 8 або 10 цифр."})
 
 
+class Segment(models.Model):
+    """
+    Збережений сегмент клієнтів: усі умови через AND, порожня умова не діє.
+    Склад зберігається в SegmentMember і оновлюється crm.segments.
+    """
+    name = models.CharField("Назва", max_length=255, unique=True)
+    tags = models.ManyToManyField(
+        "Tag",
+        related_name="segments",
+        blank=True,
+        verbose_name="Теги (усі)",
+        help_text="Тег клієнта або будь-якого з його контактів.",
+    )
+    source = models.CharField("Джерело", max_length=32, choices=Client.Source.choices, blank=True)
+    client_type = models.CharField("Тип клієнта", max_length=16, choices=Client.ClientType.choices, blank=True)
+    ordered_within_days = models.PositiveIntegerField("Замовляв за останні, днів", null=True, blank=True)
+    min_lifetime_value = models.DecimalField("LTV від", max_digits=14, decimal_places=2, null=True, blank=True)
+    min_orders_count = models.PositiveIntegerField("Замовлень від", null=True, blank=True)
+
+    # кешовані підсумки останнього перерахунку
+    member_count = models.PositiveIntegerField("Клієнтів", default=0, editable=False)
+    refreshed_at = models.DateTimeField("Перераховано", null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = "Сегмент"
+        verbose_name_plural = "Сегменти клієнтів"
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class SegmentMember(models.Model):
+    segment = models.ForeignKey(Segment, related_name="members", on_delete=models.CASCADE)
+    client = models.ForeignKey(Client, related_name="segment_memberships", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["segment", "client"], name="crm_segment_member_uniq"),
+        ]
+        # фільтр «клієнти сегмента» та інкрементальне оновлення по клієнтах
+        indexes = [models.Index(fields=["client", "segment"], name="crm_segment_member_client_idx")]
+
+
+class DuplicateCandidate(models.Model):
+    """Пара ймовірних дублікатів клієнтів (crm.dedup); client_a — старший за id."""
+
+    class Status(models.TextChoices):
+        NEW = "new", "Нова"
+        DISMISSED = "dismissed", "Не дублікат"
+
+    client_a = models.ForeignKey(Client, related_name="+", on_delete=models.CASCADE, verbose_name="Клієнт")
+    client_b = models.ForeignKey(Client, related_name="+", on_delete=models.CASCADE, verbose_name="Можливий дублікат")
+    score = models.FloatField("Оцінка")
+    reasons = models.CharField("Збіги", max_length=64)
+    status = models.CharField("Статус", max_length=16, choices=Status.choices, default=Status.NEW)
+    created_at = models.DateTimeField("Знайдено", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Можливий дублікат"
+        verbose_name_plural = "Можливі дублікати клієнтів"
+        ordering = ["-score"]
+        constraints = [
+            models.UniqueConstraint(fields=["client_a", "client_b"], name="crm_duplicate_pair_uniq"),
+        ]
+        indexes = [models.Index(fields=["status", "-score"], name="crm_duplicate_status_score_idx")]
+
+    def __str__(self):
+        return f"{self.client_a_id} ↔ {self.client_b_id} ({self.score:.2f})"
+
+
 class Contact(models.Model):
     class Source(models.TextChoices):
         INSTAGRAM = "instagram", "Instagram"
@@ -186,6 +329,46 @@ class Product(models.Model):
         return f"{self.name} ({self.sku})" if self.sku else self.name
 
 
+class MarketplaceListing(models.Model):
+    """
+    Стан синхронізації оголошення товару на маркетплейсі (crm.marketplaces):
+    валідатори для умовних запитів і хеш вмісту з останньої відповіді.
+    """
+
+    class Marketplace(models.TextChoices):
+        PROM = "prom", "Prom.ua"
+        ROZETKA = "rozetka", "Rozetka"
+        OLX = "olx", "OLX"
+        SITE = "site", "Сайт"
+
+    product = models.ForeignKey(
+        Product,
+        related_name="listings",
+        on_delete=models.CASCADE,
+        verbose_name="Продукт",
+    )
+    marketplace = models.CharField("Маркетплейс", max_length=20, choices=Marketplace.choices)
+    external_id = models.CharField("ID оголошення", max_length=100)
+    etag = models.CharField("ETag", max_length=255, blank=True)
+    last_modified = models.CharField("Last-Modified", max_length=64, blank=True)
+    # sha1 ціни й наявності в оголошенні — порівнюється з бажаним станом товару
+    content_hash = models.CharField("Хеш вмісту", max_length=40, blank=True)
+    remote_price = models.DecimalField("Ціна на маркетплейсі", max_digits=10, decimal_places=2, null=True, blank=True)
+    remote_available = models.BooleanField("В наявності на маркетплейсі", null=True)
+    synced_at = models.DateTimeField("Синхронізовано", null=True, blank=True)
+    pushed_at = models.DateTimeField("Оновлено на маркетплейсі", null=True, blank=True)
+    last_error = models.TextField("Помилка", blank=True)
+
+    class Meta:
+        verbose_name = "Оголошення на маркетплейсі"
+        verbose_name_plural = "Оголошення на маркетплейсах"
+        constraints = [
+            models.UniqueConstraint(fields=["product", "marketplace"], name="crm_listing_product_marketplace_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_marketplace_display()}: {self.external_id}"
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(
@@ -205,6 +388,8 @@ class OrderItem(models.Model):
         "Ціна за одиницю",
         max_digits=10,
         decimal_places=2,
+        blank=True,
+        help_text="Порожньо — базова ціна продукту",
     )
     comment = models.CharField("Коментар", max_length=255, blank=True)
 
@@ -215,6 +400,31 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.product} x {self.quantity}"
 
+    def fill_unit_price(self):
+        """Ціна за замовчуванням — базова ціна з довідника товарів (crm.catalog)."""
+        if self.unit_price is None and self.product_id is not None:
+            from .catalog import base_price
+
+            price = base_price(self.product_id)
+            if price is None:
+                # неактивний товар — його немає в довіднику
+                price = (
+                    Product.objects.filter(pk=self.product_id)
+                    .values_list("base_price", flat=True)
+                    .first()
+                )
+            self.unit_price = price
+
+    def clean(self):
+        super().clean()
+        self.fill_unit_price()
+        if self.unit_price is None and self.product_id is not None:
+            raise ValidationError({"unit_price": "У продукту немає базової ціни — вкажіть ціну."})
+
+    def save(self, *args, **kwargs):
+        self.fill_unit_price()
+        super().save(*args, **kwargs)
+
     @property
     def total_price(self):
         if self.unit_price is not None and self.quantity is not None:
@@ -262,6 +472,13 @@ class Order(models.Model):
 
     deadline = models.DateField("Дедлайн", null=True, blank=True)
     created_at = models.DateTimeField("Дата створення", auto_now_add=True)
+    updated_at = models.DateTimeField("Оновлено", auto_now=True, db_index=True)
+
+    # коли замовлення востаннє перейшло в статус (для «новий» — created_at)
+    in_progress_at = models.DateTimeField("В роботі з", null=True, blank=True, editable=False)
+    shipped_at = models.DateTimeField("Відправлено", null=True, blank=True, editable=False)
+    completed_at = models.DateTimeField("Завершено", null=True, blank=True, editable=False, db_index=True)
+    canceled_at = models.DateTimeField("Відмінено", null=True, blank=True, editable=False)
 
     comment = models.TextField("Додаткові нотатки", blank=True)
 
@@ -276,6 +493,9 @@ class Order(models.Model):
         max_length=100,
         blank=True,
     )
+    # оновлюється синхронізацією з перевізником (crm.tracking)
+    tracking_status = models.CharField("Статус посилки", max_length=255, blank=True, editable=False)
+    tracking_updated_at = models.DateTimeField("Статус посилки оновлено", null=True, blank=True, editable=False)
     recipient = models.CharField(
         "Отримувач",
         max_length=255,
@@ -290,6 +510,15 @@ class Order(models.Model):
         blank=True,
     )
 
+    # сума по позиціях; перераховується фоновою задачею crm.refresh_order_summary
+    total = models.DecimalField(
+        "Сума по позиціях",
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
+
     payment_type = models.CharField(
         "Тип оплати",
         max_length=20,
@@ -327,6 +556,33 @@ class Order(models.Model):
         help_text="Напр.: 50% передоплата / оплата при отриманні / оплата 3 дні після відвантаження"
     )
 
+    STATUS_TIMESTAMP_FIELDS = {
+        Status.IN_PROGRESS: "in_progress_at",
+        Status.SHIPPED: "shipped_at",
+        Status.COMPLETED: "completed_at",
+        Status.CANCELED: "canceled_at",
+    }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # статус на момент завантаження — щоб у save() побачити перехід
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded_status = getattr(self, "_loaded_status", None)
+        if self.status != loaded_status:
+            field = self.STATUS_TIMESTAMP_FIELDS.get(self.status)
+            if field:
+                from django.utils import timezone
+                setattr(self, field, timezone.now())
+                update_fields = kwargs.get("update_fields")
+                if update_fields is not None and "status" in update_fields:
+                    kwargs["update_fields"] = {*update_fields, field}
+        super().save(*args, **kwargs)
+        self._loaded_status = self.status
+
     def build_title_from_items(self) -> str:
         # товари через кому, унікальні, у стабільному порядку
         names = list(
@@ -347,7 +603,16 @@ class Order(models.Model):
         if new_title != (self.title or ""):
             self.title = new_title
             if save:
-                self.save(update_fields=["title"])
+                self.save(update_fields=["title", "updated_at"])
+
+    def refresh_summary(self):
+        """Перераховує назву та суму по позиціях (для фонової задачі)."""
+        title = self.build_title_from_items()
+        total = self.calculate_items_total()
+        if title != (self.title or "") or total != self.total:
+            self.title = title
+            self.total = total
+            self.save(update_fields=["title", "total", "updated_at"])
 
 
     class Meta:
@@ -358,9 +623,15 @@ class Order(models.Model):
     def __str__(self):
         date_str = self.created_at.strftime("%d.%m.%Y %H:%M")
         title = self.title or "Без товарів"
-        return f"{date_str} – {self.contact.full_name} – {title} – {self.calculate_items_total()} ({self.get_status_display()})"
+        # total — збережена сума (crm.refresh_order_summary), без агрегату на кожен підпис
+        return f"{date_str} – {self.contact.full_name} – {title} – {self.total} ({self.get_status_display()})"
 
     def calculate_items_total(self):
+        # якщо позиції вже підтягнуті через prefetch_related — рахуємо без запиту
+        prefetched = getattr(self, "_prefetched_objects_cache", {}).get("items")
+        if prefetched is not None:
+            return sum((item.total_price or 0 for item in prefetched), 0)
+
         from django.db.models import F, Sum
         agg = self.items.aggregate(
             total=Sum(F("unit_price") * F("quantity"))
@@ -411,12 +682,79 @@ class Task(models.Model):
 
     comment = models.TextField("Коментар", blank=True)
 
+    # дата останнього нагадування (дайджест шлеться не частіше разу на день)
+    reminded_on = models.DateField("Нагадано", null=True, blank=True, editable=False)
+
     created_at = models.DateTimeField("Створено", auto_now_add=True)
 
     class Meta:
         verbose_name = "Задача"
         verbose_name_plural = "Задачі"
         ordering = ["date", "id"]
+        indexes = [
+            # лише невиконані задачі: сканер нагадувань не чіпає виконані
+            models.Index(
+                fields=["date"],
+                include=["id", "assigned_to", "reminded_on"],
+                condition=models.Q(status=False),
+                name="crm_task_open_due_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} ({'виконано' if self.status else 'не виконано'})"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Завершене або відмінене замовлення, перенесене з crm_order (crm.archive).
+    Ключові поля — окремими колонками для фільтрів адмінки, решта — в data.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    contact = models.ForeignKey(
+        "crm.Contact",
+        related_name="archived_orders",
+        on_delete=models.CASCADE,
+        verbose_name="Клієнт",
+    )
+    title = models.CharField("Назва", max_length=500, blank=True)
+    status = models.CharField("Статус", max_length=20, choices=Order.Status.choices)
+    total = models.DecimalField("Сума по позиціях", max_digits=14, decimal_places=2, default=0)
+    payment_amount = models.DecimalField("Сума оплати", max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField("Створено")
+    closed_at = models.DateTimeField("Закрито", db_index=True)
+    archived_at = models.DateTimeField("Архівовано", auto_now_add=True)
+    data = models.JSONField("Усі поля", default=dict)
+
+    class Meta:
+        verbose_name = "Архівне замовлення"
+        verbose_name_plural = "Архів замовлень"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.created_at:%d.%m.%Y} – {self.title or '—'} ({self.get_status_display()})"
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(
+        ArchivedOrder,
+        related_name="items",
+        on_delete=models.CASCADE,
+        verbose_name="Замовлення",
+    )
+    product = models.ForeignKey(
+        Product,
+        related_name="archived_order_items",
+        on_delete=models.PROTECT,
+        verbose_name="Продукт",
+    )
+    quantity = models.PositiveIntegerField("Кількість")
+    unit_price = models.DecimalField("Ціна за одиницю", max_digits=10, decimal_places=2)
+    comment = models.CharField("Коментар", max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = "Позиція архівного замовлення"
+        verbose_name_plural = "Позиції архівного замовлення"
+
+    def __str__(self):
+        return f"{self.product} x {self.quantity}"
@@ -0,0 +1,90 @@
+"""
+Нагадування про задачі: раз на день кожен виконавець отримує один лист
+з усіма своїми задачами на сьогодні та простроченими.
+
+Сканер читає лише частковий індекс crm_task_open_due_idx (status=False),
+тож виконані задачі не переглядаються ніколи, а вже нагадані сьогодні
+відсіюються за reminded_on з того ж індексу.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mass_mail
+from django.db.models import Q
+
+from .models import Task
+
+
+def due_tasks_by_user(today):
+    """
+    {assigned_to_id: [task_id, ...]} для невиконаних задач на сьогодні
+    й прострочених, про які сьогодні ще не нагадували.
+    """
+    rows = (
+        Task.objects.filter(status=False, date__lte=today, assigned_to__isnull=False)
+        .filter(Q(reminded_on__isnull=True) | Q(reminded_on__lt=today))
+        .order_by("date", "id")
+        .values_list("id", "assigned_to_id")
+    )
+    task_ids_by_user = defaultdict(list)
+    for task_id, user_id in rows:
+        task_ids_by_user[user_id].append(task_id)
+    return task_ids_by_user
+
+
+def build_digests(today, task_ids_by_user):
+    """
+    Формує по одному листу на виконавця: {user_id: (тема, текст, від, [кому])}.
+    Виконавці без email листа не отримують і в результат не потрапляють.
+    """
+    users = get_user_model().objects.in_bulk(task_ids_by_user)
+    tasks = Task.objects.in_bulk(
+        [task_id for task_ids in task_ids_by_user.values() for task_id in task_ids]
+    )
+
+    messages = {}
+    for user_id, task_ids in task_ids_by_user.items():
+        user = users.get(user_id)
+        if user is None or not user.email:
+            continue
+        lines = []
+        for task_id in task_ids:
+            task = tasks[task_id]
+            mark = "ПРОСТРОЧЕНО " if task.date < today else ""
+            lines.append(f"• {mark}{task.date:%d.%m.%Y} — {task.title}")
+        body = (
+            f"Невиконані задачі на {today:%d.%m.%Y} ({len(lines)}):\n\n"
+            + "\n".join(lines)
+        )
+        messages[user_id] = (
+            f"Задачі на {today:%d.%m.%Y}: {len(lines)}",
+            body,
+            settings.DEFAULT_FROM_EMAIL,
+            [user.email],
+        )
+    return messages
+
+
+def send_task_reminders(today, users_per_batch=200):
+    """
+    Один прохід планувальника. Повертає (кількість нагаданих задач, кількість листів).
+    Листи шлються пачками по виконавцях, reminded_on ставиться одним UPDATE на пачку.
+    """
+    task_ids_by_user = due_tasks_by_user(today)
+    user_ids = list(task_ids_by_user)
+
+    total_tasks = total_messages = 0
+    for i in range(0, len(user_ids), users_per_batch):
+        batch = {user_id: task_ids_by_user[user_id] for user_id in user_ids[i:i + users_per_batch]}
+        messages = build_digests(today, batch)
+        if messages:
+            send_mass_mail(messages.values(), fail_silently=False)
+
+        # нагаданими позначаються лише задачі тих, кому лист пішов
+        task_ids = [task_id for user_id in messages for task_id in batch[user_id]]
+        Task.objects.filter(pk__in=task_ids).update(reminded_on=today)
+
+        total_tasks += len(task_ids)
+        total_messages += len(messages)
+    return total_tasks, total_messages
@@ -0,0 +1,130 @@
+"""
+Сегменти клієнтів зі збереженим складом.
+
+Склад сегмента — рядки SegmentMember (матеріалізований список id), тож
+кількість береться з Segment.member_count, фільтр у списку клієнтів —
+один напівз’єднаний запит, а експорт — послідовне читання списку.
+
+Умови рахуються по кешованих полях клієнта (LTV, кількість і дата
+останнього замовлення) та тегах клієнта і його контактів. Після зміни
+тегів, даних клієнта чи його замовлень склад оновлюється лише для цього
+клієнта (фонова задача crm.refresh_client_segments); умова «замовляв за
+N днів» залежить і від дати, тому раз на добу сегменти перераховуються
+повністю (команда refresh_segments).
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Client, Contact, Segment, SegmentMember
+
+CHUNK = 10000
+
+EXPORT_FIELDS = [
+    ("id", "ID"),
+    ("name", "Клієнт"),
+    ("client_type", "Тип"),
+    ("tax_code", "Код ЄДРПОУ / РНОКПП"),
+    ("phones", "Телефони"),
+    ("email", "Email"),
+    ("source", "Джерело"),
+    ("lifetime_value", "LTV"),
+    ("orders_count", "Замовлень"),
+    ("last_order_at", "Останнє замовлення"),
+]
+
+
+def matching_clients(segment, client_ids=None):
+    """id клієнтів, що відповідають умовам сегмента (опційно — лише серед client_ids)."""
+    queryset = Client.objects.all()
+    if client_ids is not None:
+        queryset = queryset.filter(pk__in=client_ids)
+    if segment.source:
+        queryset = queryset.filter(source=segment.source)
+    if segment.client_type:
+        queryset = queryset.filter(client_type=segment.client_type)
+    if segment.ordered_within_days is not None:
+        queryset = queryset.filter(last_order_at__gte=timezone.now() - timedelta(days=segment.ordered_within_days))
+    if segment.min_lifetime_value is not None:
+        queryset = queryset.filter(lifetime_value__gte=segment.min_lifetime_value)
+    if segment.min_orders_count is not None:
+        queryset = queryset.filter(orders_count__gte=segment.min_orders_count)
+    for tag in segment.tags.all():
+        on_client = Client.tags.through.objects.filter(tag=tag).values("client_id")
+        on_contact = Contact.tags.through.objects.filter(tag=tag).values("contact__client_id")
+        queryset = queryset.filter(Q(pk__in=on_client) | Q(pk__in=on_contact))
+    return queryset.order_by().values_list("pk", flat=True)
+
+
+def _apply(segment, added, removed):
+    removed = list(removed)
+    for i in range(0, len(removed), CHUNK):
+        SegmentMember.objects.filter(segment=segment, client_id__in=removed[i:i + CHUNK]).delete()
+    SegmentMember.objects.bulk_create(
+        [SegmentMember(segment=segment, client_id=client_id) for client_id in added],
+        batch_size=CHUNK,
+        ignore_conflicts=True,
+    )
+
+
+def recount(segment_ids):
+    """
+    member_count сегментів — з фактичного складу одним UPDATE (COUNT, а не
+    приріст: рядки, пропущені ignore_conflicts чи видалені каскадом, не рахуються).
+    """
+    members = (
+        SegmentMember.objects.filter(segment=OuterRef("pk"))
+        .order_by()
+        .values("segment")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Segment.objects.filter(pk__in=list(segment_ids)).update(member_count=Coalesce(Subquery(members), 0))
+
+
+def refresh_segment(segment):
+    """Повний перерахунок складу; пишеться лише різниця. Повертає кількість учасників."""
+    matched = set(matching_clients(segment))
+    current = set(SegmentMember.objects.filter(segment=segment).values_list("client_id", flat=True))
+    with transaction.atomic():
+        _apply(segment, matched - current, current - matched)
+        segment.member_count = len(matched)
+        segment.refreshed_at = timezone.now()
+        segment.save(update_fields=["member_count", "refreshed_at"])
+    return segment.member_count
+
+
+def refresh_clients(client_ids):
+    """Оновлює склад усіх сегментів лише для client_ids (після зміни цих клієнтів)."""
+    client_ids = list(client_ids)
+    if not client_ids:
+        return
+    memberships = {}
+    for segment_id, client_id in SegmentMember.objects.filter(client_id__in=client_ids).values_list(
+        "segment_id", "client_id"
+    ):
+        memberships.setdefault(segment_id, set()).add(client_id)
+
+    for segment in Segment.objects.prefetch_related("tags"):
+        matched = set(matching_clients(segment, client_ids))
+        current = memberships.get(segment.pk, set())
+        added, removed = matched - current, current - matched
+        if not added and not removed:
+            continue
+        with transaction.atomic():
+            _apply(segment, added, removed)
+            recount([segment.pk])
+
+
+def export_rows(segment):
+    """Рядки для CSV: заголовок і клієнти сегмента (потоком, без завантаження всіх у пам’ять)."""
+    yield [label for _, label in EXPORT_FIELDS]
+    rows = (
+        Client.objects.filter(segment_memberships__segment=segment)
+        .order_by("pk")
+        .values_list(*[name for name, _ in EXPORT_FIELDS])
+    )
+    yield from rows.iterator(chunk_size=CHUNK)
@@ -0,0 +1,167 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core import changelog, jobs
+from manufacture import recurrence
+from . import segments
+from .catalog import product_catalog
+from .models import Client, Contact, Order, OrderItem, Product, Segment, SegmentMember, Tag, Task
+
+changelog.track(Order, [
+    "status", "contact", "deadline", "payment_amount", "payment_type",
+    "delivery_method", "tracking_number", "shipping_address",
+])
+changelog.track(OrderItem, ["order", "product", "quantity", "unit_price"])
+changelog.track(Task, ["title", "assigned_to", "date", "status"])
+
+
+def _schedule_metrics_refresh(client_id):
+    """
+    Перерахунок показників клієнта — фоновою задачею після коміту.
+    Кілька змін в одній транзакції (замовлення + позиції) — одна задача.
+    """
+    if client_id is not None:
+        jobs.enqueue_on_commit("crm.refresh_client_metrics", client_id=client_id)
+
+
+@receiver(pre_save, sender=Order)
+def order_saving(sender, instance, **kwargs):
+    # знімок журналу ще містить контакт до зміни (після save його оновлює changelog)
+    instance._previous_contact_id = getattr(instance, "_changelog_snapshot", {}).get("contact_id")
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, raw=False, **kwargs):
+    # закрите замовлення — його повторювані слоти більше не плануються
+    if not raw and instance.status in (Order.Status.COMPLETED, Order.Status.CANCELED):
+        recurrence.deactivate_for_orders([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance, **kwargs):
+    # замовлення перенесли до контакту іншого клієнта — перераховуються обидва
+    contact_ids = {instance.contact_id, getattr(instance, "_previous_contact_id", None)} - {None}
+    for client_id in set(Contact.objects.filter(pk__in=contact_ids).values_list("client_id", flat=True)):
+        _schedule_metrics_refresh(client_id)
+
+
+@receiver(pre_save, sender=Contact)
+def contact_saving(sender, instance, raw=False, **kwargs):
+    instance._previous_client_id = None
+    if not raw and not instance._state.adding:
+        instance._previous_client_id = (
+            Contact.objects.filter(pk=instance.pk).values_list("client_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Contact)
+def contact_saved(sender, instance, raw=False, **kwargs):
+    # контакт із замовленнями перейшов до іншого клієнта
+    previous = getattr(instance, "_previous_client_id", None)
+    if not raw and previous is not None and previous != instance.client_id:
+        _schedule_metrics_refresh(previous)
+        _schedule_metrics_refresh(instance.client_id)
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    client_id = (
+        Order.objects.filter(pk=instance.order_id)
+        .values_list("contact__client_id", flat=True)
+        .first()
+    )
+    _schedule_metrics_refresh(client_id)
+    # назва і сума замовлення — теж у фоні, а не під час збереження в адмінці
+    jobs.enqueue_on_commit("crm.refresh_order_summary", order_id=instance.order_id)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    # довідник товарів у пам’яті процесів — нова версія після коміту
+    transaction.on_commit(product_catalog.invalidate)
+
+
+def _schedule_segments_refresh(client_ids):
+    jobs.enqueue_many_on_commit(
+        ("crm.refresh_client_segments", {"client_id": client_id}) for client_id in set(client_ids)
+    )
+
+
+@receiver(post_save, sender=Client)
+def client_saved(sender, instance, raw=False, **kwargs):
+    # джерело і тип клієнта — умови сегментів
+    if not raw:
+        _schedule_segments_refresh([instance.pk])
+
+
+@receiver(pre_delete, sender=Client)
+def client_deleting(sender, instance, **kwargs):
+    # SegmentMember видаляються каскадом — member_count перераховуємо після коміту
+    segment_ids = list(SegmentMember.objects.filter(client=instance).values_list("segment_id", flat=True))
+    if segment_ids:
+        transaction.on_commit(partial(segments.recount, segment_ids))
+
+
+@receiver(m2m_changed, sender=Client.tags.through)
+def client_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # тег.clients.clear() — у post_clear pk_set порожній, клієнтів беремо заздалегідь
+        instance._cleared_client_ids = list(instance.clients.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        _schedule_segments_refresh([instance.pk])
+    elif action == "post_clear":
+        _schedule_segments_refresh(getattr(instance, "_cleared_client_ids", ()))
+    elif pk_set:
+        # тег.clients.add(...) — змінились клієнти з pk_set
+        _schedule_segments_refresh(pk_set)
+
+
+@receiver(m2m_changed, sender=Contact.tags.through)
+def contact_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        instance._cleared_contact_client_ids = list(instance.contacts.values_list("client_id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        _schedule_segments_refresh([instance.client_id])
+    elif action == "post_clear":
+        _schedule_segments_refresh(getattr(instance, "_cleared_contact_client_ids", ()))
+    elif pk_set:
+        _schedule_segments_refresh(
+            Contact.objects.filter(pk__in=pk_set).values_list("client_id", flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    # зв’язки тега видаляються каскадом без m2m_changed: змінюються клієнти з тегом
+    # (свій чи на контакті) і умови сегментів, що його вимагали
+    _schedule_segments_refresh([
+        *instance.clients.values_list("pk", flat=True),
+        *instance.contacts.values_list("client_id", flat=True),
+    ])
+    for segment_id in instance.segments.values_list("pk", flat=True):
+        jobs.enqueue_on_commit("crm.refresh_segment", segment_id=segment_id)
+
+
+@receiver(post_save, sender=Segment)
+def segment_saved(sender, instance, update_fields=None, **kwargs):
+    # умови змінились — повний перерахунок; збереження підсумків самим перерахунком — ні
+    if update_fields is None or not set(update_fields) <= {"member_count", "refreshed_at"}:
+        jobs.enqueue_on_commit("crm.refresh_segment", segment_id=instance.pk)
+
+
+@receiver(m2m_changed, sender=Segment.tags.through)
+def segment_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    # збереження сегмента з тегами в адмінці — одна задача (дедуплікація в черзі)
+    for segment_id in (pk_set or ()) if reverse else [instance.pk]:
+        jobs.enqueue_on_commit("crm.refresh_segment", segment_id=segment_id)
@@ -1,3 +1,98 @@
-from django.test import TestCase
+from collections import Counter
+from datetime import date
+from itertools import combinations
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .dedup import (
+    NAME_THRESHOLD, ClientRecord, blocking_keys, merge_clients, normalize_name, trigrams,
+)
+from .models import ArchivedOrder, Client, Contact, Order, Task
+
+
+class BlockingKeysTests(SimpleTestCase):
+    NAMES = [
+        "ТОВ Металобаза Київ", "Металобаза Київ", "ТОВ «Металобаза-Київ»", "Металбаза Київ",
+        "ФОП Петренко Іван", "Петренко Іван Олегович", "Петренко Іван", "Петренко І.",
+        "Агросталь", "Агро Сталь", "Агросталь Плюс", "Сталь Агро",
+        "Будмонтаж", "Будмонтаж-Сервіс", "Будмонтаж Сервіс ТОВ", "Монтажбуд",
+    ]
+
+    def test_similar_names_share_a_name_key(self):
+        records = [
+            ClientRecord(i, None, set(), set(), frozenset(trigrams(normalize_name(name))))
+            for i, name in enumerate(self.NAMES)
+        ]
+        frequency = Counter(gram for record in records for gram in record.grams)
+
+        def gram_order(gram):
+            return frequency[gram], gram
+
+        keys = {record.id: {key for key in blocking_keys(record, gram_order) if key[0] == "name"} for record in records}
+        checked = 0
+        for a, b in combinations(records, 2):
+            similarity = len(a.grams & b.grams) / len(a.grams | b.grams)
+            if similarity >= NAME_THRESHOLD:
+                checked += 1
+                self.assertTrue(keys[a.id] & keys[b.id], f"{self.NAMES[a.id]} / {self.NAMES[b.id]}")
+        self.assertGreater(checked, 0)
+
+
+class MergeClientsTests(TestCase):
+    def setUp(self):
+        self.target = Client.objects.create(name="ТОВ Металобаза")
+        self.duplicate = Client.objects.create(name="Металобаза")
+
+    def test_contacts_with_same_phone_are_folded_with_their_records(self):
+        kept = Contact.objects.create(client=self.target, full_name="Іван", phone="067 111 22 33")
+        folded = Contact.objects.create(client=self.duplicate, full_name="Іван П.", phone="+380671112233")
+        order = Order.objects.create(contact=folded)
+        task = Task.objects.create(contact=folded, title="Передзвонити", date=date.today())
+        archived = ArchivedOrder.objects.create(
+            id=10_000, contact=folded, status=Order.Status.COMPLETED,
+            created_at=timezone.now(), closed_at=timezone.now(),
+        )
+
+        merge_clients(self.target, [self.duplicate])
+
+        self.assertFalse(Contact.objects.filter(pk=folded.pk).exists())
+        self.assertEqual(Order.objects.get(pk=order.pk).contact_id, kept.pk)
+        self.assertEqual(Task.objects.get(pk=task.pk).contact_id, kept.pk)
+        self.assertEqual(ArchivedOrder.objects.get(pk=archived.pk).contact_id, kept.pk)
+        self.assertFalse(Client.objects.filter(pk=self.duplicate.pk).exists())
+
+    def test_contacts_with_same_name_only_stay_separate(self):
+        Contact.objects.create(client=self.target, full_name="Іван Петренко")
+        other = Contact.objects.create(client=self.duplicate, full_name="Іван Петренко")
+
+        merge_clients(self.target, [self.duplicate])
+
+        self.assertEqual(Contact.objects.get(pk=other.pk).client_id, self.target.pk)
+        self.assertEqual(Contact.objects.filter(client=self.target).count(), 2)
+
+    def test_phones_overflow_into_notes_as_whole_numbers(self):
+        self.target.phones = ", ".join(f"+38067{i:07d}" for i in range(14))
+        self.target.save()
+        self.duplicate.phones = ", ".join(f"+38050{i:07d}" for i in range(10))
+        self.duplicate.save()
+
+        merge_clients(self.target, [self.duplicate])
+
+        self.target.refresh_from_db()
+        max_length = Client._meta.get_field("phones").max_length
+        self.assertLessEqual(len(self.target.phones), max_length)
+        kept = self.target.phones.split(", ")
+        overflow = self.target.notes.removeprefix("Інші телефони: ").split(", ")
+        self.assertTrue(all(len(phone) == 13 for phone in kept + overflow))
+        self.assertEqual(len(kept) + len(overflow), 24)
+
+    def test_duplicate_tax_code_and_email_fill_empty_fields(self):
+        self.duplicate.tax_code = "12345678"
+        self.duplicate.email = "info@metal.ua"
+        self.duplicate.save()
+
+        merge_clients(self.target, [self.duplicate])
+
+        self.target.refresh_from_db()
+        self.assertEqual((self.target.tax_code, self.target.email), ("12345678", "info@metal.ua"))
@@ -0,0 +1,204 @@
+"""
+Синхронізація статусів посилок відправлених замовлень (Нова Пошта, Укрпошта).
+
+ТТН усіх відправлених замовлень збираються одним запитом і групуються
+пакетами, які API перевізника приймає за раз; пакети опитуються
+конкурентно (asyncio, спільний пул з’єднань, ліміт частоти на перевізника).
+Час останньої перевірки кожної ТТН тримається в кеші — посилки, перевірені
+нещодавно, не опитуються повторно, а в БД пишуться лише змінені статуси.
+Доставлене замовлення переводиться в «Завершений».
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.http import RateLimiter, async_client, gather_limited, request_json
+
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Parcel:
+    order_id: int
+    number: str
+    phone: str
+
+
+@dataclass(frozen=True)
+class ParcelStatus:
+    text: str
+    delivered: bool
+
+
+class NovaPoshta:
+    """TrackingDocument.getStatusDocuments: до 100 ТТН в одному запиті."""
+
+    batch_size = 100
+    # «Отримано», «Отримано, грошовий переказ …», «Отримано і створено ЄН зворотної доставки»
+    delivered_codes = {"9", "10", "11", "106"}
+
+    def __init__(self):
+        self.url = settings.NOVA_POSHTA_API_URL
+        self.api_key = settings.NOVA_POSHTA_API_KEY
+        self.limiter = RateLimiter(settings.NOVA_POSHTA_RATE_LIMIT)
+
+    async def fetch(self, client, parcels):
+        payload = {
+            "apiKey": self.api_key,
+            "modelName": "TrackingDocument",
+            "calledMethod": "getStatusDocuments",
+            "methodProperties": {
+                # з телефоном отримувача API віддає повний статус
+                "Documents": [{"DocumentNumber": p.number, "Phone": p.phone} for p in parcels],
+            },
+        }
+        data = await request_json(client, "POST", self.url, json=payload, limiter=self.limiter)
+        if not data.get("success", True):
+            raise ValueError(f"Нова Пошта: {data.get('errors')}")
+        return {
+            row["Number"]: ParcelStatus(row.get("Status", ""), str(row.get("StatusCode")) in self.delivered_codes)
+            for row in data.get("data", [])
+        }
+
+
+class Ukrposhta:
+    """statuses/last: останні події для списку штрихкодів."""
+
+    batch_size = 50
+    # «Вручено»
+    delivered_events = {"41000"}
+
+    def __init__(self):
+        self.url = settings.UKRPOSHTA_TRACKING_URL.rstrip("/") + "/statuses/last"
+        self.token = settings.UKRPOSHTA_TRACKING_TOKEN
+        self.limiter = RateLimiter(settings.UKRPOSHTA_RATE_LIMIT)
+
+    async def fetch(self, client, parcels):
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        data = await request_json(
+            client, "POST", self.url, json=[p.number for p in parcels], headers=headers, limiter=self.limiter,
+        )
+        return {
+            row["barcode"]: ParcelStatus(row.get("eventName", ""), str(row.get("event")) in self.delivered_events)
+            for row in data
+        }
+
+
+CARRIERS = {
+    Order.DeliveryMethod.NOVA_POSHTA: NovaPoshta,
+    Order.DeliveryMethod.UKRPOSHTA: Ukrposhta,
+}
+
+
+@dataclass
+class SyncResult:
+    checked: int = 0
+    skipped: int = 0
+    changed: int = 0
+    delivered: int = 0
+    failed: int = 0
+
+
+# {(метод, ТТН): час перевірки} — одним значенням, а не ключем на посилку
+# (LocMem-кеш тримає лише 300 ключів)
+CHECKED_CACHE_KEY = "crm:tracking:checked"
+
+
+async def fetch_statuses(parcels_by_method, concurrency=None):
+    """
+    {метод доставки: [Parcel]} → ({(метод, ТТН): ParcelStatus}, кількість ТТН з помилкою).
+    Пакети всіх перевізників опитуються конкурентно через один пул з’єднань.
+    """
+    concurrency = concurrency or settings.TRACKING_CONCURRENCY
+    statuses = {}
+    failed = 0
+    async with async_client(max_connections=concurrency, timeout=settings.TRACKING_TIMEOUT) as client:
+        batches = []
+        for method, parcels in parcels_by_method.items():
+            carrier = CARRIERS[method]()
+            for i in range(0, len(parcels), carrier.batch_size):
+                batches.append((method, carrier, parcels[i:i + carrier.batch_size]))
+
+        results = await gather_limited(
+            (carrier.fetch(client, batch) for _, carrier, batch in batches), concurrency
+        )
+        for (method, _, batch), result in zip(batches, results):
+            if isinstance(result, Exception):
+                logger.warning("Трекінг %s: пакет з %s ТТН не отримано: %r", method, len(batch), result)
+                failed += len(batch)
+                continue
+            for number, status in result.items():
+                statuses[method, number] = status
+    return statuses, failed
+
+
+def sync_tracking(recheck_seconds=None):
+    """Оновлює статуси посилок усіх відправлених замовлень; повертає SyncResult."""
+    recheck_seconds = settings.TRACKING_RECHECK_SECONDS if recheck_seconds is None else recheck_seconds
+    rows = list(
+        Order.objects.filter(status=Order.Status.SHIPPED, delivery_method__in=list(CARRIERS))
+        .exclude(tracking_number="")
+        .values_list("id", "delivery_method", "tracking_number", "recipient_phone", "tracking_status")
+    )
+    result = SyncResult()
+    if not rows:
+        return result
+
+    # нещодавно перевірені ТТН пропускаємо
+    started = time.time()
+    checked = {
+        key: checked_at
+        for key, checked_at in cache.get(CHECKED_CACHE_KEY, {}).items()
+        if started - checked_at < recheck_seconds
+    }
+    parcels_by_method = {}
+    stored = {}
+    for order_id, method, number, phone, tracking_status in rows:
+        number = number.strip()
+        if (method, number) in checked:
+            result.skipped += 1
+            continue
+        parcels_by_method.setdefault(method, []).append(Parcel(order_id, number, phone or ""))
+        stored[order_id] = tracking_status
+
+    statuses, result.failed = asyncio.run(fetch_statuses(parcels_by_method))
+    if recheck_seconds:
+        checked.update(dict.fromkeys(statuses, started))
+        cache.set(CHECKED_CACHE_KEY, checked, recheck_seconds)
+
+    now = timezone.now()
+    changed = []
+    delivered = []
+    for method, parcels in parcels_by_method.items():
+        for parcel in parcels:
+            status = statuses.get((method, parcel.number))
+            if status is None:
+                continue
+            result.checked += 1
+            if status.delivered:
+                delivered.append((parcel.order_id, status.text))
+            elif status.text != stored[parcel.order_id]:
+                changed.append(Order(pk=parcel.order_id, tracking_status=status.text, tracking_updated_at=now))
+
+    with transaction.atomic():
+        # лише статус посилки — без сигналів, одним запитом
+        Order.objects.bulk_update(changed, ["tracking_status", "tracking_updated_at"], batch_size=500)
+        result.changed = len(changed)
+        # зміна статусу замовлення — через save(): позначка часу, журнал змін, метрики клієнта
+        texts = dict(delivered)
+        for order in Order.objects.select_for_update().filter(pk__in=texts, status=Order.Status.SHIPPED):
+            order.status = Order.Status.COMPLETED
+            order.tracking_status = texts[order.pk]
+            order.tracking_updated_at = now
+            order.save(update_fields=["status", "tracking_status", "tracking_updated_at", "updated_at"])
+            result.delivered += 1
+    result.changed += result.delivered
+    return result
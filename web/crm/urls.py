@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import order_metrics_report
+
+urlpatterns = [
+    path("report/order-metrics/", order_metrics_report, name="order_metrics_report"),
+]
@@ -1,3 +1,46 @@
+from datetime import datetime, timedelta
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
+from django.utils.timezone import get_current_timezone
+
+from core.db import use_replica
+
+from . import metrics
+from .models import Order
+
+
+@staff_member_required
+@use_replica
+def order_metrics_report(request):
+    """
+    Lead time, WIP і пропускна здатність замовлень за період (?days=, дефолт рік).
+    """
+    today = datetime.now(get_current_timezone()).date()
+    try:
+        days = min(max(int(request.GET.get("days", 365)), 7), 3 * 365)
+    except ValueError:
+        days = 365
+    start = today - timedelta(days=days - 1)
+
+    lead_time = metrics.lead_time_percentiles(start, today)
+    throughput = metrics.throughput_by_week(start, today)
+    wip = metrics.wip_by_day(start, today)
+
+    status_labels = dict(Order.Status.choices)
+    wip_statuses = [(status, status_labels[status]) for status in metrics.WIP_STATUSES]
+    # у таблиці — останні 30 днів, повний ряд рахується для всього періоду
+    wip_rows = [
+        (day, [counts[status] for status, _ in wip_statuses])
+        for day, counts in wip[-30:]
+    ]
 
-# Create your views here.
+    return render(request, "order_metrics_report.html", {
+        "days": days,
+        "start": start,
+        "end": today,
+        "lead_time": lead_time,
+        "throughput": throughput,
+        "wip_statuses": wip_statuses,
+        "wip_rows": wip_rows,
+    })
@@ -1,11 +1,19 @@
-from django.contrib import admin
-from .models import Machine, WorkUnit, ProductionSlot
+from datetime import timedelta
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from . import recurrence
+from .bulk import BulkSlotError, reassign_slots, shift_slots
+from .models import Machine, WorkUnit, ProductionSlot, ArchivedProductionSlot, RecurringSlot
 from django.urls import path
 from django.template.response import TemplateResponse
 from django.utils.dateparse import parse_datetime
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 
+from core.pagination import EstimatedCountAdminMixin
+
 
 @admin.register(Machine)
 class MachineAdmin(admin.ModelAdmin):
@@ -31,11 +39,58 @@ class WorkUnitAdmin(admin.ModelAdmin):
     search_fields = ["name", "comment"]
 
 
+class ProductionSlotActionForm(ActionForm):
+    machine = forms.ModelChoiceField(Machine.objects.all(), label="Верстат", required=False)
+    shift_hours = forms.DecimalField(label="Зсув, год", required=False, max_digits=6, decimal_places=2)
+
+
 @admin.register(ProductionSlot)
-class ProductionSlotAdmin(admin.ModelAdmin):
-    list_display = ("order", "machine", "work_unit", "start_datetime", "end_datetime")
+class ProductionSlotAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ("order_label", "machine", "work_unit", "start_datetime", "end_datetime")
     list_filter = ("machine", "work_unit")
-    search_fields = ("order__id", "order__name")  # підстав свої поля в Order
+    date_hierarchy = "start_datetime"
+    actions = ["reassign", "shift"]
+    action_form = ProductionSlotActionForm
+    list_select_related = ("order__contact", "machine", "work_unit")
+    search_fields = ("=order__id", "order__title", "order__contact__full_name")
+    # пошук серед відкритих замовлень замість <select> з усіма замовленнями
+    autocomplete_fields = ("order",)
+
+    @admin.display(description="Замовлення", ordering="order__created_at")
+    def order_label(self, obj):
+        order = obj.order
+        return f"{order.created_at:%d.%m.%Y} – {order.contact.full_name} – {order.title or 'Без товарів'} – {order.total}"
+
+    def _action_value(self, request, name):
+        form = self.action_form(request.POST)
+        form.fields["action"].choices = self.get_action_choices(request)
+        return form.cleaned_data.get(name) if form.is_valid() else None
+
+    @admin.action(description="Перенести на верстат (вибраний поруч)", permissions=["change"])
+    def reassign(self, request, queryset):
+        machine = self._action_value(request, "machine")
+        if machine is None:
+            self.message_user(request, "Оберіть верстат поруч із дією.", messages.ERROR)
+            return
+        try:
+            updated = reassign_slots(queryset, machine)
+        except BulkSlotError as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            return
+        self.message_user(request, f"Перенесено на {machine} слотів: {updated}", messages.SUCCESS)
+
+    @admin.action(description="Зсунути в часі (годин поруч, можна від’ємне)", permissions=["change"])
+    def shift(self, request, queryset):
+        hours = self._action_value(request, "shift_hours")
+        if not hours:
+            self.message_user(request, "Вкажіть зсув у годинах поруч із дією.", messages.ERROR)
+            return
+        try:
+            updated = shift_slots(queryset, timedelta(hours=float(hours)))
+        except BulkSlotError as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            return
+        self.message_user(request, f"Зсунуто на {hours} год слотів: {updated}", messages.SUCCESS)
 
     # 1) додаємо власний URL /calendar/ до маршрутизації цієї моделі
     def get_urls(self):
@@ -92,3 +147,48 @@ class ProductionSlotAdmin(admin.ModelAdmin):
         return HttpResponseRedirect(url)
 
 
+@admin.register(RecurringSlot)
+class RecurringSlotAdmin(admin.ModelAdmin):
+    list_display = ("title", "order", "machine", "work_unit", "start_datetime", "rule", "is_active", "materialized_until")
+    list_filter = ("is_active", "machine", "work_unit")
+    list_select_related = ("order__contact", "machine", "work_unit")
+    search_fields = ("title", "=order__id", "rule")
+    autocomplete_fields = ("order",)
+    readonly_fields = ("materialized_until",)
+    actions = ["materialize"]
+    fieldsets = (
+        (None, {
+            "fields": ("title", "order", ("machine", "work_unit"), "is_active", "comment"),
+        }),
+        ("Повторення", {
+            "fields": (("start_datetime", "end_datetime"), "rule", "materialized_until"),
+        }),
+    )
+
+    @admin.action(
+        description=f"Зберегти входження слотами на {recurrence.MATERIALIZE_DAYS} днів наперед",
+        permissions=["change"],
+    )
+    def materialize(self, request, queryset):
+        created = recurrence.materialize(queryset=queryset)
+        self.message_user(request, f"Створено слотів: {created}", messages.SUCCESS)
+
+
+@admin.register(ArchivedProductionSlot)
+class ArchivedProductionSlotAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    """Слоти архівних замовлень — лише перегляд."""
+    list_display = ("order", "machine", "work_unit", "start_datetime", "end_datetime")
+    list_filter = ("machine", "work_unit")
+    search_fields = ("=order__id",)
+    list_select_related = ("order", "machine", "work_unit")
+    date_hierarchy = "start_datetime"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
@@ -0,0 +1,147 @@
+"""
+Масові зміни слотів: перенесення на інший верстат і зсув у часі.
+
+Кожна операція — одна перевірка перетинів (EXISTS по слотах того самого
+ресурсу) і один UPDATE на весь набір. Журнал змін, перерахунок
+завантаженості (одна задача на ресурс за весь діапазон дат) і прогрів
+кешу звітів ставляться один раз на операцію, а не на кожен слот.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, F, Max, Min, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.timezone import localtime
+
+from core import changelog
+
+from . import utilization
+from .caching import schedule_report_warmup
+from .models import Machine, ProductionSlot, WorkUnit
+
+# скільки конфліктних слотів показувати в повідомленні
+MAX_REPORTED = 5
+
+
+class BulkSlotError(Exception):
+    pass
+
+
+def _overlapping(delta, exclude, **resource):
+    """Слоти ресурсу, що перетинаються з інтервалом зовнішнього слота, зсунутим на delta."""
+    return ProductionSlot.objects.filter(
+        **resource,
+        start_datetime__lt=OuterRef("end_datetime") + delta,
+        end_datetime__gt=OuterRef("start_datetime") + delta,
+    ).exclude(pk__in=exclude)
+
+
+def _raise_conflicts(slots, others):
+    conflicts = list(
+        slots.filter(Exists(others))
+        .annotate(other_id=Subquery(others.values("pk")[:1]))
+        .values_list("pk", "other_id")[:MAX_REPORTED]
+    )
+    if conflicts:
+        pairs = ", ".join(f"#{slot_id} з #{other_id}" for slot_id, other_id in conflicts)
+        raise BulkSlotError(f"Слоти перетинаються: {pairs}.")
+
+
+def _check_working_hours(slots, delta, machine=None):
+    """Новий час кожного слота — в межах робочого дня кожного його (нового) ресурсу."""
+    machines = Machine.objects.in_bulk() if machine is None else {machine.pk: machine}
+    units = WorkUnit.objects.in_bulk()
+    outside = []
+    rows = slots.values_list("pk", "machine_id", "work_unit_id", "start_datetime", "end_datetime")
+    for slot_id, machine_id, work_unit_id, start, end in rows.iterator(chunk_size=2000):
+        start, end = localtime(start + delta), localtime(end + delta)
+        for resource in (machine or machines.get(machine_id), units.get(work_unit_id)):
+            if resource is None:
+                continue
+            day_start, day_end = resource.get_workday()
+            if start.date() != end.date() or start.time() < day_start or end.time() > day_end:
+                outside.append(slot_id)
+                break
+    if outside:
+        ids = ", ".join(f"#{slot_id}" for slot_id in outside[:MAX_REPORTED])
+        raise BulkSlotError(f"Поза робочим днем ресурсу: {ids}" + (" …" if len(outside) > MAX_REPORTED else "."))
+
+
+def _ranges(slots):
+    """[(machine_id, work_unit_id, перший початок, останній кінець)] по ресурсах набору."""
+    return list(
+        slots.order_by()
+        .values_list("machine_id", "work_unit_id")
+        .annotate(start=Min("start_datetime"), end=Max("end_datetime"))
+    )
+
+
+def _update(slots, changes, log):
+    """UPDATE набору з новою версією (календар побачить зміну) і журнал змін."""
+    old = {
+        attname: dict(slots.values_list("pk", attname))
+        for attname in log
+    }
+    updated = slots.update(**changes, version=F("version") + 1, updated_at=timezone.now())
+    for attname, new_value in log.items():
+        changelog.log_update(ProductionSlot, attname, old[attname], new_value)
+    schedule_report_warmup()
+    return updated
+
+
+def _locked(queryset):
+    """Слоти набору з часом, заблоковані до кінця транзакції."""
+    ids = list(
+        ProductionSlot.objects.select_for_update()
+        .filter(pk__in=queryset.values("pk"), start_datetime__isnull=False, end_datetime__isnull=False)
+        .values_list("pk", flat=True)
+    )
+    return ProductionSlot.objects.filter(pk__in=ids)
+
+
+@transaction.atomic
+def reassign_slots(queryset, machine):
+    """Переносить слоти на верстат machine (час не змінюється). Повертає кількість слотів."""
+    slots = _locked(queryset)
+    moved = slots.values("pk")
+    _check_working_hours(slots, timedelta(0), machine)
+    # зі слотами верстата поза набором і між собою (зі слотів різних верстатів)
+    _raise_conflicts(slots, _overlapping(timedelta(0), moved, machine=machine))
+    _raise_conflicts(
+        slots,
+        ProductionSlot.objects.filter(
+            pk__in=moved,
+            start_datetime__lt=OuterRef("end_datetime"),
+            end_datetime__gt=OuterRef("start_datetime"),
+        ).exclude(pk=OuterRef("pk")),
+    )
+
+    ranges = _ranges(slots)
+    updated = _update(slots, {"machine": machine}, {"machine_id": machine.pk})
+    for machine_id, work_unit_id, start, end in ranges:
+        utilization.schedule_refresh(machine_id, work_unit_id, start, end)
+        utilization.schedule_refresh(machine.pk, None, start, end)
+    return updated
+
+
+@transaction.atomic
+def shift_slots(queryset, delta):
+    """Зсуває слоти на delta (timedelta) на тих самих ресурсах. Повертає кількість слотів."""
+    slots = _locked(queryset)
+    if not delta:
+        return 0
+    moved = slots.values("pk")
+    _check_working_hours(slots, delta)
+    # взаємне розташування слотів набору не змінюється — перевіряються лише інші
+    _raise_conflicts(slots, _overlapping(delta, moved, machine_id=OuterRef("machine_id")))
+    _raise_conflicts(slots, _overlapping(delta, moved, work_unit_id=OuterRef("work_unit_id")))
+
+    ranges = _ranges(slots)
+    updated = _update(
+        slots,
+        {"start_datetime": F("start_datetime") + delta, "end_datetime": F("end_datetime") + delta},
+        {"start_datetime": lambda old: old + delta, "end_datetime": lambda old: old + delta},
+    )
+    for machine_id, work_unit_id, start, end in ranges:
+        utilization.schedule_refresh(machine_id, work_unit_id, min(start, start + delta), max(end, end + delta))
+    return updated
@@ -0,0 +1,132 @@
+"""
+Умовні GET-запити (ETag / 304) і кеш готових даних для звітів та стрічки подій.
+
+Версія даних — один дешевий запит: MAX(updated_at) по слотах і замовленнях
+(обидва поля з індексом). Видалення слота оновлює updated_at його замовлення
+(див. manufacture.signals), тож теж змінює версію. До неї додаються версії
+норм часу (manufacture.norms) — від них залежить прогноз завантаженості —,
+повторюваних слотів (manufacture.recurrence), що розгортаються у звітах,
+і ресурсів: назви, типи й робочий день верстатів і дільниць теж у звітах.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Value
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.timezone import get_current_timezone
+
+from core.localcache import VersionedCache
+
+from .models import ProductionSlot
+from .norms import production_norms
+
+# скільки живуть закешовані дані однієї версії (версія змінюється раніше при будь-якій правці)
+PAYLOAD_CACHE_TIMEOUT = 60 * 60
+
+# лише версія: верстати й дільниці звіти читають самі, сигнали змінюють її
+# при кожній правці (manufacture.signals)
+resources = VersionedCache("manufacture.resources", lambda: None)
+
+
+def schedule_version():
+    """
+    Рядок-маркер поточного стану розкладу: змінюється при будь-якій зміні
+    слотів, замовлень, норм часу, повторюваних слотів або ресурсів.
+    """
+    from crm.models import Order
+
+    from .recurrence import recurring_slots
+
+    slots = (
+        ProductionSlot.objects.order_by()
+        .annotate(kind=Value("slots"))
+        .values_list("kind")
+        .annotate(updated=Max("updated_at"))
+        .values_list("kind", "updated")
+    )
+    orders = (
+        Order.objects.order_by()
+        .annotate(kind=Value("orders"))
+        .values_list("kind")
+        .annotate(updated=Max("updated_at"))
+        .values_list("kind", "updated")
+    )
+    markers = dict(slots.union(orders, all=True))
+    return "|".join(str(part) for part in (
+        markers.get("slots"),
+        markers.get("orders"),
+        production_norms.version(),
+        recurring_slots.version(),
+        resources.version(),
+    ))
+
+
+# кеші, які бачить лише свій процес — прогрів у воркері для них марний
+_LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def schedule_report_warmup():
+    """Прогрів кешу звітів після коміту — лише зі спільним кешем (redis/memcached)."""
+    from core import jobs
+
+    if settings.CACHES["default"]["BACKEND"] not in _LOCAL_CACHE_BACKENDS:
+        jobs.enqueue_on_commit("manufacture.warm_report_cache")
+
+
+def _digest(*parts):
+    return hashlib.md5("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def conditional_on_schedule(view):
+    """
+    Декоратор async-view: рахує ETag із версії розкладу та параметрів запиту
+    і відповідає 304, якщо клієнт уже має актуальну версію.
+    Версія доступна у view як request.schedule_version.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        version = await sync_to_async(schedule_version)()
+        user = await request.auser()
+        today = datetime.now(get_current_timezone()).date()
+        # користувач — бо HTML-сторінки адмінки персональні; дата — бо звіти від неї залежать
+        etag = '"%s"' % _digest(
+            view.__name__,
+            user.pk,
+            today,
+            args,
+            sorted(kwargs.items()),
+            sorted(request.GET.lists()),
+            version,
+        )
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            request.schedule_version = version
+            response = await view(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
+
+
+async def cached_payload(name, parts, version, build):
+    """
+    Дані звіту з кешу за ключем (назва, параметри, версія);
+    build — корутина, яка рахує їх, якщо в кеші немає.
+    """
+    key = f"manufacture:{name}:{_digest(*parts, version)}"
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = await build()
+        await cache.aset(key, payload, PAYLOAD_CACHE_TIMEOUT)
+    return payload
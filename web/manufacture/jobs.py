@@ -0,0 +1,34 @@
+from datetime import date
+
+from asgiref.sync import async_to_sync
+from django.utils import timezone
+
+from core.jobs import job
+
+from . import utilization
+from .caching import cached_payload, schedule_version
+
+
+@job("manufacture.warm_report_cache")
+def warm_report_cache():
+    """
+    Прогріває кеш звіту завантаження для поточної версії розкладу.
+    Має сенс лише зі спільним кешем (DJANGO_CACHE_BACKEND=redis/memcached),
+    LocMem у воркері не видно веб-процесу.
+    """
+    from .views import _machine_load_data
+
+    today = timezone.localdate()
+    async_to_sync(cached_payload)(
+        "machine_load", [today], schedule_version(), lambda: _machine_load_data(today)
+    )
+
+
+@job("manufacture.refresh_utilization")
+def refresh_utilization(start, end, machine_id=None, work_unit_id=None):
+    utilization.rebuild(
+        date.fromisoformat(start),
+        date.fromisoformat(end),
+        machine_ids=[machine_id] if machine_id is not None else None,
+        work_unit_ids=[work_unit_id] if work_unit_id is not None else None,
+    )
@@ -1,5 +1,12 @@
+from datetime import time
+
 from django.db import models
 
+# Загальний графік, якщо для ресурсу не задано власний робочий день
+DEFAULT_WORKDAY_START = time(8, 0)
+DEFAULT_WORKDAY_END = time(17, 0)
+
+
 class Machine(models.Model):
     class MachineType(models.TextChoices):
         LASER = "laser", "Лазер"
@@ -42,6 +49,12 @@ class Machine(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
 
+    def get_workday(self):
+        """(початок, кінець) робочого дня верстата."""
+        if self.workday_start and self.workday_end:
+            return self.workday_start, self.workday_end
+        return DEFAULT_WORKDAY_START, DEFAULT_WORKDAY_END
+
     def has_delete_permission(self, request, obj=None):
         return False  # нельзя удалить нигде в админке
 
@@ -76,11 +89,90 @@ class WorkUnit(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
 
+    def get_workday(self):
+        # власного графіка у дільниць поки немає — загальний 08–17
+        return DEFAULT_WORKDAY_START, DEFAULT_WORKDAY_END
+
     def has_delete_permission(self, request, obj=None):
         return False  # нельзя удалить нигде в админке
 
 
 
+class RecurringSlot(models.Model):
+    """
+    Шаблон повторюваного слота (обслуговування, постійні замовлення).
+    Входження розгортаються за правилом RRULE на льоту (manufacture.recurrence);
+    до materialized_until вони вже збережені як звичайні ProductionSlot.
+    """
+    title = models.CharField("Назва", max_length=255)
+    order = models.ForeignKey(
+        "crm.Order",
+        related_name="recurring_slots",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Замовлення",
+        help_text="Без замовлення (напр. обслуговування) входження лише показуються, не матеріалізуються",
+    )
+    machine = models.ForeignKey(
+        Machine,
+        related_name="recurring_slots",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Верстат",
+    )
+    work_unit = models.ForeignKey(
+        WorkUnit,
+        related_name="recurring_slots",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Виробнича дільниця",
+    )
+
+    start_datetime = models.DateTimeField("Початок першого входження")
+    end_datetime = models.DateTimeField("Кінець першого входження")
+    rule = models.CharField(
+        "Правило повторення (RRULE)",
+        max_length=500,
+        help_text="Напр.: FREQ=WEEKLY;BYDAY=MO — щопонеділка; FREQ=DAILY;INTERVAL=2;COUNT=10; "
+                  "UNTIL — у UTC (20261231T000000Z)",
+    )
+    is_active = models.BooleanField("Активний", default=True)
+    comment = models.CharField("Коментар", max_length=500, blank=True)
+
+    materialized_until = models.DateTimeField("Збережено слотами до", null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField("Оновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Повторюваний слот"
+        verbose_name_plural = "Повторювані слоти"
+        ordering = ["start_datetime", "id"]
+
+    def __str__(self):
+        return f"{self.title} – {self.machine or self.work_unit}"
+
+    @property
+    def resource(self):
+        return self.machine or self.work_unit
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        from .recurrence import parse_rule
+
+        if self.machine_id is None and self.work_unit_id is None:
+            raise ValidationError("Вкажіть верстат або дільницю.")
+        if self.start_datetime and self.end_datetime:
+            if self.start_datetime >= self.end_datetime:
+                raise ValidationError({"end_datetime": "Кінець має бути пізніше за початок."})
+            try:
+                parse_rule(self.rule, self.start_datetime)
+            except ValueError as exc:
+                raise ValidationError({"rule": f"Некоректне правило: {exc}"})
+
+
 class ProductionSlot(models.Model):
     order = models.ForeignKey(
         "crm.Order",
@@ -112,6 +204,22 @@ class ProductionSlot(models.Model):
 
     comment = models.CharField("Коментар", max_length=500, blank=True)
 
+    # входження повторюваного слота, збережене manufacture.recurrence.materialize
+    recurrence = models.ForeignKey(
+        RecurringSlot,
+        related_name="slots",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Повторюваний слот",
+    )
+
+    # лічильник для оптимістичного блокування (drag&drop у календарі)
+    version = models.PositiveIntegerField("Версія", default=0, editable=False)
+    # маркер для ETag звітів і стрічки подій (див. manufacture.caching)
+    updated_at = models.DateTimeField("Оновлено", auto_now=True, db_index=True)
+
     class Meta:
         verbose_name = "Слот виробництва"
         verbose_name_plural = "Слоти виробництва"
@@ -120,3 +228,180 @@ class ProductionSlot(models.Model):
     def __str__(self):
         location = self.machine or self.work_unit
         return f"{self.order} – {location}"
+
+    def save(self, *args, **kwargs):
+        # кожне збереження (адмінка, інлайн) — нова версія, щоб календар не перезаписав зміну
+        adding = self._state.adding
+        if not adding:
+            self.version = models.F("version") + 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "version"}
+        super().save(*args, **kwargs)
+        if not adding:
+            self.refresh_from_db(fields=["version"])
+
+    @property
+    def resource(self):
+        return self.machine or self.work_unit
+
+
+class ArchivedProductionSlot(models.Model):
+    """Слот архівного замовлення (переноситься разом із ним, див. crm.archive)."""
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        "crm.ArchivedOrder",
+        related_name="slots",
+        on_delete=models.CASCADE,
+        verbose_name="Замовлення",
+    )
+    machine = models.ForeignKey(
+        Machine,
+        related_name="archived_slots",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Верстат",
+    )
+    work_unit = models.ForeignKey(
+        WorkUnit,
+        related_name="archived_slots",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Виробнича дільниця",
+    )
+    start_datetime = models.DateTimeField("Початок", null=True, blank=True)
+    end_datetime = models.DateTimeField("Кінець", null=True, blank=True)
+    comment = models.CharField("Коментар", max_length=500, blank=True)
+
+    class Meta:
+        verbose_name = "Архівний слот виробництва"
+        verbose_name_plural = "Архів слотів виробництва"
+        ordering = ["start_datetime", "id"]
+
+    def __str__(self):
+        return f"{self.order} – {self.machine or self.work_unit}"
+
+
+class ResourceUtilization(models.Model):
+    """
+    Денний підсумок завантаженості ресурсу (верстата або дільниці) для історичних
+    звітів. Заповнюється з ProductionSlot (manufacture.utilization).
+    """
+    machine = models.ForeignKey(
+        Machine,
+        related_name="utilization",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Верстат",
+    )
+    work_unit = models.ForeignKey(
+        WorkUnit,
+        related_name="utilization",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Виробнича дільниця",
+    )
+    # тип верстата / дільниці на момент розрахунку — для графіків за типами
+    resource_type = models.CharField("Тип ресурсу", max_length=32)
+    date = models.DateField("Дата")
+    busy_seconds = models.PositiveIntegerField("Зайнято, с", default=0)
+    available_seconds = models.PositiveIntegerField("Доступно, с", default=0)
+    slot_count = models.PositiveSmallIntegerField("Слотів", default=0)
+
+    class Meta:
+        verbose_name = "Завантаженість за день"
+        verbose_name_plural = "Завантаженість за днями"
+        ordering = ["date"]
+        indexes = [
+            # звіти фільтрують за діапазоном дат — дата першою, щоб діапазон читався з індексу
+            models.Index(
+                fields=["date", "resource_type"],
+                include=["busy_seconds", "available_seconds", "slot_count"],
+                name="manuf_util_date_type_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["machine", "date"],
+                condition=models.Q(machine__isnull=False),
+                name="manuf_util_machine_date_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["work_unit", "date"],
+                condition=models.Q(work_unit__isnull=False),
+                name="manuf_util_unit_date_uniq",
+            ),
+            models.CheckConstraint(
+                condition=models.Q(machine__isnull=True) ^ models.Q(work_unit__isnull=True),
+                name="manuf_util_one_resource",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.machine or self.work_unit} – {self.date:%d.%m.%Y}"
+
+    @property
+    def percent(self):
+        if not self.available_seconds:
+            return 0
+        return round(self.busy_seconds / self.available_seconds * 100)
+
+
+class RouteOperation(models.Model):
+    """
+    Крок технологічного маршруту продукту: тип верстата або дільниці,
+    порядок і норма часу. Використовується планувальником (manufacture.scheduler).
+    """
+    product = models.ForeignKey(
+        "crm.Product",
+        related_name="route",
+        on_delete=models.CASCADE,
+        verbose_name="Продукт",
+    )
+    sequence = models.PositiveSmallIntegerField("Порядок")
+    name = models.CharField("Операція", max_length=100, blank=True)
+    machine_type = models.CharField(
+        "Тип верстата",
+        max_length=20,
+        choices=Machine.MachineType.choices,
+        blank=True,
+    )
+    work_unit_type = models.CharField(
+        "Тип дільниці",
+        max_length=32,
+        choices=WorkUnit.UnitType.choices,
+        blank=True,
+    )
+    setup_minutes = models.PositiveIntegerField("Налагодження, хв", default=0)
+    minutes_per_unit = models.DecimalField("Хв на одиницю", max_digits=8, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Операція маршруту"
+        verbose_name_plural = "Маршрут виробництва"
+        ordering = ["product", "sequence"]
+        constraints = [
+            models.UniqueConstraint(fields=["product", "sequence"], name="manuf_route_product_seq_uniq"),
+            # рівно один тип ресурсу: або верстат, або дільниця
+            models.CheckConstraint(
+                condition=models.Q(machine_type="") ^ models.Q(work_unit_type=""),
+                name="manuf_route_one_resource_type",
+            ),
+        ]
+
+    def __str__(self):
+        resource = self.get_machine_type_display() if self.machine_type else self.get_work_unit_type_display()
+        return f"{self.sequence}. {self.name or resource}"
+
+    @property
+    def resource_key(self):
+        """("machine"|"work_unit", тип) — група ресурсів, що виконують операцію."""
+        if self.machine_type:
+            return "machine", self.machine_type
+        return "work_unit", self.work_unit_type
+
+    def duration_minutes(self, quantity):
+        return self.setup_minutes + float(self.minutes_per_unit) * quantity
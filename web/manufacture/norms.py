@@ -0,0 +1,93 @@
+"""
+Норми часу виробництва в пам’яті процесу та оцінка трудомісткості.
+
+Норми — це маршрути продуктів (RouteOperation): для кожного кроку тип
+верстата чи дільниці, налагодження і хвилини на одиницю. Довідник
+вантажиться одним запитом і скидається після зміни маршруту
+(manufacture.signals), тож оцінка позицій не робить запитів до норм.
+"""
+from typing import NamedTuple
+
+from core.localcache import VersionedCache
+
+from .models import Machine, RouteOperation, WorkUnit
+
+RESOURCE_LABELS = {
+    **{("machine", value): label for value, label in Machine.MachineType.choices},
+    **{("work_unit", value): label for value, label in WorkUnit.UnitType.choices},
+}
+
+
+class Norm(NamedTuple):
+    sequence: int
+    name: str
+    kind: str
+    type: str
+    setup_minutes: float
+    minutes_per_unit: float
+
+    def __str__(self):
+        return f"{self.sequence}. {self.name or resource_label(self.resource_key)}"
+
+    @property
+    def resource_key(self):
+        """("machine"|"work_unit", тип) — група ресурсів, що виконують операцію."""
+        return self.kind, self.type
+
+    def duration_minutes(self, quantity):
+        return self.setup_minutes + self.minutes_per_unit * quantity
+
+
+def _load():
+    routes = {}
+    for operation in RouteOperation.objects.order_by("product_id", "sequence"):
+        kind, type_ = operation.resource_key
+        routes.setdefault(operation.product_id, []).append(Norm(
+            operation.sequence,
+            operation.name,
+            kind,
+            type_,
+            float(operation.setup_minutes),
+            float(operation.minutes_per_unit),
+        ))
+    return {product_id: tuple(norms) for product_id, norms in routes.items()}
+
+
+production_norms = VersionedCache("manufacture.production_norms", _load)
+
+
+def resource_label(key):
+    return RESOURCE_LABELS.get(key, key[1])
+
+
+def route(product_id):
+    """Кроки маршруту продукту за порядком (порожній кортеж — норм немає)."""
+    return production_norms.get().get(product_id, ())
+
+
+def estimate(items):
+    """
+    Трудомісткість позицій за один прохід.
+    items — пари (ключ, product_id, quantity); ключем зазвичай є id
+    замовлення. Повертає {ключ: {(kind, тип): хвилини}}; позиції без
+    маршруту пропускаються.
+    """
+    routes = production_norms.get()
+    result = {}
+    for key, product_id, quantity in items:
+        for norm in routes.get(product_id, ()):
+            minutes = result.setdefault(key, {})
+            minutes[norm.resource_key] = minutes.get(norm.resource_key, 0) + norm.duration_minutes(quantity)
+    return result
+
+
+def estimate_orders(order_ids):
+    """Трудомісткість замовлень: одним запитом по позиціях."""
+    from crm.models import OrderItem
+
+    rows = OrderItem.objects.filter(order_id__in=order_ids).values_list("order_id", "product_id", "quantity")
+    return estimate(rows.iterator(chunk_size=2000))
+
+
+def total_hours(minutes_by_resource):
+    return round(sum(minutes_by_resource.values()) / 60, 1)
@@ -0,0 +1,126 @@
+"""
+Сітка зайнятості ресурсів для векторних розрахунків завантаженості.
+
+Розклад кожного ресурсу — рядок масиву NumPy з інтервалами по BUCKET_MINUTES
+хвилин від початку першого дня: значення — скільки слотів займають інтервал.
+Сітка будується одним проходом із сирих кортежів (values_list), а завантаженість,
+вільні вікна й накладки слотів рахуються як редукції над масивом.
+
+Інтервали відраховуються від опівночі першого дня у фіксованих хвилинах,
+тож у дні переходу на літній/зимовий час межі зсуваються на годину.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.utils.timezone import make_aware
+
+BUCKET_MINUTES = 15
+
+
+def _runs(row):
+    """Початки й кінці (не включно) безперервних ділянок True у 1-D масиві."""
+    padded = np.concatenate(([False], row, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
+
+
+class OccupancyGrid:
+    def __init__(self, resources, start_date, days, bucket_minutes=BUCKET_MINUTES):
+        self.resources = list(resources)
+        self.index = {resource.pk: i for i, resource in enumerate(self.resources)}
+        self.start_date = start_date
+        self.days = days
+        self.bucket_seconds = bucket_minutes * 60
+        self.per_day = 24 * 60 // bucket_minutes
+        self.origin = make_aware(datetime.combine(start_date, time.min))
+        self.counts = np.zeros((len(self.resources), days * self.per_day), dtype=np.int32)
+        self.working = self._working_mask()
+
+    def _bucket(self, value):
+        return (value.hour * 60 + value.minute) * 60 // self.bucket_seconds
+
+    def _working_mask(self):
+        day = np.zeros((len(self.resources), self.per_day), dtype=bool)
+        for i, resource in enumerate(self.resources):
+            start, end = resource.get_workday()
+            day[i, self._bucket(start):self._bucket(end)] = True
+        return np.tile(day, (1, self.days))
+
+    def add(self, rows):
+        """rows — кортежі (id ресурсу, початок, кінець); чужі ресурси пропускаються."""
+        rows = [(self.index[pk], start, end) for pk, start, end in rows if pk in self.index and start and end]
+        if not rows:
+            return
+        resource_idx, starts, ends = zip(*rows)
+        origin = self.origin.timestamp()
+        size = self.counts.shape[1]
+        starts = np.array([s.timestamp() for s in starts]) - origin
+        ends = np.array([e.timestamp() for e in ends]) - origin
+        first = np.clip(np.floor(starts / self.bucket_seconds), 0, size).astype(np.int64)
+        last = np.clip(np.ceil(ends / self.bucket_seconds), 0, size).astype(np.int64)
+        resource_idx = np.array(resource_idx)
+        keep = first < last
+
+        # різницевий масив: +1 на початку слота, -1 після кінця, далі cumsum
+        diff = np.zeros((len(self.resources), size + 1), dtype=np.int32)
+        np.add.at(diff, (resource_idx[keep], first[keep]), 1)
+        np.add.at(diff, (resource_idx[keep], last[keep]), -1)
+        self.counts += np.cumsum(diff[:, :-1], axis=1, dtype=np.int32)
+
+    # --- редукції ---
+
+    def _span(self, start_day, days):
+        lo = start_day * self.per_day
+        return slice(lo, lo + days * self.per_day)
+
+    def busy_working(self):
+        return (self.counts > 0) & self.working
+
+    def daily_utilization(self):
+        """Масив (ресурси × дні) з часткою зайнятого робочого часу, 0..1."""
+        shape = (len(self.resources), self.days, self.per_day)
+        busy = self.busy_working().reshape(shape).sum(axis=2)
+        available = self.working.reshape(shape).sum(axis=2)
+        return np.divide(busy, available, out=np.zeros(busy.shape), where=available > 0)
+
+    def utilization(self, start_day=0, days=None):
+        """Частка зайнятого робочого часу кожного ресурсу за дні [start_day, start_day + days)."""
+        span = self._span(start_day, self.days - start_day if days is None else days)
+        busy = self.busy_working()[:, span].sum(axis=1)
+        available = self.working[:, span].sum(axis=1)
+        return np.divide(busy, available, out=np.zeros(busy.shape), where=available > 0)
+
+    def free_minutes(self):
+        """Вільний робочий час кожного ресурсу за весь період, хвилини."""
+        free = (self.working & (self.counts == 0)).sum(axis=1)
+        return free * self.bucket_seconds / 60
+
+    def _to_datetime(self, bucket):
+        return self.origin + timedelta(seconds=int(bucket) * self.bucket_seconds)
+
+    def free_windows(self, min_minutes, resource_ids=None):
+        """Вільні робочі вікна не коротші за min_minutes: [(ресурс, початок, кінець)]."""
+        min_buckets = -(-min_minutes * 60 // self.bucket_seconds)
+        free = self.working & (self.counts == 0)
+        result = []
+        for i, resource in enumerate(self.resources):
+            if resource_ids is not None and resource.pk not in resource_ids:
+                continue
+            starts, ends = _runs(free[i])
+            long_enough = ends - starts >= min_buckets
+            result.extend(
+                (resource, self._to_datetime(s), self._to_datetime(e))
+                for s, e in zip(starts[long_enough], ends[long_enough])
+            )
+        return result
+
+    def overbooked(self):
+        """Відрізки, де на ресурсі одночасно більше одного слота: [(ресурс, початок, кінець)]."""
+        result = []
+        for i in np.flatnonzero((self.counts > 1).any(axis=1)):
+            starts, ends = _runs(self.counts[i] > 1)
+            result.extend(
+                (self.resources[i], self._to_datetime(s), self._to_datetime(e))
+                for s, e in zip(starts, ends)
+            )
+        return result
@@ -0,0 +1,196 @@
+"""
+Повторювані слоти: розгортання RRULE на льоту і матеріалізація.
+
+Активні шаблони (RecurringSlot) з уже розібраними правилами тримаються
+в пам’яті процесу (VersionedCache), тож входження для вікна календаря
+чи звіту рахуються без запитів до БД — скільки б шаблонів не було.
+Безкінечні правила рядками не зберігаються: входження існують лише для
+запитаного вікна.
+
+materialize() зберігає входження до горизонту звичайними ProductionSlot
+(щоб постійні замовлення можна було переносити й архівувати); починаючи
+з materialized_until шаблон знову розгортається на льоту, тож жодне
+входження не рахується двічі.
+"""
+import re
+from datetime import timedelta
+from typing import NamedTuple
+
+from dateutil.rrule import rrulestr
+from django.db import transaction
+from django.utils import timezone
+from django.utils.timezone import localtime
+
+from core import changelog
+from core.localcache import VersionedCache
+
+from . import utilization
+from .caching import schedule_report_warmup
+from .models import ProductionSlot, RecurringSlot
+
+# на скільки вперед планувальник враховує входження
+PLANNING_HORIZON = timedelta(days=180)
+# горизонт матеріалізації за замовчуванням
+MATERIALIZE_DAYS = 28
+
+_TOO_FREQUENT = re.compile(r"FREQ=(HOURLY|MINUTELY|SECONDLY)", re.IGNORECASE)
+
+
+class Template(NamedTuple):
+    id: int
+    title: str
+    order_id: int | None
+    machine_id: int | None
+    work_unit_id: int | None
+    duration: timedelta
+    rule: object
+    materialized_until: object
+
+
+class Occurrence(NamedTuple):
+    recurrence_id: int
+    title: str
+    order_id: int | None
+    machine_id: int | None
+    work_unit_id: int | None
+    start: object
+    end: object
+
+
+def parse_rule(rule, start):
+    """
+    dateutil rrule з першим входженням start. Входження рахуються в місцевому
+    часі, тож «щопонеділка о 8:00» лишається о 8:00 і після переходу на літній час.
+    """
+    if _TOO_FREQUENT.search(rule or ""):
+        raise ValueError("повторення частіше ніж раз на добу не підтримується")
+    return rrulestr(rule, dtstart=localtime(start))
+
+
+def _load():
+    templates = []
+    for slot in RecurringSlot.objects.filter(is_active=True):
+        try:
+            rule = parse_rule(slot.rule, slot.start_datetime)
+        except ValueError:
+            continue  # правило, збережене в обхід форми, не ламає звіти
+        templates.append(Template(
+            slot.pk,
+            slot.title,
+            slot.order_id,
+            slot.machine_id,
+            slot.work_unit_id,
+            slot.end_datetime - slot.start_datetime,
+            rule,
+            slot.materialized_until,
+        ))
+    return templates
+
+
+recurring_slots = VersionedCache("manufacture.recurring_slots", _load)
+
+
+def _starts(rule, start, end):
+    """Початки входжень у [start, end)."""
+    return [moment for moment in rule.between(start, end, inc=True) if start <= moment < end]
+
+
+def expand(window_start, window_end):
+    """Ще не збережені входження, що перетинають [window_start, window_end)."""
+    occurrences = []
+    for template in recurring_slots.get():
+        lo = window_start - template.duration + timedelta(microseconds=1)
+        if template.materialized_until is not None:
+            lo = max(lo, template.materialized_until)
+        for start in _starts(template.rule, lo, window_end):
+            occurrences.append(Occurrence(
+                template.id,
+                template.title,
+                template.order_id,
+                template.machine_id,
+                template.work_unit_id,
+                start,
+                start + template.duration,
+            ))
+    return occurrences
+
+
+def as_slot(occurrence):
+    """Незбережений ProductionSlot для показу входження там, де чекають слот."""
+    return ProductionSlot(
+        order_id=occurrence.order_id,
+        machine_id=occurrence.machine_id,
+        work_unit_id=occurrence.work_unit_id,
+        start_datetime=occurrence.start,
+        end_datetime=occurrence.end,
+        comment=occurrence.title,
+        recurrence_id=occurrence.recurrence_id,
+    )
+
+
+def deactivate_for_orders(order_ids):
+    """
+    Вимикає активні шаблони замовлень order_ids (замовлення закрито): входження
+    більше не розгортаються й не матеріалізуються. Повертає кількість шаблонів.
+    """
+    updated = RecurringSlot.objects.filter(order_id__in=order_ids, is_active=True).update(
+        is_active=False, updated_at=timezone.now(),
+    )
+    if updated:
+        # UPDATE не шле post_save — кеш шаблонів і звіти оновлюємо самі
+        transaction.on_commit(recurring_slots.invalidate)
+        schedule_report_warmup()
+    return updated
+
+
+@transaction.atomic
+def materialize(until=None, queryset=None):
+    """
+    Зберігає входження до until (дефолт — MATERIALIZE_DAYS від зараз) одним
+    bulk_create. Шаблони без замовлення лишаються лише на льоту, шаблони
+    закритих (відвантажених, завершених, відмінених) замовлень — пропускаються.
+    Повертає кількість створених слотів.
+    """
+    until = until or timezone.now() + timedelta(days=MATERIALIZE_DAYS)
+    queryset = RecurringSlot.objects.all() if queryset is None else queryset
+    from .scheduler import OPEN_STATUSES
+
+    templates = list(
+        queryset.filter(is_active=True, order__status__in=OPEN_STATUSES).select_for_update(of=("self",))
+    )
+
+    slots = []
+    now = timezone.now()
+    for template in templates:
+        start = template.materialized_until or template.start_datetime
+        if start >= until:
+            continue
+        duration = template.end_datetime - template.start_datetime
+        for moment in _starts(parse_rule(template.rule, template.start_datetime), start, until):
+            slots.append(ProductionSlot(
+                order_id=template.order_id,
+                machine_id=template.machine_id,
+                work_unit_id=template.work_unit_id,
+                start_datetime=moment,
+                end_datetime=moment + duration,
+                comment=template.title,
+                recurrence=template,
+            ))
+        template.materialized_until = until
+        template.updated_at = now
+
+    ProductionSlot.objects.bulk_create(slots, batch_size=1000)
+    RecurringSlot.objects.bulk_update(templates, ["materialized_until", "updated_at"])
+    # bulk_create не шле сигналів — журнал і підсумки завантаженості самі
+    changelog.log_many(slots, created=True)
+    spans = {}
+    for slot in slots:
+        key = (slot.machine_id, slot.work_unit_id)
+        first, last = spans.get(key, (slot.start_datetime, slot.end_datetime))
+        spans[key] = (min(first, slot.start_datetime), max(last, slot.end_datetime))
+    for (machine_id, work_unit_id), (first, last) in spans.items():
+        utilization.schedule_refresh(machine_id, work_unit_id, first, last)
+    if templates:
+        transaction.on_commit(recurring_slots.invalidate)
+        schedule_report_warmup()
+    return len(slots)
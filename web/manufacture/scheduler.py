@@ -0,0 +1,252 @@
+"""
+Пакетне планування відкритих замовлень за маршрутами продуктів.
+
+Кожна позиція замовлення — ланцюжок операцій маршруту (норми з
+manufacture.norms) у заданому порядку: наступна починається не раніше, ніж закінчилась попередня.
+Операції розставляються списковим алгоритмом: з купи береться готова
+операція найтерміновішого замовлення (дедлайн, потім дата створення) і
+ставиться на той ресурс потрібного типу, де закінчиться найраніше —
+у вільні проміжки робочого часу, з розбиттям на слоти по днях.
+Наявні слоти вважаються зайнятим часом.
+"""
+import heapq
+import math
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.timezone import localtime
+
+from core import changelog
+
+from . import norms, recurrence, utilization
+from .caching import schedule_report_warmup
+from .models import Machine, ProductionSlot, WorkUnit
+
+OPEN_STATUSES = ("new", "in_progress")
+# дрібніші проміжки між слотами не заповнюємо
+MIN_CHUNK = timedelta(minutes=15)
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class WorkCalendar:
+    """Робочі проміжки днів у поточній часовій зоні (з кешем — їх питають дуже часто)."""
+
+    def __init__(self):
+        self.tz = timezone.get_current_timezone()
+        self._windows = {}
+
+    def window(self, day, workday):
+        key = (day, workday)
+        if key not in self._windows:
+            self._windows[key] = (
+                datetime.combine(day, workday[0], tzinfo=self.tz),
+                datetime.combine(day, workday[1], tzinfo=self.tz),
+            )
+        return self._windows[key]
+
+    def date(self, moment):
+        return moment.astimezone(self.tz).date()
+
+
+class Timeline:
+    """Зайнятість одного ресурсу: відсортовані відрізки без перетинів."""
+
+    def __init__(self, kind, resource, calendar, busy=()):
+        self.kind = kind
+        self.resource = resource
+        self.calendar = calendar
+        self.workday = resource.get_workday()
+        merged = _merge(busy)
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def _working_window(self, moment):
+        """Робочий проміжок дня, що містить moment або йде після нього."""
+        day = self.calendar.date(moment)
+        while True:
+            start, end = self.calendar.window(day, self.workday)
+            if moment < end:
+                return max(moment, start), end
+            day += timedelta(days=1)
+
+    def plan(self, ready, duration):
+        """Відрізки роботи загальною тривалістю duration, не раніше ready."""
+        chunks = []
+        remaining = duration
+        moment = ready
+        while remaining > timedelta(0):
+            moment, window_end = self._working_window(moment)
+            i = bisect_right(self.ends, moment)
+            if i < len(self.starts) and self.starts[i] <= moment:
+                moment = self.ends[i]
+                continue
+            gap_end = min(window_end, self.starts[i]) if i < len(self.starts) else window_end
+            take = min(remaining, gap_end - moment)
+            if take < MIN_CHUNK and take < remaining:
+                moment = gap_end
+                continue
+            chunks.append((moment, moment + take))
+            remaining -= take
+            moment += take
+        return chunks
+
+    def reserve(self, chunks):
+        for start, end in chunks:
+            i = bisect_right(self.starts, start)
+            # суміжні відрізки зливаємо, щоб щільний розклад не обходити слот за слотом
+            if i > 0 and self.ends[i - 1] == start:
+                i -= 1
+                self.ends[i] = end
+            else:
+                self.starts.insert(i, start)
+                self.ends.insert(i, end)
+            if i + 1 < len(self.starts) and self.starts[i + 1] == self.ends[i]:
+                self.ends[i] = self.ends.pop(i + 1)
+                self.starts.pop(i + 1)
+
+
+@dataclass
+class ScheduleResult:
+    slots: list = field(default_factory=list)
+    # (замовлення, позиція, операція) без відповідного ресурсу
+    unscheduled: list = field(default_factory=list)
+    # (замовлення, позиція), для продукту яких немає маршруту (норм)
+    unrouted: list = field(default_factory=list)
+    # (замовлення, дата завершення) для тих, що не встигають до дедлайну
+    late: list = field(default_factory=list)
+
+
+def _round_up(moment, minutes=15):
+    step = minutes * 60
+    return datetime.fromtimestamp(math.ceil(moment.timestamp() / step) * step, tz=moment.tzinfo)
+
+
+def build_schedule(orders, start=None):
+    """
+    Розклад для orders (з позиціями) без запису в БД.
+    Повертає ScheduleResult з незбереженими ProductionSlot.
+    """
+    start = _round_up(start or timezone.now())
+    orders = list(orders)
+
+    calendar = WorkCalendar()
+    groups = {}
+    busy = {}
+    for machine_id, work_unit_id, slot_start, slot_end in ProductionSlot.objects.filter(
+        end_datetime__gt=start, start_datetime__isnull=False,
+    ).values_list("machine_id", "work_unit_id", "start_datetime", "end_datetime"):
+        key = ("machine", machine_id) if machine_id is not None else ("work_unit", work_unit_id)
+        busy.setdefault(key, []).append((slot_start, slot_end))
+    # повторювані слоти (обслуговування тощо) — на горизонт планування
+    for occurrence in recurrence.expand(start, start + recurrence.PLANNING_HORIZON):
+        if occurrence.machine_id is not None:
+            key = ("machine", occurrence.machine_id)
+        else:
+            key = ("work_unit", occurrence.work_unit_id)
+        busy.setdefault(key, []).append((occurrence.start, occurrence.end))
+    for kind, resources in (("machine", Machine.objects.all()), ("work_unit", WorkUnit.objects.all())):
+        for resource in resources:
+            workday_start, workday_end = resource.get_workday()
+            if workday_start >= workday_end:
+                continue  # нічна зміна через північ не підтримується
+            timeline = Timeline(kind, resource, calendar, busy.get((kind, resource.pk), ()))
+            groups.setdefault((kind, resource.type), []).append(timeline)
+
+    result = ScheduleResult()
+    finish_by_order = {}
+    heap = []
+    counter = 0
+    for order in orders:
+        priority = (order.deadline or date.max, order.created_at)
+        for item in order.items.all():
+            operations = norms.route(item.product_id)
+            if not operations:
+                result.unrouted.append((order, item))
+                continue
+            heapq.heappush(heap, (priority, start, counter, order, item, operations, 0))
+            counter += 1
+
+    while heap:
+        priority, ready, _, order, item, operations, step = heapq.heappop(heap)
+        operation = operations[step]
+        candidates = groups.get(operation.resource_key)
+        if not candidates:
+            result.unscheduled.append((order, item, operation))
+            continue
+
+        duration = timedelta(minutes=math.ceil(operation.duration_minutes(item.quantity)))
+        plans = [(timeline.plan(ready, duration), timeline) for timeline in candidates]
+        chunks, timeline = min(plans, key=lambda plan: (plan[0][-1][1] if plan[0] else ready))
+        if not chunks:
+            finished = ready
+        else:
+            timeline.reserve(chunks)
+            finished = chunks[-1][1]
+            for chunk_start, chunk_end in chunks:
+                result.slots.append(ProductionSlot(
+                    order=order,
+                    **{timeline.kind: timeline.resource},
+                    start_datetime=chunk_start,
+                    end_datetime=chunk_end,
+                    comment=f"{item.product.name}: {operation}"[:500],
+                ))
+
+        if step + 1 < len(operations):
+            heapq.heappush(heap, (priority, finished, counter, order, item, operations, step + 1))
+            counter += 1
+        finish_by_order[order.pk] = max(finish_by_order.get(order.pk, finished), finished)
+
+    for order in orders:
+        finished = finish_by_order.get(order.pk)
+        if finished and order.deadline and localtime(finished).date() > order.deadline:
+            result.late.append((order, finished))
+    return result
+
+
+def schedule_orders(orders=None, start=None, commit=True):
+    """
+    Планує відкриті замовлення без слотів (або передані orders)
+    і зберігає слоти одним bulk_create.
+    """
+    from django.db.models import Prefetch
+
+    from crm.models import Order, OrderItem
+
+    if orders is None:
+        orders = Order.objects.filter(status__in=OPEN_STATUSES, slots__isnull=True)
+    orders = orders.prefetch_related(
+        Prefetch("items", queryset=OrderItem.objects.select_related("product").order_by("id"))
+    ).distinct()
+
+    with transaction.atomic():
+        # паралельні запуски (адмінка, команда) по черзі: інакше обидва бачать
+        # ті самі вільні проміжки й ставлять слоти внахлест. Замовлення читаються
+        # вже після блокування — заплановані попереднім запуском відсіюються
+        list(Machine.objects.select_for_update().values_list("pk", flat=True))
+        list(WorkUnit.objects.select_for_update().values_list("pk", flat=True))
+        result = build_schedule(orders, start)
+        if commit and result.slots:
+            ProductionSlot.objects.bulk_create(result.slots, batch_size=1000)
+            # bulk_create не шле сигналів — журнал і підсумки завантаженості самі
+            changelog.log_many(result.slots, created=True)
+            spans = {}
+            for slot in result.slots:
+                key = (slot.machine_id, slot.work_unit_id)
+                first, last = spans.get(key, (slot.start_datetime, slot.end_datetime))
+                spans[key] = (min(first, slot.start_datetime), max(last, slot.end_datetime))
+            for (machine_id, work_unit_id), (first, last) in spans.items():
+                utilization.schedule_refresh(machine_id, work_unit_id, first, last)
+            schedule_report_warmup()
+    return result
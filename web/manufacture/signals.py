@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import changelog
+from . import utilization
+from .caching import resources, schedule_report_warmup
+from .models import Machine, ProductionSlot, RecurringSlot, RouteOperation, WorkUnit
+from .norms import production_norms
+from .recurrence import recurring_slots
+
+changelog.track(ProductionSlot, ["order", "machine", "work_unit", "start_datetime", "end_datetime"])
+
+
+@receiver(post_delete, sender=ProductionSlot)
+def slot_deleted(sender, instance, **kwargs):
+    # MAX(updated_at) не бачить видалень — позначаємо зміну на замовленні,
+    # щоб змінилась версія розкладу (manufacture.caching.schedule_version)
+    from crm.models import Order
+
+    Order.objects.filter(pk=instance.order_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=ProductionSlot)
+def slot_changed(sender, instance, **kwargs):
+    schedule_report_warmup()
+
+
+@receiver(pre_save, sender=ProductionSlot)
+def slot_saving(sender, instance, **kwargs):
+    # знімок ще містить старі ресурс і час — перераховуємо і старі, і нові дні
+    utilization.schedule_slot_refresh(instance, getattr(instance, "_changelog_snapshot", None))
+
+
+@receiver(post_delete, sender=ProductionSlot)
+def slot_removed(sender, instance, **kwargs):
+    utilization.schedule_refresh(
+        instance.machine_id, instance.work_unit_id, instance.start_datetime, instance.end_datetime
+    )
+
+
+@receiver([post_save, post_delete], sender=RouteOperation)
+def route_changed(sender, instance, **kwargs):
+    # норми в пам’яті процесів — нова версія після коміту
+    transaction.on_commit(production_norms.invalidate)
+
+
+@receiver([post_save, post_delete], sender=RecurringSlot)
+def recurring_slot_changed(sender, instance, **kwargs):
+    # шаблони в пам’яті процесів; нова версія змінює і версію розкладу
+    transaction.on_commit(recurring_slots.invalidate)
+    schedule_report_warmup()
+
+
+@receiver([post_save, post_delete], sender=Machine)
+@receiver([post_save, post_delete], sender=WorkUnit)
+def resource_changed(sender, instance, **kwargs):
+    # назва, тип чи робочий день ресурсу — у звітах; нова версія розкладу
+    transaction.on_commit(resources.invalidate)
+    schedule_report_warmup()
@@ -1,3 +1,128 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from crm.models import Client, Contact, Order, OrderItem, Product
+
+from .models import Machine, RouteOperation
+from .norms import production_norms
+from .recurrence import recurring_slots
+from .scheduler import Timeline, WorkCalendar, build_schedule
+
+
+def _at(day, hour, minute=0):
+    # понеділок 2026-03-02 + day днів, у поточній часовій зоні
+    return datetime(2026, 3, 2 + day, hour, minute, tzinfo=timezone.get_current_timezone())
+
+
+class TimelineTests(SimpleTestCase):
+    def timeline(self, busy=()):
+        # робочий день 08:00–17:00 (загальний графік)
+        return Timeline("machine", Machine(name="Лазер"), WorkCalendar(), busy)
+
+    def test_chunk_split_across_working_days(self):
+        chunks = self.timeline().plan(_at(0, 16), timedelta(hours=3))
+        self.assertEqual(chunks, [(_at(0, 16), _at(0, 17)), (_at(1, 8), _at(1, 10))])
+
+    def test_ready_after_workday_starts_next_morning(self):
+        chunks = self.timeline().plan(_at(0, 18), timedelta(hours=1))
+        self.assertEqual(chunks, [(_at(1, 8), _at(1, 9))])
+
+    def test_busy_interval_inside_gap(self):
+        timeline = self.timeline(busy=[(_at(0, 10), _at(0, 11))])
+        chunks = timeline.plan(_at(0, 9), timedelta(hours=2))
+        self.assertEqual(chunks, [(_at(0, 9), _at(0, 10)), (_at(0, 11), _at(0, 12))])
+
+    def test_gap_shorter_than_min_chunk_is_skipped(self):
+        timeline = self.timeline(busy=[(_at(0, 9, 10), _at(0, 12))])
+        chunks = timeline.plan(_at(0, 9), timedelta(hours=1))
+        self.assertEqual(chunks, [(_at(0, 12), _at(0, 13))])
+
+    def test_short_remainder_fills_short_gap(self):
+        # останній шматок коротший за MIN_CHUNK — проміжок підходить
+        timeline = self.timeline(busy=[(_at(0, 9, 10), _at(0, 12))])
+        chunks = timeline.plan(_at(0, 9), timedelta(minutes=10))
+        self.assertEqual(chunks, [(_at(0, 9), _at(0, 9, 10))])
+
+    def test_adjacent_reservations_are_merged(self):
+        timeline = self.timeline()
+        timeline.reserve([(_at(0, 9), _at(0, 10))])
+        timeline.reserve([(_at(0, 10), _at(0, 11))])
+        self.assertEqual((timeline.starts, timeline.ends), ([_at(0, 9)], [_at(0, 11)]))
+
+    def test_reservation_bridging_two_intervals_merges_all(self):
+        timeline = self.timeline(busy=[(_at(0, 9), _at(0, 10)), (_at(0, 11), _at(0, 12))])
+        timeline.reserve([(_at(0, 10), _at(0, 11))])
+        self.assertEqual((timeline.starts, timeline.ends), ([_at(0, 9)], [_at(0, 12)]))
+
+    def test_overlapping_busy_intervals_are_merged(self):
+        timeline = self.timeline(busy=[(_at(0, 10), _at(0, 12)), (_at(0, 9), _at(0, 11))])
+        self.assertEqual((timeline.starts, timeline.ends), ([_at(0, 9)], [_at(0, 12)]))
+
+    def test_plan_after_reserve_skips_reserved_time(self):
+        timeline = self.timeline()
+        timeline.reserve(timeline.plan(_at(0, 8), timedelta(hours=2)))
+        self.assertEqual(timeline.plan(_at(0, 8), timedelta(hours=1)), [(_at(0, 10), _at(0, 11))])
+
+
+class BuildScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.laser = Machine.objects.create(name="Лазер", type=Machine.MachineType.LASER)
+        cls.bending = Machine.objects.create(name="Гибка", type=Machine.MachineType.BENDING)
+        cls.product = Product.objects.create(name="Кронштейн", base_price=Decimal("10"))
+        RouteOperation.objects.create(
+            product=cls.product, sequence=1, name="Різка",
+            machine_type=Machine.MachineType.LASER, minutes_per_unit=Decimal("30"),
+        )
+        RouteOperation.objects.create(
+            product=cls.product, sequence=2, name="Гибка",
+            machine_type=Machine.MachineType.BENDING, setup_minutes=15, minutes_per_unit=Decimal("5"),
+        )
+        client = Client.objects.create(name="ТОВ Покупець")
+        contact = Contact.objects.create(client=client, full_name="Покупець")
+        cls.orders = []
+        for quantity in (20, 4):
+            order = Order.objects.create(contact=contact)
+            OrderItem.objects.create(order=order, product=cls.product, quantity=quantity, unit_price=Decimal("10"))
+            cls.orders.append(order)
+
+    def setUp(self):
+        # у TestCase колбеки on_commit не виконуються — скидаємо кеші вручну
+        production_norms.invalidate()
+        recurring_slots.invalidate()
+
+    def schedule(self):
+        orders = Order.objects.filter(pk__in=[order.pk for order in self.orders]).prefetch_related("items__product")
+        return build_schedule(orders, start=_at(0, 8))
+
+    def test_next_step_starts_after_previous_finishes(self):
+        result = self.schedule()
+        self.assertFalse(result.unscheduled)
+        for order in self.orders:
+            slots = [slot for slot in result.slots if slot.order_id == order.pk]
+            cutting = [slot for slot in slots if slot.machine == self.laser]
+            bending = [slot for slot in slots if slot.machine == self.bending]
+            self.assertTrue(cutting and bending)
+            self.assertGreaterEqual(
+                min(slot.start_datetime for slot in bending),
+                max(slot.end_datetime for slot in cutting),
+            )
+
+    def test_slots_of_one_machine_do_not_overlap(self):
+        result = self.schedule()
+        for machine in (self.laser, self.bending):
+            intervals = sorted(
+                (slot.start_datetime, slot.end_datetime) for slot in result.slots if slot.machine == machine
+            )
+            for (_, end), (start, _) in zip(intervals, intervals[1:]):
+                self.assertLessEqual(end, start)
+
+    def test_item_without_route_is_reported(self):
+        product = Product.objects.create(name="Без норм", base_price=Decimal("1"))
+        OrderItem.objects.create(order=self.orders[0], product=product, quantity=1, unit_price=Decimal("1"))
+        result = self.schedule()
+        self.assertEqual([(order.pk, item.product_id) for order, item in result.unrouted],
+                         [(self.orders[0].pk, product.pk)])
@@ -0,0 +1,141 @@
+"""
+Розрахунок денної завантаженості ресурсів (ResourceUtilization).
+
+Для кожного ресурсу й дня: зайнятий час у межах робочого дня (перетини слотів
+об’єднуються), доступний час робочого дня та кількість слотів за добу.
+Враховуються і поточні, і архівні слоти. rebuild() перераховує діапазон
+дат повністю (DELETE + INSERT), тож його можна викликати повторно.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import localtime, make_aware
+
+from core import jobs
+
+from .models import ArchivedProductionSlot, Machine, ProductionSlot, ResourceUtilization, WorkUnit
+
+
+def _day_bounds(day, start_time, end_time):
+    return (
+        make_aware(datetime.combine(day, start_time)),
+        make_aware(datetime.combine(day, end_time)),
+    )
+
+
+def _busy_seconds(intervals, start, end):
+    """Сума об’єднання відрізків, обрізаних до [start, end]."""
+    clipped = sorted((max(s, start), min(e, end)) for s, e in intervals if s < end and e > start)
+    busy = 0
+    current_start = current_end = None
+    for s, e in clipped:
+        if current_end is None or s > current_end:
+            if current_end is not None:
+                busy += (current_end - current_start).total_seconds()
+            current_start, current_end = s, e
+        else:
+            current_end = max(current_end, e)
+    if current_end is not None:
+        busy += (current_end - current_start).total_seconds()
+    return int(busy)
+
+
+def _resource_filter(machine_ids, work_unit_ids):
+    if machine_ids is None and work_unit_ids is None:
+        return Q()
+    return Q(machine_id__in=machine_ids or []) | Q(machine__isnull=True, work_unit_id__in=work_unit_ids or [])
+
+
+def _slot_intervals(start_date, end_date, machine_ids, work_unit_ids):
+    """{("machine"|"work_unit", id): [(start, end), ...]} для слотів у діапазоні дат."""
+    lo = make_aware(datetime.combine(start_date, time.min))
+    hi = make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    intervals = defaultdict(list)
+    for model in (ProductionSlot, ArchivedProductionSlot):
+        rows = (
+            model.objects.filter(start_datetime__lt=hi, end_datetime__gt=lo)
+            .filter(_resource_filter(machine_ids, work_unit_ids))
+            .values_list("machine_id", "work_unit_id", "start_datetime", "end_datetime")
+        )
+        for machine_id, work_unit_id, start, end in rows.iterator(chunk_size=2000):
+            # слот належить верстату, якщо він заданий (як ProductionSlot.resource)
+            if machine_id is not None:
+                intervals[("machine", machine_id)].append((start, end))
+            elif work_unit_id is not None:
+                intervals[("work_unit", work_unit_id)].append((start, end))
+    return intervals
+
+
+def compute(start_date, end_date, machine_ids=None, work_unit_ids=None):
+    """Рядки ResourceUtilization за кожен день [start_date, end_date] для кожного ресурсу."""
+    machines = Machine.objects.all()
+    units = WorkUnit.objects.all()
+    if machine_ids is not None or work_unit_ids is not None:
+        machines = machines.filter(pk__in=machine_ids or [])
+        units = units.filter(pk__in=work_unit_ids or [])
+
+    intervals = _slot_intervals(start_date, end_date, machine_ids, work_unit_ids)
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+    rows = []
+    for kind, resources in (("machine", machines), ("work_unit", units)):
+        for resource in resources:
+            workday_start, workday_end = resource.get_workday()
+            slots = intervals.get((kind, resource.pk), [])
+            for day in days:
+                start, end = _day_bounds(day, workday_start, workday_end)
+                day_start = make_aware(datetime.combine(day, time.min))
+                day_end = day_start + timedelta(days=1)
+                rows.append(ResourceUtilization(
+                    **{kind: resource},
+                    resource_type=resource.type,
+                    date=day,
+                    busy_seconds=_busy_seconds(slots, start, end),
+                    available_seconds=int((end - start).total_seconds()),
+                    slot_count=sum(1 for s, e in slots if s < day_end and e > day_start),
+                ))
+    return rows
+
+
+def rebuild(start_date, end_date, machine_ids=None, work_unit_ids=None):
+    """Перераховує підсумки за діапазон дат; None в обох id — для всіх ресурсів."""
+    rows = compute(start_date, end_date, machine_ids, work_unit_ids)
+    existing = ResourceUtilization.objects.filter(date__range=(start_date, end_date))
+    if machine_ids is not None or work_unit_ids is not None:
+        existing = existing.filter(
+            Q(machine_id__in=machine_ids or []) | Q(work_unit_id__in=work_unit_ids or [])
+        )
+    with transaction.atomic():
+        existing.delete()
+        ResourceUtilization.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def schedule_refresh(machine_id, work_unit_id, start, end):
+    """Ставить у чергу перерахунок днів, які зачіпає слот (після коміту)."""
+    if start is None or end is None or (machine_id is None and work_unit_id is None):
+        return
+    resource = {"machine_id": machine_id} if machine_id is not None else {"work_unit_id": work_unit_id}
+    jobs.enqueue_on_commit(
+        "manufacture.refresh_utilization",
+        start=localtime(start).date().isoformat(),
+        end=localtime(end).date().isoformat(),
+        **resource,
+    )
+
+
+def schedule_slot_refresh(slot, previous=None):
+    """
+    Дні й ресурс слота до та після зміни. previous — знімок полів
+    на момент завантаження (slot._changelog_snapshot).
+    """
+    if previous:
+        schedule_refresh(
+            previous.get("machine_id"),
+            previous.get("work_unit_id"),
+            previous.get("start_datetime"),
+            previous.get("end_datetime"),
+        )
+    schedule_refresh(slot.machine_id, slot.work_unit_id, slot.start_datetime, slot.end_datetime)
@@ -1,157 +1,71 @@
-from datetime import datetime, time, timedelta
-from django.shortcuts import get_object_or_404, render
-from django.utils.timezone import make_aware, get_current_timezone
-from .models import Machine, WorkUnit, ProductionSlot
-from django.http import JsonResponse
+import asyncio
+import json
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter
+from django.shortcuts import aget_object_or_404, render
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import make_aware, get_current_timezone, is_naive
+from django.views.decorators.http import require_POST
+from core import changelog
+from core.db import use_replica
+from . import norms, recurrence, utilization
+from .caching import cached_payload, conditional_on_schedule, schedule_report_warmup
+from .models import Machine, WorkUnit, ProductionSlot, ResourceUtilization
+from django.http import HttpResponse, JsonResponse
 from django.utils.timezone import localtime
 
 
-def machine_load_report(request):
-    tz = get_current_timezone()
-    today = datetime.now(tz).date()
-
-    # Періоди
-    ranges = {
-        "today": (
-            make_aware(datetime.combine(today, time.min)),
-            make_aware(datetime.combine(today, time.max)),
-        ),
-        "three_days": (
-            make_aware(datetime.combine(today, time.min)),
-            make_aware(datetime.combine(today + timedelta(days=3), time.max)),
-        ),
-        "week": (
-            make_aware(datetime.combine(today, time.min)),
-            make_aware(datetime.combine(today + timedelta(days=7), time.max)),
-        ),
-    }
-
-    # Загальна функція розрахунку завантаженості
-    def calc_load(resource, start, end, field_name):
-        """
-        resource — Machine або WorkUnit
-        field_name — 'machine' або 'work_unit'
-        """
-        slots = ProductionSlot.objects.filter(
-            **{field_name: resource},
-            start_datetime__lt=end,
-            end_datetime__gt=start
-        )
-
-        # визначення тривалості робочого дня
-        if hasattr(resource, "workday_start") and resource.workday_start:
-            day_start = resource.workday_start
-            day_end = resource.workday_end
-        else:
-            day_start = time(8, 0)
-            day_end = time(17, 0)
-
-        workday_hours = (
-                                datetime.combine(today, day_end) -
-                                datetime.combine(today, day_start)
-                        ).seconds / 3600
-
-        busy_seconds = 0
-        for slot in slots:
-            s = max(slot.start_datetime, start)
-            e = min(slot.end_datetime, end)
-            busy_seconds += max(0, (e - s).total_seconds())
-
-        days = (end.date() - start.date()).days + 1
-        total_available = workday_hours * days
-
-        if total_available <= 0:
-            return 0
-
-        return round((busy_seconds / 3600) / total_available * 100)
-
-    # Формуємо звіт
-    machine_report = []
-    for machine in Machine.objects.all():
-        row = {
-            "id": machine.id,
-            "name": machine.name,
-            "type": machine.get_type_display(),
-            "today": calc_load(machine, *ranges["today"], "machine"),
-            "three_days": calc_load(machine, *ranges["three_days"], "machine"),
-            "week": calc_load(machine, *ranges["week"], "machine"),
-        }
-        row["status"] = (
-            "green" if row["week"] < 70 else
-            "yellow" if row["week"] < 90 else
-            "red"
-        )
-        machine_report.append(row)
-
-    workunit_report = []
-    for unit in WorkUnit.objects.all():
-        row = {
-            "id": unit.id,
-            "name": unit.name,
-            "type": unit.get_type_display(),
-            "today": calc_load(unit, *ranges["today"], "work_unit"),
-            "three_days": calc_load(unit, *ranges["three_days"], "work_unit"),
-            "week": calc_load(unit, *ranges["week"], "work_unit"),
-        }
-        row["status"] = (
-            "green" if row["week"] < 70 else
-            "yellow" if row["week"] < 90 else
-            "red"
-        )
-        workunit_report.append(row)
-
-    return render(request, "machine_load_report.html", {
-        "machine_report": machine_report,
-        "workunit_report": workunit_report,
-    })
-
-
-def machine_detail_report(request, machine_id):
-    tz = get_current_timezone()
-    today = datetime.now(tz).date()
-    start_period = make_aware(datetime.combine(today, time.min))
-    end_period = make_aware(datetime.combine(today + timedelta(days=7), time.max))
+def _in_thread(func, *args):
+    """
+    Виконує синхронну ORM-функцію в окремому потоці з власним з’єднанням до БД.
+    Async ORM Django (aget, alist…) проганяє всі запити через один потік,
+    тому незалежні запити звіту запускаємо так, щоб вони йшли паралельно.
+    """
+    def run():
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
 
-    machine = get_object_or_404(Machine, pk=machine_id)
+    return sync_to_async(run, thread_sensitive=False)()
 
-    # робочий день
-    if machine.workday_start and machine.workday_end:
-        day_start_time = machine.workday_start
-        day_end_time = machine.workday_end
-    else:
-        # дефолт 08:00–17:00, якщо не задано
-        day_start_time = time(8, 0)
-        day_end_time = time(17, 0)
 
+def _split_by_days(intervals, today, day_start_time, day_end_time, days_count=8):
+    """
+    Розкладає слоти ресурсу по робочих днях: зайняті відрізки та вільні проміжки.
+    intervals — список (slot_start, slot_end, slot).
+    """
     days = []
 
-    for i in range(8):  # сьогодні + 7 днів
+    for i in range(days_count):  # сьогодні + 7 днів
         day = today + timedelta(days=i)
         day_start = make_aware(datetime.combine(day, day_start_time))
         day_end = make_aware(datetime.combine(day, day_end_time))
 
-        # слоти для цього верстата, які хоч якось перетинають день
-        slots_qs = ProductionSlot.objects.filter(
-            machine=machine,
-            start_datetime__lt=day_end,
-            end_datetime__gt=day_start,
-        ).select_related("order")
-
         # приводимо до відрізків всередині робочого дня
-        intervals = []
-        for slot in slots_qs:
-            s = max(slot.start_datetime, day_start)
-            e = min(slot.end_datetime, day_end)
+        day_intervals = []
+        for slot_start, slot_end, slot in intervals:
+            s = max(slot_start, day_start)
+            e = min(slot_end, day_end)
             if s < e:
-                intervals.append((s, e, slot))
+                day_intervals.append((s, e, slot))
 
         # сортуємо по часу початку
-        intervals.sort(key=lambda x: x[0])
+        day_intervals.sort(key=lambda x: x[0])
 
         # шукаємо вільні проміжки
         free_intervals = []
         current = day_start
-        for s, e, slot in intervals:
+        for s, e, slot in day_intervals:
             if s > current:
                 free_intervals.append((current, s))
             if e > current:
@@ -161,103 +75,570 @@ def machine_detail_report(request, machine_id):
 
         days.append({
             "date": day,
-            "slots": intervals,  # список (start, end, slot)
+            "slots": day_intervals,  # список (start, end, slot)
             "free": free_intervals,  # список (start, end)
         })
 
-    context = {
+    return days
+
+
+@use_replica
+@conditional_on_schedule
+async def machine_load_report(request):
+    tz = get_current_timezone()
+    today = datetime.now(tz).date()
+
+    context = await cached_payload(
+        "machine_load", [today], request.schedule_version, lambda: _machine_load_data(today)
+    )
+    return TemplateResponse(request, "machine_load_report.html", context)
+
+
+async def _machine_load_data(today):
+    # сьогодні + 7 днів; «три дні» і «тиждень» — як і раніше, включно з останнім днем
+    days = 8
+    window_start = make_aware(datetime.combine(today, time.min))
+    window_end = window_start + timedelta(days=days)
+
+    machines, units, slots, occurrences, backlog = await asyncio.gather(
+        _in_thread(list, Machine.objects.all()),
+        _in_thread(list, WorkUnit.objects.all()),
+        _in_thread(
+            list,
+            ProductionSlot.objects.filter(
+                start_datetime__lt=window_end,
+                end_datetime__gt=window_start,
+            ).values_list("machine_id", "work_unit_id", "start_datetime", "end_datetime"),
+        ),
+        # повторювані слоти — з пам’яті, без запитів
+        _in_thread(recurrence.expand, window_start, window_end),
+        _in_thread(_unscheduled_minutes),
+    )
+    slots += [(o.machine_id, o.work_unit_id, o.start, o.end) for o in occurrences]
+    return await _in_thread(_load_rows, machines, units, slots, today, days, backlog)
+
+
+def _unscheduled_minutes():
+    """Хвилини роботи за нормами по типах ресурсів для відкритих замовлень без слотів."""
+    from crm.models import Order
+
+    from .scheduler import OPEN_STATUSES
+
+    orders = Order.objects.filter(status__in=OPEN_STATUSES, slots__isnull=True).values_list("id", flat=True)
+    totals = defaultdict(float)
+    for minutes in norms.estimate_orders(orders).values():
+        for key, value in minutes.items():
+            totals[key] += value
+    return dict(totals)
+
+
+def _load_rows(machines, units, slots, today, days, backlog=None):
+    from .occupancy import OccupancyGrid
+
+    free_minutes = defaultdict(float)
+
+    def build_rows(resources, kind, rows):
+        grid = OccupancyGrid(resources, today, days)
+        grid.add(rows)
+        for resource, minutes in zip(resources, grid.free_minutes()):
+            free_minutes[kind, resource.type] += float(minutes)
+        loads = {
+            "today": grid.utilization(0, 1),
+            "three_days": grid.utilization(0, 4),
+            "week": grid.utilization(0, days),
+        }
+        report = []
+        for i, resource in enumerate(resources):
+            row = {
+                "id": resource.id,
+                "name": resource.name,
+                "type": resource.get_type_display(),
+            }
+            for key, values in loads.items():
+                row[key] = round(values[i] * 100)
+            row["status"] = (
+                "green" if row["week"] < 70 else
+                "yellow" if row["week"] < 90 else
+                "red"
+            )
+            report.append(row)
+        return report
+
+    report = {
+        "machine_report": build_rows(machines, "machine", [(m, s, e) for m, _, s, e in slots if m is not None]),
+        "workunit_report": build_rows(units, "work_unit", [(u, s, e) for _, u, s, e in slots if u is not None]),
+    }
+    # прогноз: чи вміститься незапланована робота у вільний час тижня
+    report["forecast"] = [
+        {
+            "resource": norms.resource_label(key),
+            "required": round(required / 60, 1),
+            "free": round(free_minutes.get(key, 0) / 60, 1),
+            "fits": required <= free_minutes.get(key, 0),
+        }
+        for key, required in sorted((backlog or {}).items())
+        if required
+    ]
+    return report
+
+
+def _resource_slots(field_name, resource_id, start, end):
+    slots = list(
+        ProductionSlot.objects.filter(
+            **{field_name: resource_id},
+            start_datetime__lt=end,
+            end_datetime__gt=start,
+        ).select_related("order")
+    )
+    # входження повторюваних слотів — незбережені слоти (без id, з recurrence_id)
+    slots += [
+        recurrence.as_slot(occurrence)
+        for occurrence in recurrence.expand(start, end)
+        if getattr(occurrence, field_name) == resource_id
+    ]
+    return [(slot.start_datetime, slot.end_datetime, slot) for slot in slots]
+
+
+@use_replica
+@conditional_on_schedule
+async def machine_detail_report(request, machine_id):
+    tz = get_current_timezone()
+    today = datetime.now(tz).date()
+
+    context = await cached_payload(
+        "machine_detail", [machine_id, today], request.schedule_version,
+        lambda: _machine_detail_data(machine_id, today),
+    )
+    return TemplateResponse(request, "machine_detail_report.html", context)
+
+
+async def _machine_detail_data(machine_id, today):
+    start_period = make_aware(datetime.combine(today, time.min))
+    end_period = make_aware(datetime.combine(today + timedelta(days=7), time.max))
+
+    # верстат і його слоти за весь період — паралельно
+    machine, intervals = await asyncio.gather(
+        aget_object_or_404(Machine, pk=machine_id),
+        _in_thread(_resource_slots, "machine_id", machine_id, start_period, end_period),
+    )
+
+    # робочий день (дефолт 08:00–17:00, якщо не задано)
+    day_start_time, day_end_time = machine.get_workday()
+
+    return {
         "machine": machine,
-        "days": days,
+        "days": _split_by_days(intervals, today, day_start_time, day_end_time),
     }
-    return render(request, "machine_detail_report.html", context)
 
 
-def workunit_detail_report(request, workunit_id):
+@use_replica
+@conditional_on_schedule
+async def workunit_detail_report(request, workunit_id):
     tz = get_current_timezone()
     today = datetime.now(tz).date()
 
-    work_unit = get_object_or_404(WorkUnit, pk=workunit_id)
+    context = await cached_payload(
+        "workunit_detail", [workunit_id, today], request.schedule_version,
+        lambda: _workunit_detail_data(workunit_id, today),
+    )
+
+    # якщо machine_detail_report рендериш як "machine_detail_report.html" без префікса,
+    # зроби тут аналогічно: "workunit_detail_report.html"
+    return TemplateResponse(request, "workunit_detail_report.html", context)
+
+
+async def _workunit_detail_data(workunit_id, today):
+    start_period = make_aware(datetime.combine(today, time.min))
+    end_period = make_aware(datetime.combine(today + timedelta(days=7), time.max))
+
+    work_unit, intervals = await asyncio.gather(
+        aget_object_or_404(WorkUnit, pk=workunit_id),
+        _in_thread(_resource_slots, "work_unit_id", workunit_id, start_period, end_period),
+    )
 
     # робочий день для дільниці
     # (якщо захочеш – можна додати workday_start/workday_end і сюди, зараз беремо дефолт 08–17)
-    day_start_time = time(8, 0)
-    day_end_time = time(17, 0)
+    day_start_time, day_end_time = work_unit.get_workday()
 
-    days = []
+    return {
+        "work_unit": work_unit,
+        "days": _split_by_days(intervals, today, day_start_time, day_end_time),
+    }
 
-    for i in range(8):  # сьогодні + 7 днів
-        day = today + timedelta(days=i)
-        day_start = make_aware(datetime.combine(day, day_start_time))
-        day_end = make_aware(datetime.combine(day, day_end_time))
 
-        # слоти для цієї дільниці, які хоч якось перетинають день
-        slots_qs = ProductionSlot.objects.filter(
-            work_unit=work_unit,
-            start_datetime__lt=day_end,
-            end_datetime__gt=day_start,
-        ).select_related("order")
+def _slot_events(qs):
+    # order__contact і позиції — щоб str(order) не робив запитів на кожен слот
+    qs = qs.select_related("order__contact", "machine", "work_unit").prefetch_related("order__items")
+    return [_slot_event(slot) for slot in qs]
 
-        # приводимо до відрізків всередині робочого дня
-        intervals = []
-        for slot in slots_qs:
-            s = max(slot.start_datetime, day_start)
-            e = min(slot.end_datetime, day_end)
-            if s < e:
-                intervals.append((s, e, slot))
 
-        # сортуємо по часу початку
-        intervals.sort(key=lambda x: x[0])
+def _occurrence_events(window_start, window_end):
+    """Входження повторюваних слотів у вікні — події лише для перегляду."""
+    from crm.models import Order
 
-        # шукаємо вільні проміжки
-        free_intervals = []
-        current = day_start
-        for s, e, slot in intervals:
-            if s > current:
-                free_intervals.append((current, s))
-            if e > current:
-                current = e
-        if current < day_end:
-            free_intervals.append((current, day_end))
+    occurrences = recurrence.expand(window_start, window_end)
+    if not occurrences:
+        return []
+    orders = Order.objects.select_related("contact").in_bulk({o.order_id for o in occurrences if o.order_id})
+    machines = Machine.objects.in_bulk({o.machine_id for o in occurrences if o.machine_id})
+    units = WorkUnit.objects.in_bulk({o.work_unit_id for o in occurrences if o.work_unit_id})
 
-        days.append({
-            "date": day,
-            "slots": intervals,  # список (start, end, slot)
-            "free": free_intervals,  # список (start, end)
+    events = []
+    for occurrence in occurrences:
+        order = orders.get(occurrence.order_id)
+        location = machines.get(occurrence.machine_id) or units.get(occurrence.work_unit_id)
+        title = f"↻ {order or occurrence.title}"
+        if location:
+            title += f" – {location}"
+        events.append({
+            "id": f"recurrence-{occurrence.recurrence_id}-{int(occurrence.start.timestamp())}",
+            "title": title,
+            "start": localtime(occurrence.start).isoformat(),
+            "end": localtime(occurrence.end).isoformat(),
+            # переноситься весь шаблон, а не одне входження
+            "editable": False,
+            "extendedProps": {
+                "recurrence": occurrence.recurrence_id,
+                "machine": occurrence.machine_id,
+                "work_unit": occurrence.work_unit_id,
+            },
         })
+    return events
 
-    context = {
-        "work_unit": work_unit,
-        "days": days,
-    }
 
-    # якщо machine_detail_report рендериш як "machine_detail_report.html" без префікса,
-    # зроби тут аналогічно: "workunit_detail_report.html"
-    return render(request, "workunit_detail_report.html", context)
-
-def production_slot_events(request):
+@use_replica
+@conditional_on_schedule
+async def production_slot_events(request):
     """
     Повертає слоти у форматі, який розуміє FullCalendar.
+    FullCalendar передає видиме вікно в ?start=&end= — віддаємо лише його.
     """
+    window_start = parse_datetime(request.GET.get("start") or "")
+    window_end = parse_datetime(request.GET.get("end") or "")
+
     qs = ProductionSlot.objects.exclude(
         start_datetime__isnull=True
     ).exclude(
         end_datetime__isnull=True
-    ).select_related("order", "machine", "work_unit")
+    )
+    if window_start is not None:
+        qs = qs.filter(end_datetime__gt=window_start)
+    if window_end is not None:
+        qs = qs.filter(start_datetime__lt=window_end)
+
+    async def build():
+        events = await _in_thread(_slot_events, qs)
+        # повторювані розгортаються лише для вікна — без вікна їх не показати
+        if window_start is not None and window_end is not None:
+            events += await _in_thread(_occurrence_events, window_start, window_end)
+        return json.dumps(events, cls=DjangoJSONEncoder)
+
+    content = await cached_payload(
+        "slot_events", [window_start, window_end], request.schedule_version, build
+    )
+    return HttpResponse(content, content_type="application/json")
+
+
+def _slot_event(slot):
+    """
+    Один слот у форматі події FullCalendar.
+    """
+    # Робимо адекватний заголовок для події
+    location = slot.resource
+    title = f"{slot.order}"
+    if location:
+        title += f" – {location}"
+
+    return {
+        "id": slot.id,
+        "title": title,
+        "start": localtime(slot.start_datetime).isoformat(),
+        "end": localtime(slot.end_datetime).isoformat(),
+        "extendedProps": {
+            "version": slot.version,
+            "machine": slot.machine_id,
+            "work_unit": slot.work_unit_id,
+        },
+    }
 
-    events = []
-    for slot in qs:
-        # Робимо адекватний заголовок для події
-        location = slot.machine or slot.work_unit
-        title = f"{slot.order}"
-        if location:
-            title += f" – {location}"
 
-        events.append({
-            "id": slot.id,
-            "title": title,
-            "start": localtime(slot.start_datetime).isoformat(),
-            "end": localtime(slot.end_datetime).isoformat(),
-        })
+MAX_MOVES_PER_REQUEST = 200
+
 
-    return JsonResponse(events, safe=False)
+class SlotMoveError(Exception):
+    def __init__(self, slot_id, message, status=400):
+        super().__init__(message)
+        self.slot_id = slot_id
+        self.message = message
+        self.status = status
 
+
+def _parse_move(raw):
+    """
+    Перевіряє одне переміщення з тіла запиту:
+    {"id", "version", "start", "end", ["machine"], ["work_unit"]}.
+    """
+    if not isinstance(raw, dict) or not isinstance(raw.get("id"), int):
+        raise SlotMoveError(None, "Кожне переміщення має містити числовий id.")
+
+    slot_id = raw["id"]
+    if not isinstance(raw.get("version"), int):
+        raise SlotMoveError(slot_id, "Не вказано версію слота.")
+
+    start = parse_datetime(raw.get("start") or "")
+    end = parse_datetime(raw.get("end") or "")
+    if start is None or end is None:
+        raise SlotMoveError(slot_id, "Некоректні start/end.")
+    if is_naive(start):
+        start = make_aware(start)
+    if is_naive(end):
+        end = make_aware(end)
+    if start >= end:
+        raise SlotMoveError(slot_id, "Початок має бути раніше за кінець.")
+
+    move = {"id": slot_id, "version": raw["version"], "start": start, "end": end}
+    for key in ("machine", "work_unit"):
+        if key in raw:
+            if raw[key] is not None and not isinstance(raw[key], int):
+                raise SlotMoveError(slot_id, f"Некоректне значення {key}.")
+            move[key] = raw[key]
+    return move
+
+
+def _check_working_hours(slot, start, end):
+    # слот і верстата, і дільниці — в межах робочого дня кожного з них
+    start, end = localtime(start), localtime(end)
+    for resource in (slot.machine, slot.work_unit):
+        if resource is None:
+            continue
+        day_start, day_end = resource.get_workday()
+        if start.date() != end.date() or start.time() < day_start or end.time() > day_end:
+            raise SlotMoveError(
+                slot.id,
+                f"{resource}: слот має бути в межах робочого дня "
+                f"{day_start:%H:%M}–{day_end:%H:%M}.",
+            )
+
+
+def _check_conflicts(slots, moves):
+    """
+    Перевіряє перетини нових інтервалів між собою та з іншими слотами
+    тих самих верстатів/дільниць (один запит на весь пакет).
+    """
+    moved_ids = [slot.id for slot in slots]
+    intervals = []
+    for slot in slots:
+        move = moves[slot.id]
+        for field in ("machine_id", "work_unit_id"):
+            resource_id = getattr(slot, field)
+            if resource_id is not None:
+                intervals.append((slot.id, field, resource_id, move["start"], move["end"]))
+
+    # перетини всередині пакета
+    for i, (a_id, a_field, a_res, a_start, a_end) in enumerate(intervals):
+        for b_id, b_field, b_res, b_start, b_end in intervals[i + 1:]:
+            if a_field == b_field and a_res == b_res and a_start < b_end and b_start < a_end:
+                raise SlotMoveError(a_id, f"Перетинається зі слотом #{b_id}.", status=409)
+
+    if not intervals:
+        return
+
+    # перетини з рештою розкладу
+    query = Q()
+    for _, field, resource_id, start, end in intervals:
+        query |= Q(**{field: resource_id}, start_datetime__lt=end, end_datetime__gt=start)
+
+    others = list(
+        ProductionSlot.objects.filter(query)
+        .exclude(pk__in=moved_ids)
+        .values_list("id", "machine_id", "work_unit_id", "start_datetime", "end_datetime")
+    )
+    for slot_id, field, resource_id, start, end in intervals:
+        for other_id, machine_id, work_unit_id, other_start, other_end in others:
+            other_resource = machine_id if field == "machine_id" else work_unit_id
+            if other_resource == resource_id and other_start < end and start < other_end:
+                raise SlotMoveError(slot_id, f"Перетинається зі слотом #{other_id}.", status=409)
+
+
+@staff_member_required
+@require_POST
+def production_slot_move(request):
+    """
+    Пакетне переміщення / зміна тривалості слотів з календаря.
+
+    Тіло: {"moves": [{"id", "version", "start", "end", ["machine"], ["work_unit"]}, ...]}.
+    Усі переміщення застосовуються в одній транзакції або не застосовуються зовсім;
+    повертаються лише змінені події.
+    """
+    if not request.user.has_perm("manufacture.change_productionslot"):
+        return JsonResponse({"errors": [{"id": None, "error": "Немає прав на зміну слотів."}]}, status=403)
+
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"errors": [{"id": None, "error": "Некоректний JSON."}]}, status=400)
+
+    raw_moves = payload.get("moves") if isinstance(payload, dict) else None
+    if not isinstance(raw_moves, list) or not raw_moves:
+        return JsonResponse({"errors": [{"id": None, "error": "Порожній список moves."}]}, status=400)
+    if len(raw_moves) > MAX_MOVES_PER_REQUEST:
+        return JsonResponse(
+            {"errors": [{"id": None, "error": f"Не більше {MAX_MOVES_PER_REQUEST} переміщень за раз."}]},
+            status=400,
+        )
+
+    try:
+        moves = {}
+        for raw in raw_moves:
+            move = _parse_move(raw)
+            if move["id"] in moves:
+                raise SlotMoveError(move["id"], "Слот вказано двічі.")
+            moves[move["id"]] = move
+
+        with transaction.atomic():
+            slots = list(
+                ProductionSlot.objects.select_for_update(of=("self",))
+                .filter(pk__in=moves)
+                .select_related("machine", "work_unit")
+                .order_by("pk")
+            )
+            found = {slot.id for slot in slots}
+            for slot_id in moves:
+                if slot_id not in found:
+                    raise SlotMoveError(slot_id, "Слот не знайдено.", status=404)
+
+            machine_ids = {m["machine"] for m in moves.values() if m.get("machine")}
+            unit_ids = {m["work_unit"] for m in moves.values() if m.get("work_unit")}
+            machines = Machine.objects.in_bulk(machine_ids)
+            units = WorkUnit.objects.in_bulk(unit_ids)
+
+            now = timezone.now()
+            for slot in slots:
+                move = moves[slot.id]
+                if slot.version != move["version"]:
+                    raise SlotMoveError(slot.id, "Слот змінено іншим користувачем, оновіть календар.", status=409)
+
+                if "machine" in move:
+                    if move["machine"] is not None and move["machine"] not in machines:
+                        raise SlotMoveError(slot.id, "Верстат не знайдено.")
+                    slot.machine = machines.get(move["machine"])
+                if "work_unit" in move:
+                    if move["work_unit"] is not None and move["work_unit"] not in units:
+                        raise SlotMoveError(slot.id, "Дільницю не знайдено.")
+                    slot.work_unit = units.get(move["work_unit"])
+
+                _check_working_hours(slot, move["start"], move["end"])
+                slot.start_datetime = move["start"]
+                slot.end_datetime = move["end"]
+                slot.version += 1
+                slot.updated_at = now
+
+            _check_conflicts(slots, moves)
+
+            # bulk_update не заповнює auto_now — updated_at виставлено вище
+            ProductionSlot.objects.bulk_update(
+                slots, ["machine", "work_unit", "start_datetime", "end_datetime", "version", "updated_at"]
+            )
+            # bulk_update не шле сигналів — журнал змін і підсумки завантаженості самі
+            for slot in slots:
+                utilization.schedule_slot_refresh(slot, slot._changelog_snapshot)
+            changelog.log_many(slots)
+            schedule_report_warmup()
+    except SlotMoveError as exc:
+        return JsonResponse({"errors": [{"id": exc.slot_id, "error": exc.message}]}, status=exc.status)
+
+    return JsonResponse({"events": _slot_events(ProductionSlot.objects.filter(pk__in=moves))})
+
+
+
+@staff_member_required
+@use_replica
+def utilization_report(request):
+    """
+    Історична завантаженість за типами ресурсів: по кварталах або місяцях року
+    (?year=, ?group=quarter|month) з денних підсумків ResourceUtilization.
+    """
+    today = timezone.localdate()
+    try:
+        year = int(request.GET.get("year", today.year))
+        # діапазон, а не date__year: порівняння самої колонки йде по індексу
+        year_range = (date(year, 1, 1), date(year, 12, 31))
+    except ValueError:
+        year = today.year
+        year_range = (date(year, 1, 1), date(year, 12, 31))
+    group = "month" if request.GET.get("group") == "month" else "quarter"
+    trunc = TruncMonth if group == "month" else TruncQuarter
+
+    totals = (
+        ResourceUtilization.objects.filter(date__range=year_range)
+        .values("resource_type", period=trunc("date"))
+        .annotate(
+            busy=Sum("busy_seconds"),
+            available=Sum("available_seconds"),
+            slots=Sum("slot_count"),
+        )
+        .order_by("period", "resource_type")
+    )
+
+    labels = {**dict(Machine.MachineType.choices), **dict(WorkUnit.UnitType.choices)}
+    types = []
+    cells = defaultdict(dict)
+    for row in totals:
+        if row["resource_type"] not in types:
+            types.append(row["resource_type"])
+        percent = round(row["busy"] / row["available"] * 100) if row["available"] else 0
+        cells[row["period"]][row["resource_type"]] = {
+            "percent": percent,
+            "busy_hours": round(row["busy"] / 3600),
+            "slots": row["slots"],
+        }
+
+    return render(request, "utilization_report.html", {
+        "year": year,
+        "group": group,
+        "types": [(t, labels.get(t, t)) for t in types],
+        "rows": [(period, [cells[period].get(t) for t in types]) for period in sorted(cells)],
+    })
+
+
+@staff_member_required
+@use_replica
+def machine_heatmap(request):
+    """
+    Теплова карта завантаженості верстатів × днів на ?weeks= тижнів
+    (дефолт 12) від понеділка поточного тижня. ?format=json — лише дані.
+    """
+    from .occupancy import OccupancyGrid
+
+    try:
+        weeks = min(max(int(request.GET.get("weeks", 12)), 1), 26)
+    except ValueError:
+        weeks = 12
+    today = timezone.localdate()
+    start = today - timedelta(days=today.weekday())
+    days = weeks * 7
+    window_start = make_aware(datetime.combine(start, time.min))
+    window_end = window_start + timedelta(days=days)
+
+    machines = list(Machine.objects.all())
+    grid = OccupancyGrid(machines, start, days)
+    grid.add(
+        ProductionSlot.objects.filter(
+            machine__isnull=False,
+            start_datetime__lt=window_end,
+            end_datetime__gt=window_start,
+        ).values_list("machine_id", "start_datetime", "end_datetime")
+    )
+    grid.add(
+        (o.machine_id, o.start, o.end) for o in recurrence.expand(window_start, window_end) if o.machine_id
+    )
+
+    data = {
+        "days": [(start + timedelta(days=i)).isoformat() for i in range(days)],
+        "machines": [{"id": m.id, "name": m.name, "type": m.get_type_display()} for m in machines],
+        # відсотки цілими — компактний JSON
+        "load": (grid.daily_utilization() * 100).round().astype(int).tolist(),
+    }
+    if request.GET.get("format") == "json":
+        return JsonResponse(data)
+    return render(request, "machine_heatmap.html", {"weeks": weeks, "start": start, "data": data})
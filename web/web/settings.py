@@ -48,6 +48,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.changelog.CurrentRequestMiddleware',  # автор змін для журналу
+    'core.db.ReplicaPinningMiddleware',  # читання своїх записів після змін
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +88,72 @@ DATABASES = {
     }
 }
 
+# Репліки для читання (звіти, див. core.db): POSTGRES_REPLICA_HOSTS=host1,host2:5433
+# Для локальної перевірки можна вказати той самий хост, що й основна БД.
+DATABASE_REPLICAS = []
+for _i, _host in enumerate(filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1):
+    _host, _, _port = _host.strip().partition(":")
+    DATABASES[f"replica{_i}"] = {
+        **DATABASES["default"],
+        "USER": os.getenv("POSTGRES_REPLICA_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": os.getenv("POSTGRES_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+        "HOST": _host,
+        "PORT": _port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{_i}")
+
+DATABASE_ROUTERS = ["core.db.ReplicaRouter"]
+# скільки секунд після зміни даних користувач читає з основної БД
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("POSTGRES_REPLICA_PIN_SECONDS", "10"))
+
+# Cache (звіти виробництва, див. manufacture.caching)
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", "metal-crm"),
+    }
+}
+
+# Email (нагадування про задачі, crm.reminders)
+EMAIL_BACKEND = os.getenv("DJANGO_EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+EMAIL_HOST = os.getenv("DJANGO_EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("DJANGO_EMAIL_PORT", "25"))
+EMAIL_HOST_USER = os.getenv("DJANGO_EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("DJANGO_EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("DJANGO_EMAIL_USE_TLS", "0") == "1"
+DEFAULT_FROM_EMAIL = os.getenv("DJANGO_DEFAULT_FROM_EMAIL", "crm@localhost")
+
+# Фонові задачі (core.jobs): "1" — виконувати одразу після коміту, без воркера
+JOB_QUEUE_EAGER = os.getenv("DJANGO_JOB_QUEUE_EAGER", "0") == "1"
+
+# Трекінг посилок (crm.tracking); URL можна направити на локальну заглушку (stub_carriers)
+NOVA_POSHTA_API_URL = os.getenv("NOVA_POSHTA_API_URL", "https://api.novaposhta.ua/v2.0/json/")
+NOVA_POSHTA_API_KEY = os.getenv("NOVA_POSHTA_API_KEY", "")
+NOVA_POSHTA_RATE_LIMIT = float(os.getenv("NOVA_POSHTA_RATE_LIMIT", "5"))  # запитів на секунду
+UKRPOSHTA_TRACKING_URL = os.getenv("UKRPOSHTA_TRACKING_URL", "https://www.ukrposhta.ua/status-tracking/0.0.1/")
+UKRPOSHTA_TRACKING_TOKEN = os.getenv("UKRPOSHTA_TRACKING_TOKEN", "")
+UKRPOSHTA_RATE_LIMIT = float(os.getenv("UKRPOSHTA_RATE_LIMIT", "5"))
+TRACKING_CONCURRENCY = int(os.getenv("TRACKING_CONCURRENCY", "10"))
+TRACKING_TIMEOUT = float(os.getenv("TRACKING_TIMEOUT", "15"))
+# не опитувати ТТН частіше, ніж раз на стільки секунд
+TRACKING_RECHECK_SECONDS = int(os.getenv("TRACKING_RECHECK_SECONDS", "1800"))
+
+# Синхронізація з маркетплейсами (crm.marketplaces); маркетплейс без URL пропускається.
+# Для перевірки без ключів — python manage.py stub_marketplaces
+MARKETPLACE_API = {
+    name: {
+        "URL": os.getenv(f"{name.upper()}_API_URL", ""),
+        "TOKEN": os.getenv(f"{name.upper()}_API_TOKEN", ""),
+        "RATE": float(os.getenv(f"{name.upper()}_API_RATE", "5")),  # запитів на секунду
+    }
+    for name in ("prom", "rozetka", "olx", "site")
+}
+MARKETPLACE_CONCURRENCY = int(os.getenv("MARKETPLACE_CONCURRENCY", "10"))
+MARKETPLACE_TIMEOUT = float(os.getenv("MARKETPLACE_TIMEOUT", "15"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -106,12 +174,29 @@ AUTH_PASSWORD_VALIDATORS = [
 
 JAZZMIN_SETTINGS = {
     "custom_links": {
+        "crm": [
+            {
+                "name": "Метрики замовлень",
+                "url": "order_metrics_report",
+                "icon": "fas fa-stopwatch",
+            },
+        ],
         "manufacture": [
             {
                 "name": "Завантаженість верстатів",
                 "url": "machine_load_report",
                 "icon": "fas fa-chart-line",
             },
+            {
+                "name": "Теплова карта верстатів",
+                "url": "machine_heatmap",
+                "icon": "fas fa-th",
+            },
+            {
+                "name": "Історія завантаженості",
+                "url": "utilization_report",
+                "icon": "fas fa-chart-area",
+            },
             {
                 "name": "Календар слотів",
                 "url": "admin:manufacture_productionslot_calendar",